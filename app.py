@@ -1,13 +1,63 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 import speech_recognition as sr
 import logging
+import atexit
 import base64
+import contextlib
+import io
+import itertools
+import json
+import re
 import tempfile
 import os
 import requests
+import shutil
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait as wait_for_futures
 from datetime import datetime
+import numpy as np
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from config import (
+    MAX_AUDIO_UPLOAD_SIZE, UPLOAD_CHUNK_SIZE, UPLOAD_SPOOL_MEMORY_LIMIT, MAX_UPLOAD_CHUNK_SIZE,
+    UPLOAD_SESSION_TIMEOUT, STREAMING_CONVERSION_TIMEOUT, TRANSCRIPTION_CACHE_FOLDER,
+    TRANSCRIPTION_CACHE_MEMORY_ENTRIES, TRANSCRIPTION_CACHE_DISK_BYTES, TRANSCRIPTION_CACHE_TTL,
+    TRANSCRIPTION_WORKERS, MAX_QUEUED_JOBS, JOB_RESULT_TTL, SPEECHBRAIN_MAX_BATCH_SIZE,
+    SPEECHBRAIN_BATCH_WAIT, MAX_BATCH_CLIPS, SPEECHBRAIN_BACKGROUND_LOAD, SPEECHBRAIN_WARMUP,
+    WARMUP_AUDIO_SECONDS, FLASK_HOST, FLASK_PORT, FLASK_DEBUG, SPEECHBRAIN_INFERENCE_PROCESSES,
+    TORCH_THREADS_PER_PROCESS, PIN_INFERENCE_CPUS, LONG_AUDIO_THRESHOLD, VAD_MAX_SEGMENT_SECONDS,
+    VAD_MIN_SILENCE_MS, VAD_ENERGY_MARGIN_DB, WHISPER_TRIM_SILENCE, WHISPER_MAX_PAUSE_MS,
+    REPLICATE_API_URL, WHISPER_MODEL_VERSION, REPLICATE_MAX_IN_FLIGHT, REPLICATE_POOL_SIZE,
+    REPLICATE_TIMEOUT, REPLICATE_POLL_INTERVAL, ADAPTIVE_ROUTING, ROUTER_WINDOW, ROUTER_MIN_SAMPLES,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_ERROR_RATE, BREAKER_COOLDOWN,
+    HEDGED_REQUESTS, HEDGE_DELAY, HEDGE_PERCENTILE, HEDGE_DEFAULT_DELAY, HEDGE_WORKERS,
+    REQUEST_DEADLINE, MAX_REQUEST_DEADLINE, TRANSCRIPTION_DB_PATH, TRANSCRIPTIONS_PAGE_SIZE,
+    MAX_TRANSCRIPTIONS_PAGE_SIZE, SESSION_TIMEOUT, MAX_SESSION_TRANSCRIPTIONS, MAX_TRANSCRIPTION_LENGTH,
+    SESSION_CACHE_MAX_SESSIONS, TRANSCRIPTION_LOG_FOLDER, TRANSCRIPTION_LOG_SEGMENT_BYTES,
+    PERSISTENCE_QUEUE_SIZE, PERSISTENCE_BATCH_SIZE, PERSISTENCE_ENQUEUE_TIMEOUT, PERSISTENCE_FSYNC,
+    PERSISTENCE_READ_TIMEOUT, SEARCH_PAGE_SIZE, SEARCH_SYNC_WINDOW, STATS_HOURS, STATS_DAYS, MAX_STATS_HOURS,
+    MAX_STATS_DAYS, LOG_LEVEL, LOG_PROFILE, LOG_DEBUG_SAMPLE_RATE
+)
+from upload_sessions import UploadSessionRegistry
+from audio_pipeline import CANONICAL_SAMPLE_RATE, PreparedAudio, encode_wav, normalisation_stats
+from transcription_cache import TranscriptionCache, make_cache_key
+from job_queue import JobQueue, QueueFullError
+from speechbrain_batcher import MicroBatcher, length_sorted_batches, transcribe_batch_samples
+from model_loader import ModelLoader
+from inference_pool import InferencePool
+from engine_router import EngineRouter
+from hedging import HedgeStats, run_hedged
+from replicate_client import PredictionCancelled, ReplicateClient
+from audio_segmentation import compress_silence, map_to_original, segment_speech, stitch_segments, trim_stats
+from request_deadline import Deadline, DeadlineExceeded, parse_deadline
+from transcription_store import TranscriptionStore
+from transcription_log import FSYNC_POLICIES, TranscriptionLog
+from session_cache import SessionCache
+from persistence_writer import PersistenceWriter
+from search_index import SearchIndex
+from transcript_documents import SAVE_MODES, SessionLocks, document_summary, rebuild_document, upsert_delta
+from structured_logging import TRANSCRIPT, configure_logging
 
 # SpeechBrain imports
 try:
@@ -18,27 +68,22 @@ except ImportError:
     SPEECHBRAIN_AVAILABLE = False
     print("⚠️  SpeechBrain not installed. Install with: pip install speechbrain")
 
-# Audio processing imports
-try:
-    from pydub import AudioSegment
-    AUDIO_CONVERSION_AVAILABLE = True
-except ImportError:
-    AUDIO_CONVERSION_AVAILABLE = False
-    print("⚠️  pydub not installed. Install with: pip install pydub")
+# This app's loggers; only their debug detail is sampled, other libraries log at LOG_LEVEL
+APP_LOGGERS = (
+    __name__, 'audio_pipeline', 'engine_router', 'hedging', 'inference_pool', 'job_queue', 'model_loader',
+    'persistence_writer', 'replicate_client', 'session_cache', 'speechbrain_batcher', 'transcription_cache',
+    'transcription_log', 'transcription_store', 'upload_sessions',
+)
 
-# Replicate imports for OpenAI Whisper
-try:
-    import replicate
-    REPLICATE_AVAILABLE = True
-except ImportError:
-    REPLICATE_AVAILABLE = False
-    print("⚠️  replicate not installed. Install with: pip install replicate")
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (profiles are described in structured_logging.py)
+log_listener = configure_logging(LOG_PROFILE, LOG_LEVEL, LOG_DEBUG_SAMPLE_RATE, debug_loggers=APP_LOGGERS)
+if log_listener is not None:
+    # Registered first so it runs last, after the writers have logged their final records
+    atexit.register(log_listener.stop)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = MAX_AUDIO_UPLOAD_SIZE
 CORS(app)
 
 # Configuration
@@ -47,139 +92,285 @@ TRANSCRIPTIONS_FOLDER = 'transcriptions'
 # Create transcriptions directory if it doesn't exist
 os.makedirs(TRANSCRIPTIONS_FOLDER, exist_ok=True)
 
-# Global variable to store transcription results
-transcription_results = []
+# Where the log, database and cache were kept before they moved out of the served folder
+LEGACY_DATA_PATHS = [
+    (os.path.join(TRANSCRIPTIONS_FOLDER, 'log'), TRANSCRIPTION_LOG_FOLDER),
+    (os.path.join(TRANSCRIPTIONS_FOLDER, 'cache'), TRANSCRIPTION_CACHE_FOLDER),
+] + [
+    (os.path.join(TRANSCRIPTIONS_FOLDER, 'transcriptions.db') + suffix, TRANSCRIPTION_DB_PATH + suffix)
+    for suffix in ('', '-wal', '-shm')
+]
+
+# Legacy per-transcription files, the only names served from TRANSCRIPTIONS_FOLDER
+LEGACY_TRANSCRIPTION_FILE = re.compile(r'[\w-]+_transcription\.txt')
+
+def move_legacy_data():
+    """Move data left in TRANSCRIPTIONS_FOLDER by older versions to its private location"""
+    for old_path, new_path in LEGACY_DATA_PATHS:
+        if not os.path.exists(old_path) or os.path.exists(new_path):
+            continue
+        os.makedirs(os.path.dirname(new_path) or '.', exist_ok=True)
+        try:
+            os.replace(old_path, new_path)
+        except FileNotFoundError:
+            continue  # Another worker moved it first
+        logger.info(f"📦 Moved {old_path} to {new_path}")
+
+move_legacy_data()
+
+# Append-only log every transcription is written to first; it hands out record ids
+transcription_log = TranscriptionLog(TRANSCRIPTION_LOG_FOLDER, TRANSCRIPTION_LOG_SEGMENT_BYTES)
+
+# Stored transcriptions (SQLite, survives restarts and is shared between workers)
+transcription_store = TranscriptionStore(TRANSCRIPTION_DB_PATH)
+
+# Recently read sessions, kept in memory in front of the store
+session_cache = SessionCache(
+    transcription_store, SESSION_TIMEOUT, MAX_SESSION_TRANSCRIPTIONS,
+    MAX_TRANSCRIPTION_LENGTH, SESSION_CACHE_MAX_SESSIONS
+)
+
+# Full-text index of stored transcriptions (GET /search)
+search_index = SearchIndex()
+
+# Columns the search index reads
+SEARCH_FIELDS = ['id', 'session_id', 'service', 'transcription', 'text_offset']
+
+def index_session_documents(session_ids, session_records):
+    """Index each session's rebuilt document in place of its delta records"""
+    for session_id in session_ids:
+        records = session_records(session_id)
+        deltas = [record for record in records if record.get('text_offset') is not None]
+        if not deltas:
+            continue
+        text, _ = rebuild_document(records)
+        search_index.set_document(session_id, deltas[-1]['id'], text, deltas[-1].get('service'),
+                                  [record['id'] for record in deltas[:-1]])
+
+def index_transcriptions(records, session_records):
+    """Add records to the search index; delta records are indexed as their session's document"""
+    search_index.add_many([record for record in records if record.get('text_offset') is None])
+    index_session_documents({record['session_id'] for record in records if record.get('text_offset') is not None},
+                            session_records)
+
+def append_transcriptions(records):
+    """Make a batch of queued records durable with one log append; saves are acknowledged after this"""
+    transcription_log.append_many(records, PERSISTENCE_FSYNC)
+
+def apply_transcriptions(records):
+    """Apply a batch of appended records to the store (one transaction), session cache and search index"""
+    cleared_before = transcription_log.cleared_before()
+    if cleared_before is not None:
+        # Saved while the transcriptions were being cleared
+        records = [record for record in records if record['id'] > cleared_before]
+    transcription_store.add_many(records)
+    for record in records:
+        session_cache.add(record)
+    index_transcriptions(records, session_cache.get)
+
+if PERSISTENCE_FSYNC not in FSYNC_POLICIES:
+    raise ValueError(f"PERSISTENCE_FSYNC must be one of {', '.join(FSYNC_POLICIES)}")
+
+# Saves are queued here and written in batches by a background thread
+persistence_writer = PersistenceWriter(
+    append_transcriptions, apply_transcriptions, PERSISTENCE_QUEUE_SIZE, PERSISTENCE_BATCH_SIZE, PERSISTENCE_ENQUEUE_TIMEOUT
+)
+atexit.register(persistence_writer.barrier, PERSISTENCE_READ_TIMEOUT)
+
+# Serialises upsert/delta saves to a session, which read its document before writing to it
+document_locks = SessionLocks()
+
+# Open chunked upload sessions
+upload_sessions = UploadSessionRegistry(UPLOAD_SESSION_TIMEOUT)
+
+# Transcriptions keyed by audio hash, so re-sent recordings skip inference
+transcription_cache = TranscriptionCache(
+    TRANSCRIPTION_CACHE_FOLDER, TRANSCRIPTION_CACHE_MEMORY_ENTRIES,
+    TRANSCRIPTION_CACHE_DISK_BYTES, TRANSCRIPTION_CACHE_TTL
+)
+
+# OpenAI Whisper via Replicate, over one pooled HTTP session
+replicate_client = ReplicateClient(
+    os.environ.get('REPLICATE_API_URL', REPLICATE_API_URL),
+    max_in_flight=REPLICATE_MAX_IN_FLIGHT, pool_size=REPLICATE_POOL_SIZE,
+    timeout=REPLICATE_TIMEOUT, poll_interval=REPLICATE_POLL_INTERVAL
+)
+
+# Per-engine latency/error tracking and circuit breakers that order the fallback chain
+engine_router = EngineRouter(
+    ROUTER_WINDOW, ROUTER_MIN_SAMPLES,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_ERROR_RATE, BREAKER_COOLDOWN
+)
+
+# Threads that run the engines of a hedged request
+hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='hedge')
+hedge_stats = HedgeStats()
+
+# Worker pool for ?async=1 transcriptions
+transcription_jobs = JobQueue(TRANSCRIPTION_WORKERS, MAX_QUEUED_JOBS, JOB_RESULT_TTL)
 
 # SpeechBrain model (loaded once at startup)
 speechbrain_model = None
 
+# Inference processes forked from this one once the model is loaded
+inference_pool = InferencePool(SPEECHBRAIN_INFERENCE_PROCESSES, TORCH_THREADS_PER_PROCESS, PIN_INFERENCE_CPUS)
+
+def run_speechbrain_batch(clips):
+    """One padded SpeechBrain forward pass, in an inference process when the pool is running"""
+    if inference_pool.started:
+        return inference_pool.transcribe(clips)
+    return transcribe_batch_samples(speechbrain_model, clips)
+
+# Concurrent single-clip SpeechBrain requests share forward passes
+speechbrain_batcher = MicroBatcher(
+    run_speechbrain_batch, SPEECHBRAIN_MAX_BATCH_SIZE, SPEECHBRAIN_BATCH_WAIT,
+    runners=max(1, SPEECHBRAIN_INFERENCE_PROCESSES)
+)
+
+def run_speechbrain_batches(clips, timeout=None):
+    """
+    Transcribe any number of clips in padded batches, in input order
+
+    The clips are queued on the micro-batcher shortest first, so its
+    runners (one per inference process) decode them in parallel with
+    little padding. Raises FutureTimeoutError if they are not all done
+    within timeout seconds; clips not yet started by then are dropped.
+    """
+    order = [index for indexes in length_sorted_batches(clips, SPEECHBRAIN_MAX_BATCH_SIZE) for index in indexes]
+    futures = {index: speechbrain_batcher.submit(clips[index]) for index in order}
+    _, not_done = wait_for_futures(futures.values(), timeout)
+    if not_done:
+        for future in not_done:
+            future.cancel()
+        raise FutureTimeoutError(f'{len(not_done)} of {len(clips)} clips not decoded within {timeout:.1f}s')
+    return [futures[index].result() for index in range(len(clips))]
+
 def load_speechbrain_model():
-    """Load SpeechBrain ASR model"""
-    global speechbrain_model
+    """Load SpeechBrain ASR model; returns it, or None if it could not be loaded"""
     if not SPEECHBRAIN_AVAILABLE:
         logger.warning("SpeechBrain not available, falling back to Google Speech Recognition")
-        return False
+        return None
     
     try:
         logger.info("🧠 Loading SpeechBrain ASR model...")
         # Use a simpler pre-trained ASR model
-        speechbrain_model = EncoderDecoderASR.from_hparams(
+        model = EncoderDecoderASR.from_hparams(
             source="speechbrain/asr-crdnn-rnnlm-librispeech",
             savedir="./pretrained_models/asr-crdnn-rnnlm-librispeech"
         )
         logger.info("✅ SpeechBrain model loaded successfully")
-        return True
+        return model
     except Exception as e:
         logger.error(f"❌ Failed to load SpeechBrain model: {e}")
+        return None
+
+def load_speechbrain_inference():
+    """Load the model, then fork the inference processes (if configured) so they share it"""
+    global speechbrain_model
+    model = load_speechbrain_model()
+    if model is None:
         return False
+    if SPEECHBRAIN_INFERENCE_PROCESSES > 0:
+        inference_pool.start(model)
+    # Published only now: a request that saw the model before the fork would run torch here first,
+    # which leaves the forked workers with a broken OpenMP runtime
+    speechbrain_model = model
+    return True
 
-def convert_audio_format(input_path, output_format='wav'):
+def warm_up_speechbrain_model():
+    """Run a throwaway padded batch so the first real request isn't the slow one"""
+    logger.info("🔥 Warming up SpeechBrain model...")
+    t = np.arange(int(WARMUP_AUDIO_SECONDS * CANONICAL_SAMPLE_RATE)) / CANONICAL_SAMPLE_RATE
+    tone = (0.1 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    clips = [tone, tone[:len(tone) // 2]]
+    if inference_pool.started:
+        inference_pool.warm_up(clips)
+    else:
+        transcribe_batch_samples(speechbrain_model, clips)
+
+# Loads and warms up the model once per process; see create_app()
+model_loader = ModelLoader(load_speechbrain_inference, warm_up_speechbrain_model, SPEECHBRAIN_AVAILABLE)
+
+def create_app(background=SPEECHBRAIN_BACKGROUND_LOAD, warm_up=SPEECHBRAIN_WARMUP):
     """
-    Convert audio file to a format that SpeechBrain can handle
+    Return the app with the ASR model loading (once per process)
+
+    Entry point for WSGI servers, e.g. `gunicorn -w 2 'app:create_app()'`.
+    Each worker loads its own copy; with gunicorn --preload pass
+    background=False so the model is loaded before the workers fork.
+    Forked workers re-open the transcription log's lock and the store's
+    connections (fork_hooks.py), so they still exclude each other, and
+    start their own log listener thread.
+    Poll `/ready` to find out when warm-up has finished.
     """
-    if not AUDIO_CONVERSION_AVAILABLE:
-        logger.warning("Audio conversion not available, using original file")
-        return input_path
-    
-    try:
-        logger.info(f"🔄 Converting audio to {output_format} format...")
-        
-        # Check if input file exists
-        if not os.path.exists(input_path):
-            raise Exception(f"Input file not found: {input_path}")
-        
-        # Load audio file
-        audio = AudioSegment.from_file(input_path)
-        
-        # Create output path
-        output_path = tempfile.mktemp(suffix=f'.{output_format}')
-        
-        # Export to new format
-        audio.export(output_path, format=output_format)
-        
-        # Verify the output file was created
-        if not os.path.exists(output_path):
-            raise Exception(f"Output file was not created: {output_path}")
-        
-        # Check file size
-        output_size = os.path.getsize(output_path)
-        if output_size == 0:
-            raise Exception(f"Output file is empty: {output_path}")
-        
-        logger.info(f"✅ Audio converted to: {output_path} ({output_size} bytes)")
-        return output_path
-        
-    except Exception as e:
-        logger.error(f"❌ Audio conversion failed: {e}")
-        logger.warning("⚠️ Using original file format for transcription")
-        
-        # If the original file exists, return it
-        if os.path.exists(input_path):
-            logger.info(f"🔄 Falling back to original file: {input_path}")
-            return input_path
-        else:
-            # If even the original file doesn't exist, this is a critical error
-            raise Exception(f"Both conversion and original file failed: {e}")
+    model_loader.start(background=background, warm_up=warm_up)
+    return app
 
-def transcribe_with_speechbrain(audio_file_path):
+def transcribe_with_speechbrain(audio, timeout=None):
     """
     Transcribe audio using SpeechBrain ASR model
+
+    `audio` is a float32 mono array at the model's sample rate (batched with
+    any concurrent clips by the micro-batcher) or, for older callers, a path.
+    For arrays, gives up waiting for the batch after timeout seconds.
     """
     try:
-        logger.info("🧠 Using SpeechBrain for transcription...")
-        
         if not speechbrain_model:
             logger.error("SpeechBrain model not loaded")
             raise Exception("SpeechBrain model not available")
         
-        # Ensure we have a clean absolute path
-        audio_file_path = os.path.abspath(audio_file_path)
-        logger.info(f"🧠 Audio file path: {audio_file_path}")
-        
-        # Check if file exists
-        if not os.path.exists(audio_file_path):
-            raise Exception(f"Audio file not found: {audio_file_path}")
-        
-        # Get file size for debugging
-        file_size = os.path.getsize(audio_file_path)
-        logger.info(f"🧠 Audio file size: {file_size} bytes")
-        
-        # Get current working directory for debugging
-        cwd = os.getcwd()
-        logger.info(f"🧠 Current working directory: {cwd}")
-        
-        # Check if the path is absolute
-        is_absolute = os.path.isabs(audio_file_path)
-        logger.info(f"🧠 Is absolute path: {is_absolute}")
-        
-        # List directory contents for debugging
-        try:
-            dir_path = os.path.dirname(audio_file_path)
-            dir_contents = os.listdir(dir_path)
-            logger.info(f"🧠 Directory contents: {dir_contents[:10]}...")  # Show first 10 items
-        except Exception as dir_error:
-            logger.warning(f"🧠 Could not list directory contents: {dir_error}")
-        
-        # Transcribe audio using SpeechBrain
-        logger.info("🧠 Calling SpeechBrain transcribe_file...")
-        transcription = speechbrain_model.transcribe_file(audio_file_path)
+        if isinstance(audio, str):
+            audio_file_path = os.path.abspath(audio)
+            if not os.path.exists(audio_file_path):
+                raise Exception(f"Audio file not found: {audio_file_path}")
+            logger.debug("🧠 Calling SpeechBrain transcribe_file on %s", audio_file_path)
+            transcription = speechbrain_model.transcribe_file(audio_file_path)
+        else:
+            if len(audio) == 0:
+                raise Exception("Decoded audio is empty")
+            logger.debug("🧠 Queueing %d samples for batched SpeechBrain inference", len(audio))
+            transcription = speechbrain_batcher.transcribe(audio, timeout=timeout)
         
-        logger.info(f"✅ SpeechBrain transcription completed: {transcription}")
+        logger.debug("✅ SpeechBrain transcription completed: %s", transcription, extra=TRANSCRIPT)
         return transcription
         
     except Exception as e:
-        logger.error(f"❌ SpeechBrain transcription error: {e}")
+        logger.error(f"❌ SpeechBrain transcription error: {e!r}")
         logger.error(f"❌ Error type: {type(e).__name__}")
         logger.error(f"❌ Error details: {str(e)}")
         raise e
 
-def transcribe_with_google_fallback(audio_file_path):
+def transcribe_long_audio_with_speechbrain(samples, timeout=None):
+    """
+    Transcribe long audio as silence-delimited segments decoded in parallel
+
+    Returns (transcription, segments) where each segment has its start and
+    end offset in seconds and its own text. Gives up waiting for the
+    segments after timeout seconds (FutureTimeoutError).
+    """
+    segments = segment_speech(
+        samples, CANONICAL_SAMPLE_RATE, VAD_MAX_SEGMENT_SECONDS,
+        margin_db=VAD_ENERGY_MARGIN_DB, min_silence_ms=VAD_MIN_SILENCE_MS
+    )
+    logger.info(f"✂️ Split {len(samples) / CANONICAL_SAMPLE_RATE:.0f}s of audio into {len(segments)} speech segments")
+    if not segments:
+        return '', []
+    
+    texts = run_speechbrain_batches([samples[start:end] for start, end in segments], timeout=timeout)
+    transcription, timeline = stitch_segments(segments, texts, CANONICAL_SAMPLE_RATE)
+    logger.debug("✅ SpeechBrain long-audio transcription completed: %s", transcription, extra=TRANSCRIPT)
+    return transcription, timeline
+
+def transcribe_with_google_fallback(audio_file_path, timeout=None):
     """
     Fallback to Google Speech Recognition if SpeechBrain fails
+
+    timeout bounds the request to Google, in seconds.
     """
     try:
         logger.info("🔄 Falling back to Google Speech Recognition...")
         recognizer = sr.Recognizer()
+        recognizer.operation_timeout = timeout
         
         with sr.AudioFile(audio_file_path) as source:
             logger.info("Audio file loaded successfully")
@@ -188,53 +379,62 @@ def transcribe_with_google_fallback(audio_file_path):
             logger.info("Audio recorded successfully")
         
         transcription = recognizer.recognize_google(audio_data)
-        logger.info(f"✅ Google fallback transcription completed: {transcription}")
+        logger.debug("✅ Google fallback transcription completed: %s", transcription, extra=TRANSCRIPT)
         return transcription
         
     except Exception as e:
         logger.error(f"❌ Google fallback transcription failed: {e}")
         raise e
 
-def transcribe_with_openai_whisper(audio_file_path):
+def transcribe_with_openai_whisper(audio_file, with_segments=False, cancel_event=None, timeout=None):
     """
     Transcribe audio using OpenAI Whisper via Replicate API
+
+    `audio_file` is an in-memory WAV file object or, for older callers, a path.
+    With with_segments, returns (text, [{'start', 'end', 'text'}, ...]).
+    Setting cancel_event cancels the prediction, as does running past
+    timeout seconds (default REPLICATE_TIMEOUT).
     """
-    if not REPLICATE_AVAILABLE:
-        logger.error("Replicate not available")
+    if not replicate_client.configured:
+        logger.error("REPLICATE_API_TOKEN not set")
         raise Exception("Replicate API not available")
     
     try:
-        logger.info("🤖 Using OpenAI Whisper for transcription...")
-        
-        # Check if file exists
-        if not os.path.exists(audio_file_path):
-            raise Exception(f"Audio file not found: {audio_file_path}")
-        
-        # Get file size for debugging
-        file_size = os.path.getsize(audio_file_path)
-        logger.info(f"🤖 Audio file size: {file_size} bytes")
-        logger.info(f"🤖 Audio file path: {audio_file_path}")
-        
-        # Verify it's a WAV file (should be converted by endpoint)
-        if not audio_file_path.lower().endswith('.wav'):
-            logger.warning(f"⚠️ Audio file is not WAV format: {audio_file_path}")
+        if isinstance(audio_file, str):
+            # Check if file exists
+            if not os.path.exists(audio_file):
+                raise Exception(f"Audio file not found: {audio_file}")
+            
+            # Verify it's a WAV file (should be converted by endpoint)
+            if not audio_file.lower().endswith('.wav'):
+                logger.warning(f"⚠️ Audio file is not WAV format: {audio_file}")
+            
+            logger.debug("🤖 Audio file path: %s", audio_file)
+            audio_context = open(audio_file, 'rb')
+        else:
+            audio_context = contextlib.nullcontext(audio_file)
         
         # Open the audio file for Replicate
-        with open(audio_file_path, 'rb') as audio_file:
-            logger.info("🤖 Sending WAV audio to OpenAI Whisper via Replicate...")
+        with audio_context as audio_file:
+            audio_file.seek(0)
+            logger.debug("🤖 Sending WAV audio to OpenAI Whisper via Replicate")
             
-            # Run OpenAI Whisper model
-            output = replicate.run(
-                "openai/whisper:8099696689d249cf8b122d833c36ac3f75505c666a395ca40ef26f68e7d3d16e",
-                input={"audio": audio_file}
+            # Run OpenAI Whisper model (create the prediction, then poll it)
+            output = replicate_client.run(
+                WHISPER_MODEL_VERSION, {"audio": audio_file}, timeout=timeout, cancel_event=cancel_event
             )
             
-            logger.info(f"✅ OpenAI Whisper transcription completed")
+            logger.debug("✅ OpenAI Whisper transcription completed")
             
             # Extract transcription text from output
+            segments = []
             if isinstance(output, dict) and 'segments' in output:
                 # If output has segments, concatenate all text
                 transcription_text = ' '.join([segment.get('text', '').strip() for segment in output['segments']])
+                segments = [
+                    {'start': segment.get('start', 0.0), 'end': segment.get('end', 0.0), 'text': segment.get('text', '').strip()}
+                    for segment in output['segments']
+                ]
             elif isinstance(output, str):
                 # If output is directly a string
                 transcription_text = output
@@ -242,300 +442,1101 @@ def transcribe_with_openai_whisper(audio_file_path):
                 # Fallback: try to extract text from any format
                 transcription_text = str(output)
             
-            logger.info(f"🤖 Transcription: {transcription_text}")
+            logger.debug("🤖 Transcription: %s", transcription_text, extra=TRANSCRIPT)
             
+            if with_segments:
+                return transcription_text.strip(), segments
             return transcription_text.strip()
         
+    except PredictionCancelled:
+        raise
     except Exception as e:
         logger.error(f"❌ OpenAI Whisper transcription error: {e}")
         logger.error(f"❌ Error type: {type(e).__name__}")
         logger.error(f"❌ Error details: {str(e)}")
         raise e
 
+def trim_silence_for_upload(prepared_audio):
+    """
+    Build a silence-compressed WAV for a remote engine
+
+    Returns (wav_file, time_map, report) where report gives the seconds and
+    bytes the trimmed upload saves compared with the full normalised WAV.
+    """
+    samples = prepared_audio.samples()
+    start = time.time()
+    trimmed, time_map = compress_silence(
+        samples, CANONICAL_SAMPLE_RATE, gap_ms=WHISPER_MAX_PAUSE_MS,
+        margin_db=VAD_ENERGY_MARGIN_DB, min_silence_ms=VAD_MIN_SILENCE_MS
+    )
+    wav_bytes = encode_wav(trimmed)
+    original_bytes = prepared_audio.wav_sizes()[1]
+    
+    report = {
+        'original_seconds': round(len(samples) / CANONICAL_SAMPLE_RATE, 2),
+        'trimmed_seconds': round(len(trimmed) / CANONICAL_SAMPLE_RATE, 2),
+        'seconds_saved': round((len(samples) - len(trimmed)) / CANONICAL_SAMPLE_RATE, 2),
+        'original_bytes': original_bytes,
+        'trimmed_bytes': len(wav_bytes),
+        'bytes_saved': original_bytes - len(wav_bytes),
+        'trim_time': round(time.time() - start, 4)
+    }
+    trim_stats.record(report['seconds_saved'], report['bytes_saved'])
+    logger.info(f"✂️ Silence trimming saved {report['seconds_saved']}s and {report['bytes_saved']} bytes")
+    
+    wav_file = io.BytesIO(wav_bytes)
+    wav_file.name = 'audio.wav'
+    return wav_file, time_map, report
+
+def spool_audio_upload():
+    """
+    Spool the uploaded audio for the current request.
+
+    Accepts three body types:
+    - application/json with base64 `audio_data` (original contract)
+    - multipart/form-data with the audio in an `audio` file field
+    - application/octet-stream (or audio/*) raw bytes, options in the query string
+
+    The spool is a file object kept in memory up to UPLOAD_SPOOL_MEMORY_LIMIT
+    and rolled over to an anonymous temp file beyond that; the caller closes it.
+    Returns (spool_file, audio_size, options). Raises ValueError for bad input.
+    """
+    if request.is_json:
+        options = request.get_json()
+
+        # Check if audio_data is present
+        if not isinstance(options, dict) or 'audio_data' not in options:
+            raise ValueError('No audio_data provided')
+
+        audio_data = options.pop('audio_data')
+        # Decode base64 audio data
+        try:
+            decoded_audio = base64.b64decode(audio_data)
+            logger.debug("Decoded %d characters of base64 audio into %d bytes", len(audio_data), len(decoded_audio))
+        except Exception as e:
+            logger.error(f"Failed to decode base64 audio: {e}")
+            raise ValueError('Invalid base64 audio data')
+        del audio_data
+
+        return io.BytesIO(decoded_audio), len(decoded_audio), options
+
+    if request.mimetype == 'multipart/form-data':
+        options = request.args.to_dict()
+        options.update(request.form.to_dict())
+        upload = request.files.get('audio')
+        if upload is None:
+            raise ValueError("No audio file provided in the 'audio' form field")
+
+        # Fall back to the uploaded file's extension when no format is given
+        if 'audio_format' not in options and upload.filename and '.' in upload.filename:
+            options['audio_format'] = upload.filename.rsplit('.', 1)[1].lower()
+        source = upload.stream
+    elif request.mimetype == 'application/octet-stream' or request.mimetype.startswith('audio/'):
+        options = request.args.to_dict()
+        source = request.stream
+    else:
+        raise ValueError('Request must be JSON, multipart/form-data or application/octet-stream')
+
+    spool_file = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MEMORY_LIMIT)
+    try:
+        shutil.copyfileobj(source, spool_file, UPLOAD_CHUNK_SIZE)
+        audio_size = spool_file.tell()
+    except Exception:
+        spool_file.close()
+        raise
+
+    if audio_size == 0:
+        spool_file.close()
+        raise ValueError('Uploaded audio is empty')
+
+    spool_file.seek(0)
+    return spool_file, audio_size, options
+
+def engine_timeout(options, limit=None):
+    """Seconds an engine may spend: what is left of the request's budget, at most limit"""
+    deadline = options.get('deadline')
+    if deadline is None:
+        return limit
+    return min(deadline.remaining(), limit) if limit is not None else deadline.remaining()
+
+def run_whisper_engine(prepared_audio, options):
+    """OpenAI Whisper on the (optionally silence-trimmed) normalised WAV"""
+    if not options['trim_silence']:
+        transcription_text, segments = transcribe_with_openai_whisper(
+            prepared_audio.wav_file(), with_segments=True, cancel_event=options.get('cancel_event'),
+            timeout=engine_timeout(options, REPLICATE_TIMEOUT)
+        )
+        return {'transcription': transcription_text, 'segments': segments or None}
+
+    wav_file, time_map, trim_report = trim_silence_for_upload(prepared_audio)
+    transcription_text, whisper_segments = transcribe_with_openai_whisper(
+        wav_file, with_segments=True, cancel_event=options.get('cancel_event'),
+        timeout=engine_timeout(options, REPLICATE_TIMEOUT)
+    )
+    # Put Whisper's timestamps back on the original timeline
+    segments = [
+        {**segment,
+         'start': map_to_original(segment['start'], time_map, CANONICAL_SAMPLE_RATE),
+         'end': map_to_original(segment['end'], time_map, CANONICAL_SAMPLE_RATE)}
+        for segment in whisper_segments
+    ]
+    return {'transcription': transcription_text, 'segments': segments or None, 'silence_trimming': trim_report}
+
+def run_speechbrain_engine(prepared_audio, options):
+    """SpeechBrain on the canonical samples, segmented when the clip is long"""
+    samples = prepared_audio.samples()
+    long_audio = options['long_audio']
+    if long_audio is None:
+        long_audio = len(samples) > LONG_AUDIO_THRESHOLD * CANONICAL_SAMPLE_RATE
+    try:
+        if long_audio:
+            transcription_text, segments = transcribe_long_audio_with_speechbrain(samples, timeout=engine_timeout(options))
+            return {'transcription': transcription_text, 'segments': segments}
+        return {'transcription': transcribe_with_speechbrain(samples, timeout=engine_timeout(options))}
+    except FutureTimeoutError:
+        # The forward pass in progress can't be interrupted, but the request stops waiting for it
+        if options.get('deadline') is None:
+            raise
+        raise DeadlineExceeded('speechbrain', options['deadline'])
+
+def run_google_engine(prepared_audio, options):
+    """Google Speech Recognition on the normalised WAV"""
+    # Google Speech Recognition requires WAV format
+    return {'transcription': transcribe_with_google_fallback(prepared_audio.wav_file(), timeout=engine_timeout(options))}
+
+# Engine name → runner, in the default fallback order
+TRANSCRIPTION_ENGINES = {
+    'openai_whisper': run_whisper_engine,
+    'speechbrain': run_speechbrain_engine,
+    'google_fallback': run_google_engine,
+}
+
+def candidate_engines(transcription_service):
+    """Engines that may serve this request, in the default fallback order"""
+    candidates = []
+    # Whisper is paid, so only used when asked for
+    if transcription_service in ('openai_whisper', 'auto'):
+        if replicate_client.configured:
+            candidates.append('openai_whisper')
+        else:
+            logger.warning("⚠️ Skipping OpenAI Whisper - API token not configured")
+    if speechbrain_model:
+        candidates.append('speechbrain')
+    candidates.append('google_fallback')
+    return candidates
+
+def attempt_engine(engine, prepared_audio, options, clip_seconds, cancel_event=None):
+    """Run one engine within the request's deadline and report its latency and outcome to the router"""
+    logger.debug("🎙️ Trying %s for transcription", engine)
+    prepared_audio.engine_started(engine)
+    start = time.time()
+    try:
+        with options['deadline'].stage(engine):
+            result = TRANSCRIPTION_ENGINES[engine](prepared_audio, {**options, 'cancel_event': cancel_event})
+    except PredictionCancelled:
+        # Lost a hedged race; says nothing about the engine's health
+        logger.info(f"🏁 {engine} cancelled")
+        raise
+    except DeadlineExceeded:
+        # The request ran out of time, which doesn't make the engine unhealthy either
+        logger.warning(f"⏱️ {engine} stopped at the request deadline")
+        raise
+    except Exception as engine_error:
+        # Unintelligible audio is not the engine's fault
+        engine_router.record(engine, clip_seconds, time.time() - start, isinstance(engine_error, sr.UnknownValueError))
+        logger.error(f"❌ {engine} failed: {engine_error}")
+        raise
+    
+    engine_router.record(engine, clip_seconds, time.time() - start, True)
+    result['engine_time'] = round(time.time() - start, 3)
+    return result
+
+def hedge_delay(engine):
+    """Head start the first engine gets before a hedged request starts the second"""
+    if HEDGE_DELAY is not None:
+        return HEDGE_DELAY
+    observed = engine_router.latency_percentile(engine, HEDGE_PERCENTILE)
+    return observed if observed is not None else HEDGE_DEFAULT_DELAY
+
+def fits_deadline(engine, clip_seconds, deadline):
+    """Whether the engine's expected latency fits in the time left; records a skip if not"""
+    expected = engine_router.expected_latency(engine, clip_seconds)
+    if deadline.fits(expected):
+        return True
+    logger.warning(f"⏱️ Skipping {engine}: expected {expected:.1f}s, {deadline.remaining():.1f}s left")
+    deadline.skip(engine, expected)
+    return False
+
+def run_service_chain(prepared_audio, transcription_service, long_audio=None, trim_silence=WHISPER_TRIM_SILENCE,
+                      hedge=HEDGED_REQUESTS, deadline=None):
+    """
+    Try the available engines on prepared audio until one succeeds
+
+    The order comes from the engine router (observed latency for this clip
+    length, error rates, circuit breakers) unless ADAPTIVE_ROUTING is off,
+    in which case it is Whisper → SpeechBrain → Google. With hedge, the
+    first two engines race once the first has had hedge_delay() to answer.
+    Each engine only gets what is left of deadline (REQUEST_DEADLINE by
+    default), and engines not expected to finish in that time are skipped;
+    DeadlineExceeded is raised once the budget is spent.
+
+    Returns {'transcription': text, 'service': engine that produced it,
+    'engine_time': its latency, 'fallback': whether it wasn't the first
+    engine in the chain}, plus 'segments' when the engine reports them (Whisper, or SpeechBrain in
+    long-audio mode) and 'silence_trimming' when Whisper got trimmed audio.
+    long_audio forces long-audio mode on or off; None means clips over
+    LONG_AUDIO_THRESHOLD use it. Raises if every engine fails.
+    """
+    deadline = deadline or Deadline(REQUEST_DEADLINE)
+    options = {'long_audio': long_audio, 'trim_silence': trim_silence, 'deadline': deadline}
+    clip_seconds = len(prepared_audio.samples()) / CANONICAL_SAMPLE_RATE
+    
+    engines = candidate_engines(transcription_service)
+    if ADAPTIVE_ROUTING:
+        engines = engine_router.order(engines, clip_seconds, preferred=transcription_service)
+    first_choice = engines[0]
+    runnable = [engine for engine in engines if fits_deadline(engine, clip_seconds, deadline)]
+    out_of_time = len(runnable) < len(engines)
+    engines = runnable
+    
+    errors = []
+    if hedge and len(engines) >= 2:
+        primary, secondary = engines[0], engines[1]
+        engines = engines[2:]
+        try:
+            winner, result = run_hedged(
+                hedge_executor,
+                lambda engine, cancel_event: attempt_engine(engine, prepared_audio, options, clip_seconds, cancel_event),
+                primary, secondary, hedge_delay(primary), hedge_stats
+            )
+            result['service'] = winner
+            result['fallback'] = winner != first_choice
+            return {key: value for key, value in result.items() if value is not None}
+        except DeadlineExceeded:
+            raise
+        except Exception as engine_error:
+            errors.append(str(engine_error))
+    
+    for engine in engines:
+        if not fits_deadline(engine, clip_seconds, deadline):
+            out_of_time = True
+            continue
+        try:
+            result = attempt_engine(engine, prepared_audio, options, clip_seconds)
+        except DeadlineExceeded:
+            raise
+        except Exception as engine_error:
+            errors.append(str(engine_error))
+            continue
+        
+        result['service'] = engine
+        result['fallback'] = engine != first_choice
+        return {key: value for key, value in result.items() if value is not None}
+    
+    # Provide helpful error message based on the failure
+    if any("Audio file could not be read as PCM WAV" in error for error in errors):
+        raise Exception("Audio format not supported. Please install FFmpeg for M4A support or record in WAV format.")
+    if out_of_time or deadline.expired:
+        # An engine that might have worked was skipped for lack of time, or the last one used it up
+        raise DeadlineExceeded('transcription', deadline)
+    raise Exception("All transcription services failed. Please check your internet connection and try again.")
+
+def persist_transcription(transcription_result):
+    """
+    Reserve an id for a record and wait for the background writer to log it
+
+    Sets the record's 'id' and 'created_at' and returns the name its text
+    view is served under (`/transcriptions/<id>.txt`) once the record is in
+    the log; the store insert follows in the background. Raises
+    QueueFullError when the writer is too far behind.
+    """
+    return persist_transcriptions([transcription_result])[0]
+
+def persist_transcriptions(records):
+    """persist_transcription for several records, queued together and waited for once"""
+    if not records:
+        return []
+    created_at = time.time()
+    first_id = transcription_log.reserve(len(records))
+    for offset, record in enumerate(records):
+        record['created_at'] = created_at
+        record['id'] = first_id + offset
+    persistence_writer.submit_many(records)
+    return [f"{record['id']}.txt" for record in records]
+
+def recover_transcription_store():
+    """
+    Bring the store in line with the log at startup
+
+    A crash between the log append and the store insert leaves records only
+    in the log; they are re-inserted (every record, if the database file was
+    lost). A crash during a clear leaves cleared records in the store.
+    """
+    start = time.time()
+    transcription_log.start_after(transcription_store.max_id())
+    
+    cleared_before = transcription_log.cleared_before()
+    if cleared_before is not None:
+        removed = transcription_store.delete_before(cleared_before)
+        if removed:
+            logger.info(f"📜 Removed {removed} stored transcriptions cleared in the log")
+    
+    start_id = transcription_log.recovery_start_id()
+    if start_id is None:
+        return
+    start_id = min(start_id, (transcription_store.max_id() or 0) + 1)
+    stored_ids = transcription_store.ids_from(start_id)
+    missing = [entry for entry in transcription_log.entries(start_id)
+               if 'op' not in entry and entry['id'] not in stored_ids]
+    if missing:
+        transcription_store.add_many(missing)
+        logger.info(f"📜 Recovered {len(missing)} transcriptions from the log in {time.time() - start:.3f}s")
+
+def rebuild_search_index():
+    """Index every stored transcription (at startup)"""
+    start = time.time()
+    search_index.clear()
+    records = transcription_store.iter_records(fields=SEARCH_FIELDS)
+    document_sessions = set()
+    while True:
+        batch = list(itertools.islice(records, 1000))
+        if not batch:
+            break
+        search_index.add_many([record for record in batch if record.get('text_offset') is None])
+        document_sessions.update(record['session_id'] for record in batch if record.get('text_offset') is not None)
+    index_session_documents(document_sessions, transcription_store.by_session)
+    stats = search_index.stats()
+    logger.info(f"🔎 Search index: {stats['records']} transcriptions, {stats['tokens']} words, "
+                f"built in {time.time() - start:.2f}s")
+
+def sync_search_index():
+    """Index records other workers stored since this one last looked"""
+    start_id = max(search_index.max_id - SEARCH_SYNC_WINDOW, 0) + 1
+    missing = search_index.missing(sorted(transcription_store.ids_from(start_id)))
+    if missing:
+        index_transcriptions(transcription_store.by_ids(missing, SEARCH_FIELDS), transcription_store.by_session)
+
+def format_transcription_file(entry):
+    """Plain-text view of a logged record, in the layout of the old per-transcription .txt files"""
+    lines = []
+    if 'session_id' in entry:
+        lines.append(f"Session ID: {entry['session_id']}")
+    if 'confidence' in entry:
+        lines.append(f"Confidence: {entry['confidence']}")
+    if 'audio_format' in entry:
+        lines.append(f"Audio Format: {entry['audio_format']}")
+    if 'audio_size' in entry:
+        lines.append(f"Audio Size: {entry['audio_size']} bytes")
+    lines.append(f"Transcription Service: {entry['service']}")
+    lines.append(f"Transcription Time: {datetime.fromtimestamp(entry['created_at']).isoformat()}")
+    lines.append(f"Word Count: {entry['word_count']}")
+    lines.append(f"Character Count: {entry['character_count']}")
+    lines.append(f"Transcription:\n{entry['transcription']}")
+    return '\n'.join(lines) + '\n'
+
+def log_stored_transcription(record, transcription_filename):
+    """One summary line per stored transcription; the text itself only at debug level"""
+    logger.info(
+        "📝 Transcription stored: %s (%s, %d words)", transcription_filename, record['service'], record['word_count'],
+        extra={key: record.get(key) for key in ('service', 'session_id', 'word_count', 'character_count', 'engine_time')}
+    )
+    logger.debug("📝 Transcription text: %s", record['transcription'], extra=TRANSCRIPT)
+
+def transcription_record(transcription_text, transcription_service, audio_format, audio_size, timestamp,
+                         engine_time=None, fallback=None):
+    """
+    The record stored for an engine transcription
+
+    engine_time and fallback describe the engine call, when one was made
+    for this request.
+    """
+    return {
+        'timestamp': timestamp,
+        'transcription': transcription_text,
+        'audio_size': audio_size,
+        'audio_format': audio_format,
+        'service': transcription_service,
+        'word_count': len(str(transcription_text).split()),
+        'character_count': len(str(transcription_text)),
+        'engine_time': engine_time,
+        'fallback': fallback
+    }
+
+def record_transcription(transcription_text, transcription_service, audio_format, audio_size, timestamp,
+                         engine_time=None, fallback=None):
+    """
+    Store an engine transcription (see transcription_record)
+
+    Returns (word_count, character_count, transcription_filename).
+    """
+    transcription_result = transcription_record(
+        transcription_text, transcription_service, audio_format, audio_size, timestamp, engine_time, fallback
+    )
+    transcription_filename = persist_transcription(transcription_result)
+    log_stored_transcription(transcription_result, transcription_filename)
+    return transcription_result['word_count'], transcription_result['character_count'], transcription_filename
+
+def transcription_cache_key(prepared_audio, service, long_audio, trim_silence):
+    """Cache key for a transcription of this audio with these request options"""
+    cache_service = f'{service}|trim_silence={trim_silence}'
+    if long_audio is not None:
+        cache_service += f'|long_audio={long_audio}'
+    return make_cache_key(prepared_audio.content_hash(), cache_service, CANONICAL_SAMPLE_RATE)
+
+def process_transcription(audio_source, audio_size, data, temp_files_to_cleanup, wav_file_path=None, started=None):
+    """
+    Run the transcription service chain on spooled audio
+
+    `audio_source` is the spooled upload: a binary file object, or a path for
+    chunked uploads. Shared by /transcribe-audio and the chunked upload
+    finalize endpoint. Returns (response_payload, http_status). Temporary
+    files created along the way are appended to temp_files_to_cleanup for
+    the caller to remove. The request's deadline (data['deadline'] seconds,
+    or REQUEST_DEADLINE) runs from `started` (time.monotonic()), default now;
+    running out of it gives a 504 with the stages that did complete.
+    """
+    audio_format = data.get('audio_format', 'm4a')
+    timestamp = data.get('timestamp', datetime.now().isoformat())
+    
+    try:
+        deadline = Deadline(parse_deadline(data.get('deadline'), REQUEST_DEADLINE, MAX_REQUEST_DEADLINE), started)
+    except ValueError as e:
+        return {
+            'status': 'error',
+            'message': str(e)
+        }, 400
+    if started is not None:
+        deadline.record('upload', deadline.elapsed(), 'ok')
+    
+    # Verify the spooled file exists before proceeding
+    if isinstance(audio_source, str) and not os.path.exists(audio_source):
+        logger.error(f"Transcription file does not exist: {audio_source}")
+        return {
+            'status': 'error',
+            'message': f'Transcription file not found: {audio_source}'
+        }, 500
+    
+    # Decoded at most once, then shared by every engine in the fallback chain
+    prepared_audio = PreparedAudio(audio_source, audio_format, temp_files_to_cleanup, wav_path=wav_file_path)
+    cache_status = 'bypass'
+    
+    try:
+        with deadline.stage('decode'):
+            prepared_audio.samples(timeout=deadline.remaining())
+        
+        # Determine transcription service to use
+        requested_service = data.get('service', 'openai_whisper')
+        logger.debug("Using transcription service: %s", requested_service)
+        
+        long_audio = data.get('long_audio')
+        if long_audio is not None:
+            long_audio = str(long_audio).lower() in ('1', 'true', 'yes')
+        trim_silence = str(data.get('trim_silence', WHISPER_TRIM_SILENCE)).lower() in ('1', 'true', 'yes')
+        hedge = str(data.get('hedge', HEDGED_REQUESTS)).lower() in ('1', 'true', 'yes')
+        
+        # Identical audio + service is answered from the cache (or joins the
+        # in-flight request for it) instead of running the engines again
+        cache_key = None
+        if str(data.get('cache', True)).lower() not in ('false', '0', 'no'):
+            try:
+                cache_key = transcription_cache_key(prepared_audio, requested_service, long_audio, trim_silence)
+            except Exception as hash_error:
+                logger.warning(f"⚠️ Could not hash audio for the transcription cache: {hash_error}")
+        
+        if cache_key:
+            try:
+                cached, cache_status = transcription_cache.get_or_compute(
+                    cache_key,
+                    lambda: run_service_chain(prepared_audio, requested_service, long_audio, trim_silence, hedge, deadline),
+                    timeout=deadline.remaining()
+                )
+            except FutureTimeoutError:
+                cache_status = 'coalesced'
+                raise DeadlineExceeded('cache_wait', deadline)
+        else:
+            cached = run_service_chain(prepared_audio, requested_service, long_audio, trim_silence, hedge, deadline)
+        transcription_text = cached['transcription']
+        transcription_service = cached['service']
+        
+        preparation = prepared_audio.metadata()
+        if preparation['conversions_reused']:
+            logger.info(f"♻️ Converted WAV reused {preparation['conversions_reused']} times, "
+                        f"saved {preparation['conversion_time_saved']}s of conversion")
+    
+        # Cached results were computed for an earlier request, which already counted the engine call
+        engine_call = cached if cache_status in ('miss', 'bypass') else {}
+        word_count, character_count, transcription_filename = record_transcription(
+            transcription_text, transcription_service, audio_format, audio_size, timestamp,
+            engine_call.get('engine_time'), engine_call.get('fallback')
+        )
+    
+        payload = {
+            'status': 'success',
+            'transcription': transcription_text,
+            'word_count': word_count,
+            'character_count': character_count,
+            'audio_size': audio_size,
+            'service': transcription_service,
+            'transcription_file': transcription_filename,
+            'audio_preparation': preparation,
+            'cache': cache_status
+        }
+        for key in ('segments', 'silence_trimming'):
+            if key in cached:
+                payload[key] = cached[key]
+        return payload, 200
+    
+    except DeadlineExceeded as e:
+        logger.warning(f"⏱️ Transcription ran out of time: {e}")
+        return {
+            'status': 'timeout',
+            'message': f'Transcription did not finish within its {deadline.budget:g}s deadline (stopped during {e.stage})',
+            'stage': e.stage,
+            'deadline': deadline.report(),
+            'audio_size': audio_size,
+            'audio_preparation': prepared_audio.metadata(),
+            'cache': cache_status
+        }, 504
+    
+    except QueueFullError as e:
+        logger.warning(f"⚠️ {e}")
+        return {
+            'status': 'error',
+            'message': str(e)
+        }, 503
+    
+    except sr.UnknownValueError:
+        logger.error("Speech recognition could not understand the audio")
+        return {
+            'status': 'error',
+            'message': 'Could not understand the audio. Please try again with clearer speech.'
+        }, 400
+    
+    except sr.RequestError as e:
+        logger.error(f"Could not request results from speech recognition service: {e}")
+        return {
+            'status': 'error',
+            'message': f'Speech recognition service error: {str(e)}'
+        }, 500
+    
+    except Exception as transcription_error:
+        logger.error(f"All transcription services failed: {transcription_error}")
+        return {
+            'status': 'error',
+            'message': f'Transcription failed: {str(transcription_error)}'
+        }, 500
+
+def collect_batch_clips():
+    """
+    Read the clips of a /transcribe-batch request
+
+    Accepts JSON `{"clips": [{"audio_data": <base64>, "audio_format": ...}, ...]}`
+    or multipart/form-data with one `audio` file field per clip. Returns
+    (clips, options) where clips is a list of (file_object, audio_size,
+    audio_format). Raises ValueError for bad input.
+    """
+    clips = []
+    if request.is_json:
+        options = request.get_json()
+        if not isinstance(options, dict) or not isinstance(options.get('clips'), list) or not options['clips']:
+            raise ValueError('No clips provided')
+        default_format = options.get('audio_format', 'm4a')
+        for index, clip in enumerate(options.pop('clips')):
+            if not isinstance(clip, dict) or 'audio_data' not in clip:
+                raise ValueError(f'Clip {index} has no audio_data')
+            try:
+                decoded_audio = base64.b64decode(clip['audio_data'])
+            except Exception:
+                raise ValueError(f'Clip {index} has invalid base64 audio data')
+            clips.append((io.BytesIO(decoded_audio), len(decoded_audio), clip.get('audio_format', default_format)))
+    elif request.mimetype == 'multipart/form-data':
+        options = request.args.to_dict()
+        options.update(request.form.to_dict())
+        for upload in request.files.getlist('audio'):
+            audio_format = options.get('audio_format', 'm4a')
+            if 'audio_format' not in options and upload.filename and '.' in upload.filename:
+                audio_format = upload.filename.rsplit('.', 1)[1].lower()
+            audio_size = upload.stream.seek(0, os.SEEK_END)
+            upload.stream.seek(0)
+            clips.append((upload.stream, audio_size, audio_format))
+        if not clips:
+            raise ValueError("No audio files provided in the 'audio' form field")
+    else:
+        raise ValueError('Request must be JSON or multipart/form-data')
+
+    if len(clips) > MAX_BATCH_CLIPS:
+        raise ValueError(f'Too many clips: {len(clips)} (maximum {MAX_BATCH_CLIPS})')
+    return clips, options
+
+def cleanup_temp_files(temp_files):
+    """Remove temporary files created while handling a request"""
+    for temp_file in temp_files:
+        if not temp_file:
+            continue
+        try:
+            os.unlink(temp_file)
+            logger.debug("✅ Temporary file cleaned up: %s", temp_file)
+        except FileNotFoundError:
+            logger.warning(f"⚠️ Temporary file already deleted: {temp_file}")
+        except Exception as cleanup_error:
+            logger.warning(f"⚠️ Failed to clean up temporary file {temp_file}: {cleanup_error}")
+
+def run_transcription_job(spool_file, audio_size, data):
+    """Worker-side body of an async transcription: transcribe, then clean up"""
+    temp_files_to_cleanup = []
+    try:
+        return process_transcription(spool_file, audio_size, data, temp_files_to_cleanup)
+    finally:
+        spool_file.close()
+        cleanup_temp_files(temp_files_to_cleanup)
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    logger.info("Health check endpoint called")
     return jsonify({
         'status': 'healthy',
         'message': 'Flask server is running with OpenAI Whisper transcription',
         'speechbrain_available': SPEECHBRAIN_AVAILABLE,
-        'replicate_available': REPLICATE_AVAILABLE,
+        'replicate_available': replicate_client.configured,
         'model_loaded': speechbrain_model is not None,
-        'transcription_count': len(transcription_results),
+        'model': model_loader.snapshot(),
+        'transcription_count': transcription_store.count(),
+        'session_cache': session_cache.stats(),
+        'search_index': search_index.stats(),
+        'transcription_log': transcription_log.stats(),
+        'persistence': {**persistence_writer.stats(), 'fsync': PERSISTENCE_FSYNC},
+        'audio_normalisation': normalisation_stats.snapshot(),
+        'silence_trimming': trim_stats.snapshot(),
+        'transcription_cache': transcription_cache.stats(),
+        'jobs': transcription_jobs.stats(),
+        'speechbrain_batching': speechbrain_batcher.stats(),
+        'inference_pool': inference_pool.stats(),
+        'replicate': replicate_client.stats(),
+        'routing': {'adaptive': ADAPTIVE_ROUTING, **engine_router.snapshot()},
+        'hedging': {
+            'enabled': HEDGED_REQUESTS,
+            **hedge_stats.snapshot(lambda engine, fraction: engine_router.latency_percentile(engine, fraction) or 0.0)
+        },
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 until then"""
+    model = model_loader.snapshot()
+    if not model['ready']:
+        return jsonify({'status': 'not_ready', 'model': model}), 503
+    return jsonify({'status': 'ready', 'model': model})
+
 @app.route('/transcribe-audio', methods=['POST'])
 def transcribe_audio():
     """Transcribe audio files using OpenAI Whisper"""
-    logger.info("=== OPENAI WHISPER TRANSCRIPTION REQUEST STARTED ===")
+    logger.debug("=== OPENAI WHISPER TRANSCRIPTION REQUEST STARTED ===")
     
     # Track all temporary files for cleanup
     temp_files_to_cleanup = []
+    spool_file = None
+    # The request's deadline includes the time spent receiving the upload
+    request_started = time.monotonic()
     
     try:
-        # Check if request is JSON
-        if not request.is_json:
-            logger.error("Request is not JSON")
+        # Spool the upload (JSON base64, multipart or raw bytes)
+        try:
+            spool_file, audio_size, data = spool_audio_upload()
+        except RequestEntityTooLarge:
+            logger.error("Audio upload exceeds MAX_AUDIO_UPLOAD_SIZE")
             return jsonify({
                 'status': 'error',
-                'message': 'Request must be JSON'
-            }), 400
-        
-        data = request.get_json()
-        
-        # Check if audio_data is present
-        if 'audio_data' not in data:
-            logger.error("No audio_data found in request")
+                'message': f'Audio upload is larger than {MAX_AUDIO_UPLOAD_SIZE} bytes'
+            }), 413
+        except ValueError as e:
+            logger.error(f"Invalid audio upload: {e}")
             return jsonify({
                 'status': 'error',
-                'message': 'No audio_data provided'
+                'message': str(e)
             }), 400
         
-        audio_data = data['audio_data']
         audio_format = data.get('audio_format', 'm4a')
         timestamp = data.get('timestamp', datetime.now().isoformat())
         
-        logger.info(f"Received audio data length: {len(audio_data)}")
-        logger.info(f"Audio format: {audio_format}")
-        logger.info(f"Timestamp: {timestamp}")
+        logger.debug("Spooled %d bytes of %s audio (timestamp %s)", audio_size, audio_format, timestamp)
         
-        # Decode base64 audio data
-        logger.info("Decoding base64 audio data...")
-        try:
-            decoded_audio = base64.b64decode(audio_data)
-            logger.info(f"Decoded audio size: {len(decoded_audio)} bytes")
-        except Exception as e:
-            logger.error(f"Failed to decode base64 audio: {e}")
+        # Async mode: hand the spooled audio to the worker pool and return at once
+        if str(request.args.get('async', data.get('async', ''))).lower() in ('1', 'true', 'yes'):
+            try:
+                job = transcription_jobs.submit(run_transcription_job, spool_file, audio_size, data)
+            except QueueFullError as e:
+                logger.warning(f"⚠️ {e}")
+                return jsonify({
+                    'status': 'error',
+                    'message': str(e)
+                }), 503, {'Retry-After': '5'}
+            
+            spool_file = None  # Now owned by the job
             return jsonify({
-                'status': 'error',
-                'message': 'Invalid base64 audio data'
-            }), 400
+                'status': 'queued',
+                'job_id': job.job_id,
+                'status_url': f'/jobs/{job.job_id}',
+                'queue_depth': transcription_jobs.stats()['queue_depth']
+            }), 202
         
-        # Create temporary files for transcription
-        logger.info("Creating temporary audio files for transcription...")
-        temp_file_path = None
-        wav_file_path = None
-        transcription_file_path = None
+        payload, status_code = process_transcription(
+            spool_file, audio_size, data, temp_files_to_cleanup, started=request_started
+        )
+        return jsonify(payload), status_code
+    
+    except Exception as e:
+        logger.error(f"Unexpected error during transcription: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Unexpected error: {str(e)}'
+        }), 500
+    
+    finally:
+        # Clean up the spool and all temporary files at the very end
+        if spool_file is not None:
+            spool_file.close()
+        cleanup_temp_files(temp_files_to_cleanup)
         
-        try:
-            # Create temporary file with original format first
-            with tempfile.NamedTemporaryFile(suffix=f'.{audio_format}', delete=False) as temp_file:
-                temp_file.write(decoded_audio)
-                temp_file_path = temp_file.name
-                temp_files_to_cleanup.append(temp_file_path)
-            
-            logger.info(f"Temporary file created: {temp_file_path}")
-            logger.info(f"Temporary file absolute path: {os.path.abspath(temp_file_path)}")
-            
-            # Convert to WAV format for optimal Whisper performance
-            if audio_format.lower() != 'wav':
-                logger.info("🔄 Converting audio to WAV format for optimal Whisper performance...")
-                try:
-                    wav_file_path = convert_audio_format(temp_file_path, 'wav')
-                    if wav_file_path != temp_file_path:  # Only add if it's a new file
-                        temp_files_to_cleanup.append(wav_file_path)
-                    transcription_file_path = wav_file_path
-                    logger.info(f"WAV file created: {wav_file_path}")
-                except Exception as conversion_error:
-                    logger.error(f"❌ Audio conversion failed: {conversion_error}")
-                    logger.warning("⚠️ Using original file format for transcription")
-                    transcription_file_path = temp_file_path
-            else:
-                transcription_file_path = temp_file_path
-                wav_file_path = None
-                
-        except Exception as e:
-            logger.error(f"Failed to create temporary audio file: {e}")
+        logger.debug("=== OPENAI WHISPER TRANSCRIPTION REQUEST COMPLETED ===")
+
+@app.route('/transcribe-batch', methods=['POST'])
+def transcribe_batch():
+    """Transcribe many clips with SpeechBrain, several per forward pass"""
+    logger.debug("=== BATCH TRANSCRIPTION REQUEST STARTED ===")
+    
+    temp_files_to_cleanup = []
+    clips = []
+    
+    try:
+        if not speechbrain_model:
             return jsonify({
                 'status': 'error',
-                'message': f'Failed to process audio file: {str(e)}'
-            }), 500
+                'message': 'SpeechBrain model not available'
+            }), 503
         
-        # Verify transcription file exists before proceeding
-        if not os.path.exists(transcription_file_path):
-            logger.error(f"Transcription file does not exist: {transcription_file_path}")
+        try:
+            clips, data = collect_batch_clips()
+        except RequestEntityTooLarge:
+            logger.error("Batch upload exceeds MAX_AUDIO_UPLOAD_SIZE")
+            return jsonify({
+                'status': 'error',
+                'message': f'Batch upload is larger than {MAX_AUDIO_UPLOAD_SIZE} bytes'
+            }), 413
+        except ValueError as e:
+            logger.error(f"Invalid batch upload: {e}")
             return jsonify({
                 'status': 'error',
-                'message': f'Transcription file not found: {transcription_file_path}'
-            }), 500
+                'message': str(e)
+            }), 400
         
-        logger.info(f"✅ Transcription file verified: {transcription_file_path}")
+        logger.info(f"📦 Batch of {len(clips)} clips received")
+        timestamp = data.get('timestamp', datetime.now().isoformat())
+        use_cache = str(data.get('cache', True)).lower() not in ('false', '0', 'no')
+        start = time.time()
         
-        try:
-            # Determine transcription service to use
-            transcription_service = data.get('service', 'openai_whisper')
-            logger.info(f"Using transcription service: {transcription_service}")
-            
-            transcription_text = None
-            
-            # Check if Replicate API token is available
-            replicate_token_available = os.environ.get('REPLICATE_API_TOKEN') is not None
-            if not replicate_token_available:
-                logger.warning("⚠️ REPLICATE_API_TOKEN not set - OpenAI Whisper will be skipped")
-            
-            # Try OpenAI Whisper first (only if token is available)
-            if transcription_service == 'openai_whisper' and REPLICATE_AVAILABLE and replicate_token_available:
-                try:
-                    logger.info("🤖 Using OpenAI Whisper for transcription...")
-                    transcription_text = transcribe_with_openai_whisper(transcription_file_path)
-                    transcription_service = 'openai_whisper'
-                except Exception as whisper_error:
-                    logger.error(f"❌ OpenAI Whisper failed: {whisper_error}")
-                    logger.info("🔄 Falling back to other services...")
-            elif transcription_service == 'openai_whisper' and not replicate_token_available:
-                logger.warning("⚠️ Skipping OpenAI Whisper - API token not configured")
-                logger.info("🔄 Falling back to other services...")
-            
-            # Try SpeechBrain if Whisper failed or was not requested
-            if transcription_text is None and speechbrain_model:
-                try:
-                    logger.info("🧠 Using SpeechBrain for transcription...")
-                    # For SpeechBrain, we might need a different WAV conversion
-                    if audio_format.lower() != 'wav':
-                        logger.info("🔄 Converting audio to WAV format for SpeechBrain...")
-                        try:
-                            sb_wav_file_path = convert_audio_format(temp_file_path, 'wav')
-                            if sb_wav_file_path != temp_file_path:
-                                temp_files_to_cleanup.append(sb_wav_file_path)
-                            transcription_text = transcribe_with_speechbrain(sb_wav_file_path)
-                        except Exception as sb_conversion_error:
-                            logger.error(f"❌ SpeechBrain WAV conversion failed: {sb_conversion_error}")
-                            # Try with original file if conversion fails
-                            transcription_text = transcribe_with_speechbrain(temp_file_path)
-                    else:
-                        transcription_text = transcribe_with_speechbrain(temp_file_path)
-                    transcription_service = 'speechbrain'
-                except Exception as sb_error:
-                    logger.error(f"❌ SpeechBrain failed: {sb_error}")
-                    logger.info("🔄 Falling back to Google Speech Recognition...")
-            
-            # Try Google Speech Recognition as final fallback
-            if transcription_text is None:
-                try:
-                    logger.info("🔄 Using Google Speech Recognition fallback...")
-                    # Google Speech Recognition requires WAV format, so try to convert if needed
-                    google_audio_path = temp_file_path
-                    if audio_format.lower() != 'wav':
-                        logger.info("🔄 Converting audio to WAV format for Google Speech Recognition...")
-                        try:
-                            google_wav_file_path = convert_audio_format(temp_file_path, 'wav')
-                            if google_wav_file_path != temp_file_path:
-                                temp_files_to_cleanup.append(google_wav_file_path)
-                                google_audio_path = google_wav_file_path
-                        except Exception as google_conversion_error:
-                            logger.error(f"❌ Google Speech Recognition WAV conversion failed: {google_conversion_error}")
-                            logger.warning("⚠️ Trying Google Speech Recognition with original format...")
-                    
-                    transcription_text = transcribe_with_google_fallback(google_audio_path)
-                    transcription_service = 'google_fallback'
-                except Exception as google_error:
-                    logger.error(f"❌ Google Speech Recognition failed: {google_error}")
-                    
-                    # Provide helpful error message based on the failure
-                    if "Audio file could not be read as PCM WAV" in str(google_error):
-                        error_msg = "Audio format not supported. Please install FFmpeg for M4A support or record in WAV format."
-                    else:
-                        error_msg = "All transcription services failed. Please check your internet connection and try again."
-                    
-                    raise Exception(error_msg)
-            
-            if transcription_text is None:
-                raise Exception("No transcription service succeeded")
-            
-            # Store transcription in global variable
-            transcription_result = {
-                'timestamp': timestamp,
-                'transcription': transcription_text,
-                'audio_size': len(decoded_audio),
-                'service': transcription_service,
-                'word_count': len(str(transcription_text).split()),
-                'character_count': len(str(transcription_text))
-            }
-            
-            transcription_results.append(transcription_result)
-            logger.info(f"📝 Transcription stored in memory: {transcription_text}")
-            
-            # Calculate word and character counts
-            word_count = transcription_result['word_count']
-            character_count = transcription_result['character_count']
-            
-            logger.info(f"Word count: {word_count}")
-            logger.info(f"Character count: {character_count}")
-            
-            # Save transcription to file
-            service_name = transcription_service.replace('_', '_')
-            transcription_filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{service_name}_transcription.txt"
-            transcription_path = os.path.join(TRANSCRIPTIONS_FOLDER, transcription_filename)
-            
-            with open(transcription_path, 'w', encoding='utf-8') as f:
-                f.write(f"Audio Format: {audio_format}\n")
-                f.write(f"Audio Size: {len(decoded_audio)} bytes\n")
-                f.write(f"Transcription Service: {transcription_service}\n")
-                f.write(f"Transcription Time: {datetime.now().isoformat()}\n")
-                f.write(f"Word Count: {word_count}\n")
-                f.write(f"Character Count: {character_count}\n")
-                f.write(f"Transcription:\n{transcription_text}\n")
-            
-            logger.info(f"Transcription saved to: {transcription_path}")
+        # Decode every clip; clips that fail are reported without failing the batch
+        results = [None] * len(clips)
+        cache_keys = [None] * len(clips)
+        pending = []
+        for index, (source, audio_size, audio_format) in enumerate(clips):
+            try:
+                prepared_audio = PreparedAudio(source, audio_format, temp_files_to_cleanup)
+                samples = prepared_audio.samples()
+            except Exception as e:
+                logger.error(f"❌ Clip {index} could not be decoded: {e}")
+                results[index] = {'index': index, 'status': 'error', 'message': f'Could not decode audio: {str(e)}'}
+                continue
             
-            return jsonify({
+            if use_cache:
+                # Keyed as /transcribe-audio keys service=speechbrain with default options, so the two share entries
+                # (clips over LONG_AUDIO_THRESHOLD are decoded whole here, as with long_audio=false)
+                long_audio = None if len(samples) <= LONG_AUDIO_THRESHOLD * CANONICAL_SAMPLE_RATE else False
+                cache_keys[index] = transcription_cache_key(prepared_audio, 'speechbrain', long_audio, WHISPER_TRIM_SILENCE)
+                cached = transcription_cache.get(cache_keys[index])
+                if cached is not None:
+                    results[index] = {'index': index, 'transcription': cached['transcription'],
+                                      'service': cached['service'], 'cache': 'hit'}
+                    continue
+            pending.append((index, samples))
+        
+        if pending:
+            logger.info(f"🧠 Decoding {len(pending)} clips in batches of up to {SPEECHBRAIN_MAX_BATCH_SIZE}...")
+            texts = run_speechbrain_batches([samples for _, samples in pending])
+            for (index, _), text in zip(pending, texts):
+                if cache_keys[index]:
+                    transcription_cache.put(cache_keys[index], {'transcription': text, 'service': 'speechbrain'})
+                results[index] = {'index': index, 'transcription': text, 'service': 'speechbrain',
+                                  'cache': 'miss' if use_cache else 'bypass'}
+        
+        # Every clip is queued for the writer at once, so the batch waits for one log append, not one per clip
+        stored = [result for result in results if result.get('status') != 'error']
+        records = [transcription_record(result['transcription'], result['service'], clips[result['index']][2],
+                                        clips[result['index']][1], timestamp)
+                   for result in stored]
+        for result, record, transcription_filename in zip(stored, records, persist_transcriptions(records)):
+            log_stored_transcription(record, transcription_filename)
+            result.update({
                 'status': 'success',
-                'transcription': transcription_text,
-                'word_count': word_count,
-                'character_count': character_count,
-                'audio_size': len(decoded_audio),
-                'service': transcription_service,
+                'word_count': record['word_count'],
+                'character_count': record['character_count'],
+                'audio_size': record['audio_size'],
                 'transcription_file': transcription_filename
             })
+        
+        succeeded = sum(1 for result in results if result['status'] == 'success')
+        processing_time = time.time() - start
+        logger.info(f"✅ Batch finished: {succeeded}/{len(clips)} clips in {processing_time:.2f}s")
+        
+        return jsonify({
+            'status': 'success' if succeeded else 'error',
+            'results': results,
+            'count': len(results),
+            'succeeded': succeeded,
+            'processing_time': round(processing_time, 3)
+        }), 200 if succeeded else 400
+    
+    except QueueFullError as e:
+        logger.warning(f"⚠️ {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 503, {'Retry-After': '5'}
+    
+    except Exception as e:
+        logger.error(f"Unexpected error during batch transcription: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Unexpected error: {str(e)}'
+        }), 500
+    
+    finally:
+        for source, _, _ in clips:
+            source.close()
+        cleanup_temp_files(temp_files_to_cleanup)
+        logger.debug("=== BATCH TRANSCRIPTION REQUEST COMPLETED ===")
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Report the state of an async transcription job, with its result once done"""
+    job = transcription_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Job not found: {job_id}'
+        }), 404
+    
+    return jsonify({'status': 'success', 'job': job.to_dict()})
+
+@app.route('/uploads', methods=['POST'])
+def create_upload():
+    """Start a resumable chunked upload session"""
+    options = request.get_json(silent=True) or {}
+    if not isinstance(options, dict):
+        return jsonify({
+            'status': 'error',
+            'message': 'Upload options must be a JSON object'
+        }), 400
+    
+    session = upload_sessions.create(options)
+    logger.info(f"📦 Upload session created: {session.upload_id}")
+    
+    return jsonify({'status': 'success', **session.to_dict()}), 201
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Report how much of an upload has arrived, so clients can resume"""
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Upload session not found: {upload_id}'
+        }), 404
+    
+    return jsonify({'status': 'success', **session.to_dict()})
+
+@app.route('/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def append_upload_chunk(upload_id, index):
+    """Append chunk `index` (raw request body) to an upload session"""
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Upload session not found: {upload_id}'
+        }), 404
+    
+    if request.content_length is not None and request.content_length > MAX_UPLOAD_CHUNK_SIZE:
+        return jsonify({
+            'status': 'error',
+            'message': f'Chunk is larger than {MAX_UPLOAD_CHUNK_SIZE} bytes'
+        }), 413
+    
+    chunk = request.get_data(cache=False)
+    if not chunk:
+        return jsonify({
+            'status': 'error',
+            'message': 'Chunk is empty'
+        }), 400
+    
+    try:
+        written = session.append_chunk(index, chunk)
+    except LookupError as e:
+        # Expired, finalized or aborted while the chunk was arriving
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 404
+    except ValueError as e:
+        logger.warning(f"📦 Out-of-order chunk for {upload_id}: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            **session.to_dict()
+        }), 409
+    
+    if written:
+        logger.debug("📦 Chunk %d stored for %s (%d bytes)", index, upload_id, len(chunk))
+    else:
+        logger.debug("📦 Chunk %d already stored for %s, acknowledging retry", index, upload_id)
+    
+    return jsonify({'status': 'success', 'duplicate': not written, **session.to_dict()})
+
+@app.route('/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    """Finish an upload session and transcribe the assembled audio"""
+    logger.debug("=== CHUNKED UPLOAD FINALIZE STARTED (%s) ===", upload_id)
+    
+    session = upload_sessions.pop(upload_id)
+    if session is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Upload session not found: {upload_id}'
+        }), 404
+    
+    # The spool file and streamed WAV are removed by session.discard()
+    temp_files_to_cleanup = []
+    
+    try:
+        # Wait for any chunk that is still being written
+        with session.lock:
+            if session.received_bytes == 0:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'No audio chunks were uploaded'
+                }), 400
             
-        except sr.UnknownValueError:
-            logger.error("Speech recognition could not understand the audio")
-            return jsonify({
-                'status': 'error',
-                'message': 'Could not understand the audio. Please try again with clearer speech.'
-            }), 400
+            # Options sent at finalize (e.g. a later timestamp) override creation options
+            session.options.update(request.get_json(silent=True) or {})
             
-        except sr.RequestError as e:
-            logger.error(f"Could not request results from speech recognition service: {e}")
-            return jsonify({
-                'status': 'error',
-                'message': f'Speech recognition service error: {str(e)}'
-            }), 500
+            wav_file_path = session.finish_conversion(STREAMING_CONVERSION_TIMEOUT)
+            if wav_file_path:
+                logger.info(f"✅ Streaming conversion finished: {wav_file_path}")
         
-        except Exception as transcription_error:
-            logger.error(f"All transcription services failed: {transcription_error}")
-            return jsonify({
-                'status': 'error',
-                'message': f'Transcription failed: {str(transcription_error)}'
-            }), 500
+        payload, status_code = process_transcription(
+            session.spool_path, session.received_bytes, session.options,
+            temp_files_to_cleanup, wav_file_path=wav_file_path
+        )
+        payload['upload_id'] = upload_id
+        return jsonify(payload), status_code
     
     except Exception as e:
-        logger.error(f"Unexpected error during transcription: {str(e)}")
+        logger.error(f"Unexpected error during chunked upload finalize: {str(e)}")
         return jsonify({
             'status': 'error',
             'message': f'Unexpected error: {str(e)}'
         }), 500
     
     finally:
-        # Clean up all temporary files at the very end
-        logger.info("🧹 Cleaning up temporary files...")
-        for temp_file in temp_files_to_cleanup:
-            try:
-                if temp_file and os.path.exists(temp_file):
-                    os.unlink(temp_file)
-                    logger.info(f"✅ Temporary file cleaned up: {temp_file}")
-                elif temp_file:
-                    logger.warning(f"⚠️ Temporary file already deleted: {temp_file}")
-            except Exception as cleanup_error:
-                logger.warning(f"⚠️ Failed to clean up temporary file {temp_file}: {cleanup_error}")
+        session.discard()
+        cleanup_temp_files(temp_files_to_cleanup)
+        logger.debug("=== CHUNKED UPLOAD FINALIZE COMPLETED (%s) ===", upload_id)
+
+@app.route('/uploads/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    """Abandon an upload session and delete its data"""
+    session = upload_sessions.pop(upload_id)
+    if session is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Upload session not found: {upload_id}'
+        }), 404
+    
+    with session.lock:
+        session.discard()
+    logger.info(f"📦 Upload session aborted: {upload_id}")
+    
+    return jsonify({'status': 'success', 'message': 'Upload session aborted'})
+
+def update_session_document(session_id, mode, text, text_offset, timestamp, confidence):
+    """
+    Apply an upsert or delta save to a session's document
+
+    Only the changed text is stored. Returns (response_payload, http_status);
+    a delta whose offset is past the end of the document gets 409 with the
+    current document_length, so the client can resend from there.
+    """
+    if mode == 'delta' and (not isinstance(text_offset, int) or isinstance(text_offset, bool) or text_offset < 0):
+        return {
+            'status': 'error',
+            'message': 'text_offset must be a non-negative integer for delta saves'
+        }, 400
+    
+    with document_locks.hold(session_id):
+        # The document as of every save this worker has queued
+        persistence_writer.barrier(PERSISTENCE_READ_TIMEOUT)
+        document, updates = rebuild_document(session_cache.get(session_id))
+        document = document or ''
         
-        logger.info("=== OPENAI WHISPER TRANSCRIPTION REQUEST COMPLETED ===")
+        if mode == 'upsert':
+            change = upsert_delta(document, text)
+        elif text_offset > len(document):
+            return {
+                'status': 'error',
+                'message': f'text_offset {text_offset} is past the end of the document',
+                'session_id': session_id,
+                'document_length': len(document)
+            }, 409
+        elif document[text_offset:] == text:
+            change = None  # Re-sent delta, already applied
+        else:
+            change = text_offset, text
+        
+        transcription_filename = None
+        if change is not None:
+            offset, delta = change
+            transcription_filename = persist_transcription({
+                'timestamp': timestamp,
+                'transcription': delta,
+                'session_id': session_id,
+                'confidence': confidence,
+                'service': 'browser_speech_recognition',
+                'word_count': len(delta.split()),
+                'character_count': len(delta),
+                'text_offset': offset
+            })
+            document = document[:offset] + delta
+            updates += 1
+    
+    stored = len(change[1]) if change else 0
+    logger.debug("📝 Session %s document: %d characters stored, now %d long", session_id, stored, len(document))
+    summary = document_summary(document, updates)
+    return {
+        'status': 'success',
+        'mode': mode,
+        'session_id': session_id,
+        'confidence': confidence,
+        'text_offset': change[0] if change else len(document),
+        'stored_characters': stored,
+        'document_length': summary['character_count'],
+        'word_count': summary['word_count'],
+        'character_count': summary['character_count'],
+        'transcription_file': transcription_filename,
+        'message': 'Transcription saved successfully' if change else 'Transcription already up to date'
+    }, 200
 
 @app.route('/save-transcription', methods=['POST'])
 def save_transcription():
     """Save transcription text from browser Speech Recognition API"""
-    logger.info("=== SAVE TRANSCRIPTION REQUEST STARTED ===")
+    logger.debug("=== SAVE TRANSCRIPTION REQUEST STARTED ===")
     
     try:
         # Check if request is JSON
@@ -560,12 +1561,27 @@ def save_transcription():
         timestamp = data.get('timestamp', datetime.now().isoformat())
         session_id = data.get('session_id', 'default')
         confidence = data.get('confidence', 0.0)
+        mode = data.get('mode', 'append')
         
-        logger.info(f"Received transcription: {transcription_text[:50]}...")
-        logger.info(f"Session ID: {session_id}")
-        logger.info(f"Confidence: {confidence}")
+        logger.debug("Received %s save for session %s (confidence %s)", mode, session_id, confidence)
         
-        # Store transcription in global variable
+        if mode not in SAVE_MODES:
+            return jsonify({
+                'status': 'error',
+                'message': f"mode must be one of {', '.join(SAVE_MODES)}"
+            }), 400
+        if not isinstance(transcription_text, str):
+            return jsonify({
+                'status': 'error',
+                'message': 'transcription must be a string'
+            }), 400
+        if mode != 'append':
+            payload, status = update_session_document(
+                session_id, mode, transcription_text, data.get('text_offset'), timestamp, confidence
+            )
+            return jsonify(payload), status
+        
+        # Queue the transcription for the log and the transcription store
         transcription_result = {
             'timestamp': timestamp,
             'transcription': transcription_text,
@@ -576,31 +1592,11 @@ def save_transcription():
             'character_count': len(str(transcription_text))
         }
         
-        transcription_results.append(transcription_result)
-        logger.info(f"📝 Transcription stored in memory: {transcription_text}")
-        
-        # Calculate word and character counts
+        transcription_filename = persist_transcription(transcription_result)
+        log_stored_transcription(transcription_result, transcription_filename)
         word_count = transcription_result['word_count']
         character_count = transcription_result['character_count']
         
-        logger.info(f"Word count: {word_count}")
-        logger.info(f"Character count: {character_count}")
-        
-        # Save transcription to file
-        transcription_filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_browser_transcription.txt"
-        transcription_path = os.path.join(TRANSCRIPTIONS_FOLDER, transcription_filename)
-        
-        with open(transcription_path, 'w', encoding='utf-8') as f:
-            f.write(f"Session ID: {session_id}\n")
-            f.write(f"Confidence: {confidence}\n")
-            f.write(f"Service: Browser Speech Recognition\n")
-            f.write(f"Transcription Time: {datetime.now().isoformat()}\n")
-            f.write(f"Word Count: {word_count}\n")
-            f.write(f"Character Count: {character_count}\n")
-            f.write(f"Transcription:\n{transcription_text}\n")
-        
-        logger.info(f"Transcription saved to: {transcription_path}")
-        
         return jsonify({
             'status': 'success',
             'transcription': transcription_text,
@@ -612,6 +1608,13 @@ def save_transcription():
             'message': 'Transcription saved successfully'
         })
         
+    except QueueFullError as e:
+        logger.warning(f"⚠️ {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 503, {'Retry-After': '5'}
+    
     except Exception as e:
         logger.error(f"Unexpected error during transcription save: {str(e)}")
         return jsonify({
@@ -620,28 +1623,174 @@ def save_transcription():
         }), 500
     
     finally:
-        logger.info("=== SAVE TRANSCRIPTION REQUEST COMPLETED ===")
+        logger.debug("=== SAVE TRANSCRIPTION REQUEST COMPLETED ===")
+
+def parse_listing_args():
+    """
+    Read limit/after/fields from the query string
+
+    Returns (limit, after, fields); limit and fields are None when not given.
+    Raises ValueError for bad values.
+    """
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    fields = request.args.get('fields')
+    try:
+        limit = int(limit) if limit else None
+        after = int(after) if after else None
+    except ValueError:
+        raise ValueError('limit and after must be integers')
+    if limit is not None and limit < 1:
+        raise ValueError('limit must be at least 1')
+    if fields:
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+    return limit, after, fields or None
 
 @app.route('/transcriptions', methods=['GET'])
 def get_transcriptions():
-    """Get all stored transcriptions"""
-    logger.info("Retrieving stored transcriptions...")
+    """
+    Get stored transcriptions, oldest first, a page at a time
+
+    `limit` (default TRANSCRIPTIONS_PAGE_SIZE) and `after` (the previous
+    page's next_cursor) page through the store, and `fields` (comma
+    separated) picks the columns returned. With `Accept: application/x-ndjson`
+    the records after `after` (all of them unless `limit` is given) are
+    streamed one JSON object per line instead.
+    """
+    logger.debug("Retrieving stored transcriptions")
+    persistence_writer.barrier(PERSISTENCE_READ_TIMEOUT)
+    try:
+        limit, after, fields = parse_listing_args()
+        if request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson':
+            records = transcription_store.iter_records(after, fields, limit)
+            lines = (json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+            return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+        
+        limit = min(limit or TRANSCRIPTIONS_PAGE_SIZE, MAX_TRANSCRIPTIONS_PAGE_SIZE)
+        transcriptions, next_cursor = transcription_store.page(limit, after, fields)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    
     return jsonify({
         'status': 'success',
-        'transcriptions': transcription_results,
-        'count': len(transcription_results)
+        'transcriptions': transcriptions,
+        'count': len(transcriptions),
+        'next_cursor': next_cursor
     })
 
 @app.route('/transcriptions/<filename>')
 def transcription_file(filename):
+    """A transcription as text: `<id>.txt` is rendered from the log, older files are served from disk"""
+    match = re.fullmatch(r'(\d+)\.txt', filename)
+    if match:
+        persistence_writer.barrier(PERSISTENCE_READ_TIMEOUT)
+        entry = transcription_log.get(int(match.group(1)))
+        if entry is None or 'op' in entry:
+            return jsonify({
+                'status': 'error',
+                'message': 'Transcription not found'
+            }), 404
+        return Response(format_transcription_file(entry), mimetype='text/plain')
+    if not LEGACY_TRANSCRIPTION_FILE.fullmatch(filename):
+        return jsonify({
+            'status': 'error',
+            'message': 'Transcription not found'
+        }), 404
     return send_from_directory(TRANSCRIPTIONS_FOLDER, filename)
 
+@app.route('/search', methods=['GET'])
+def search_transcriptions():
+    """
+    Full-text search over stored transcriptions, oldest match first
+
+    `q` holds the words to find (all of them must occur): "quoted words"
+    must appear as a phrase and `word*` matches by prefix. `session_id` and
+    `service` narrow the search; `limit`, `after` and `fields` work as for
+    GET /transcriptions. A session saved as deltas matches as a whole: its
+    latest delta record is returned with the session's document (as of that
+    record) as its transcription, word_count and character_count.
+    """
+    query = request.args.get('q', '')
+    logger.debug("Searching transcriptions for %r", query, extra=TRANSCRIPT)
+    persistence_writer.barrier(PERSISTENCE_READ_TIMEOUT)
+    try:
+        limit, after, fields = parse_listing_args()
+        sync_search_index()
+        ids, more = search_index.search(
+            query, request.args.get('session_id'), request.args.get('service'),
+            after, min(limit or SEARCH_PAGE_SIZE, MAX_TRANSCRIPTIONS_PAGE_SIZE)
+        )
+        results = transcription_store.by_ids(ids, fields)
+        document_sessions = search_index.document_sessions(ids)
+        for record in results:
+            session_id = document_sessions.get(record['id'])
+            if session_id is not None:
+                # Matched the session's document as of this save, not just the text of the save
+                text, updates = rebuild_document(
+                    [entry for entry in session_cache.get(session_id) if entry['id'] <= record['id']]
+                )
+                summary = document_summary(text or '', updates)
+                for field in ('transcription', 'word_count', 'character_count'):
+                    if field in record:
+                        record[field] = summary['text' if field == 'transcription' else field]
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    
+    return jsonify({
+        'status': 'success',
+        'query': query,
+        'results': results,
+        'count': len(results),
+        'next_cursor': ids[-1] if more else None
+    })
+
+@app.route('/stats', methods=['GET'])
+def usage_stats():
+    """
+    Usage figures from rollups kept up to date as transcriptions are stored
+
+    Totals, per-service figures with fallback rates and engine latency
+    histograms, the last `hours` calendar hours and `days` calendar days
+    (UTC, zeros where nothing was stored), and with `session_id`, that
+    session's totals; a session edited through delta saves counts once. The cost does not depend on
+    how many transcriptions are stored.
+    """
+    try:
+        hours = int(request.args.get('hours', STATS_HOURS))
+        days = int(request.args.get('days', STATS_DAYS))
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'hours and days must be integers'
+        }), 400
+    if not (0 <= hours <= MAX_STATS_HOURS and 0 <= days <= MAX_STATS_DAYS):
+        return jsonify({
+            'status': 'error',
+            'message': f'hours must be 0-{MAX_STATS_HOURS} and days 0-{MAX_STATS_DAYS}'
+        }), 400
+    
+    persistence_writer.barrier(PERSISTENCE_READ_TIMEOUT)
+    return jsonify({
+        'status': 'success',
+        **transcription_store.rollups(hours, days, request.args.get('session_id'))
+    })
+
 @app.route('/clear-transcriptions', methods=['POST'])
 def clear_transcriptions():
     """Clear all stored transcriptions"""
-    global transcription_results
-    transcription_results.clear()
-    logger.info("All transcriptions cleared from memory")
+    persistence_writer.barrier(PERSISTENCE_READ_TIMEOUT)
+    transcription_log.clear()
+    transcription_store.clear()
+    session_cache.clear()
+    search_index.clear()
+    transcription_cache.clear()
+    logger.info("All transcriptions cleared from the store")
     return jsonify({
         'status': 'success',
         'message': 'All transcriptions cleared'
@@ -649,27 +1798,36 @@ def clear_transcriptions():
 
 @app.route('/transcriptions/session/<session_id>', methods=['GET'])
 def get_session_transcriptions(session_id):
-    """Get transcriptions for a specific session"""
-    session_transcriptions = [
-        t for t in transcription_results 
-        if t.get('session_id') == session_id
-    ]
-    return jsonify({
+    """Get transcriptions for a specific session, and its document if it was saved as deltas"""
+    persistence_writer.barrier(PERSISTENCE_READ_TIMEOUT)
+    session_transcriptions = session_cache.get(session_id)
+    response = {
         'status': 'success',
         'session_id': session_id,
         'transcriptions': session_transcriptions,
         'count': len(session_transcriptions)
-    })
+    }
+    document, updates = rebuild_document(session_transcriptions)
+    if document is not None:
+        response['document'] = document_summary(document, updates)
+    return jsonify(response)
+
+# Re-apply anything the store missed before the last shutdown (each worker runs this; it is idempotent)
+recover_transcription_store()
+rebuild_search_index()
 
 if __name__ == '__main__':
     logger.info("Starting Flask server...")
     logger.info(f"Transcriptions folder: {os.path.abspath(TRANSCRIPTIONS_FOLDER)}")
     logger.info("Server ready for both SpeechBrain and browser transcription")
     
-    # Load SpeechBrain model
-    if load_speechbrain_model():
-        logger.info("🧠 Using SpeechBrain for audio transcription")
-    else:
-        logger.info("🔄 Using Google Speech Recognition as fallback")
+    # With the debug reloader this file runs in a watcher process and again in
+    # the serving child; only the child (WERKZEUG_RUN_MAIN set) loads the model
+    if not FLASK_DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        if SPEECHBRAIN_AVAILABLE:
+            logger.info("🧠 Loading SpeechBrain for audio transcription (see /ready)")
+        else:
+            logger.info("🔄 Using Google Speech Recognition as fallback")
+        create_app()
     
-    app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
+    app.run(host=FLASK_HOST, port=FLASK_PORT, debug=FLASK_DEBUG)
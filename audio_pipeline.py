@@ -0,0 +1,325 @@
+"""
+Audio preparation shared by every transcription engine
+
+A request's audio is decoded once, in memory (soundfile in-process, or an
+ffmpeg pipe), and normalised to 16 kHz mono. That single canonical copy is
+handed to each engine the fallback chain reaches instead of being converted
+again. A temporary file is only written when a decoder really needs a
+seekable path.
+"""
+
+import hashlib
+import io
+import logging
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+# In-process decoding
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+    print("⚠️  soundfile not installed. Install with: pip install soundfile")
+
+# Resampling for in-process decodes (installed alongside SpeechBrain)
+try:
+    import torch
+    import torchaudio
+    TORCHAUDIO_AVAILABLE = True
+except ImportError:
+    TORCHAUDIO_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_PATH = shutil.which('ffmpeg')
+
+# Every engine consumes 16 kHz mono: the rate the SpeechBrain model was
+# trained on, and the rate Whisper resamples to internally anyway
+CANONICAL_SAMPLE_RATE = 16000
+WAV_HEADER_SIZE = 44
+
+# Containers libsndfile can decode from a file object
+SOUNDFILE_FORMATS = {'wav', 'flac', 'ogg', 'aiff'}
+
+# Containers ffmpeg can't decode from a pipe (the index may be at the end)
+SEEKABLE_INPUT_FORMATS = {'m4a', 'mp4', 'mov', '3gp', 'aac'}
+
+
+def read_source_bytes(source):
+    """Return the full contents of a path or binary file object"""
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return f.read()
+    source.seek(0)
+    return source.read()
+
+
+def resample_audio(samples, orig_rate, target_rate):
+    """Resample a float32 mono array, or return None if no resampler is available"""
+    if orig_rate == target_rate:
+        return samples
+    if not TORCHAUDIO_AVAILABLE:
+        return None
+    waveform = torch.from_numpy(samples).unsqueeze(0)
+    resampled = torchaudio.functional.resample(waveform, orig_rate, target_rate)
+    return resampled.squeeze(0).numpy()
+
+
+def decode_with_soundfile(source, sample_rate):
+    """
+    Decode in-process with libsndfile
+
+    Returns (samples, source_rate, source_channels); samples is None when
+    the audio would need resampling and no resampler is installed.
+    """
+    if not isinstance(source, str):
+        source.seek(0)
+    data, rate = sf.read(source, dtype='float32', always_2d=True)
+
+    # Down-mix to mono
+    samples = data.mean(axis=1) if data.shape[1] > 1 else data[:, 0]
+    samples = resample_audio(np.ascontiguousarray(samples), rate, sample_rate)
+    return samples, rate, data.shape[1]
+
+
+def parse_ffmpeg_stream_info(stderr):
+    """Pull the input sample rate and channel count out of ffmpeg's log"""
+    match = re.search(r'Audio: [^\n]*?(\d+) Hz, (mono|stereo|(\d+) channels)', stderr)
+    if not match:
+        return None, None
+    channels = {'mono': 1, 'stereo': 2}.get(match.group(2)) or int(match.group(3))
+    return int(match.group(1)), channels
+
+
+def decode_with_ffmpeg(source, audio_format, sample_rate, temp_files_to_cleanup, timeout=None):
+    """
+    Decode through an ffmpeg pipe to raw float32 mono PCM at sample_rate
+
+    Returns (samples, source_rate, source_channels). ffmpeg is killed after
+    timeout seconds (subprocess.TimeoutExpired).
+    """
+    if not FFMPEG_PATH:
+        raise Exception("ffmpeg not found - install FFmpeg to decode compressed audio")
+
+    stdin_data = None
+    if isinstance(source, str):
+        input_arg = source
+    elif audio_format in SEEKABLE_INPUT_FORMATS:
+        # ffmpeg has to seek in these containers, so give it a real file
+        with tempfile.NamedTemporaryFile(suffix=f'.{audio_format}', delete=False) as temp_file:
+            source.seek(0)
+            shutil.copyfileobj(source, temp_file)
+            input_arg = temp_file.name
+        temp_files_to_cleanup.append(input_arg)
+    else:
+        input_arg = 'pipe:0'
+        stdin_data = read_source_bytes(source)
+
+    result = subprocess.run(
+        [FFMPEG_PATH, '-hide_banner', '-nostats', '-i', input_arg,
+         '-f', 'f32le', '-acodec', 'pcm_f32le', '-ac', '1', '-ar', str(sample_rate), 'pipe:1'],
+        input=stdin_data,
+        capture_output=True,
+        timeout=timeout,
+    )
+    stderr = result.stderr.decode('utf-8', errors='replace')
+    if result.returncode != 0:
+        raise Exception(f"ffmpeg decode failed: {stderr.strip().splitlines()[-1] if stderr.strip() else result.returncode}")
+
+    source_rate, source_channels = parse_ffmpeg_stream_info(stderr)
+    return np.frombuffer(result.stdout, dtype=np.float32), source_rate, source_channels
+
+
+def decode_audio(source, audio_format, sample_rate=CANONICAL_SAMPLE_RATE, temp_files_to_cleanup=None, timeout=None):
+    """
+    Decode audio (path or file object) into a float32 mono array at sample_rate
+
+    libsndfile is tried first since it runs in-process; anything it can't
+    handle, or can't resample, goes through an ffmpeg pipe. Returns
+    (samples, source_rate, source_channels); the source values may be None
+    if ffmpeg didn't report them. timeout only bounds the ffmpeg path.
+    """
+    temp_files_to_cleanup = temp_files_to_cleanup if temp_files_to_cleanup is not None else []
+    audio_format = audio_format.lower()
+
+    if SOUNDFILE_AVAILABLE and audio_format in SOUNDFILE_FORMATS:
+        try:
+            samples, source_rate, source_channels = decode_with_soundfile(source, sample_rate)
+            if samples is not None:
+                return samples, source_rate, source_channels
+        except Exception as e:
+            logger.warning(f"⚠️ In-process decode failed, trying ffmpeg: {e}")
+
+    return decode_with_ffmpeg(source, audio_format, sample_rate, temp_files_to_cleanup, timeout)
+
+
+def encode_wav(samples, sample_rate=CANONICAL_SAMPLE_RATE):
+    """Encode float32 mono samples as 16-bit PCM WAV bytes"""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def pcm16_wav_size(frame_count, sample_rate, channels):
+    """Size of a 16-bit PCM WAV with the given shape (header included)"""
+    return WAV_HEADER_SIZE + int(frame_count * channels * 2 * sample_rate / CANONICAL_SAMPLE_RATE)
+
+
+class NormalisationStats:
+    """Running totals of the bytes and time the 16 kHz mono stage saves"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clips = 0
+        self.source_wav_bytes = 0
+        self.canonical_wav_bytes = 0
+        self.decode_time = 0.0
+
+    def record(self, source_wav_bytes, canonical_wav_bytes, decode_time):
+        with self.lock:
+            self.clips += 1
+            self.source_wav_bytes += source_wav_bytes
+            self.canonical_wav_bytes += canonical_wav_bytes
+            self.decode_time += decode_time
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'clips': self.clips,
+                'sample_rate': CANONICAL_SAMPLE_RATE,
+                'source_wav_bytes': self.source_wav_bytes,
+                'canonical_wav_bytes': self.canonical_wav_bytes,
+                'bytes_saved': self.source_wav_bytes - self.canonical_wav_bytes,
+                'average_decode_time': round(self.decode_time / self.clips, 4) if self.clips else 0.0,
+            }
+
+
+normalisation_stats = NormalisationStats()
+
+
+class PreparedAudio:
+    """
+    One request's audio, normalised once to 16 kHz mono and then shared
+
+    `source` is the spooled upload, either a path or a binary file object.
+    It is decoded a single time into canonical float32 mono samples at
+    CANONICAL_SAMPLE_RATE. SpeechBrain reads those samples directly; Whisper
+    and Google read `wav_file()`, the same samples as an in-memory 16-bit
+    WAV. Files created here are added to `temp_files_to_cleanup`.
+    """
+
+    def __init__(self, source, audio_format, temp_files_to_cleanup, wav_path=None):
+        self.source = source
+        self.audio_format = audio_format.lower()
+        self.temp_files_to_cleanup = temp_files_to_cleanup
+        self.wav_source = wav_path
+        self.preconverted = wav_path is not None
+        self._samples = None
+        self._wav_bytes = None
+        self._content_hash = None
+        self.source_rate = None
+        self.source_channels = None
+        self.conversion_time = 0.0
+        self.conversion_count = 0
+        self.engine_runs = 0
+        self.engine_lock = threading.Lock()
+
+        if self.wav_source is None and self.audio_format == 'wav':
+            self.wav_source = source
+
+    def samples(self, timeout=None):
+        """Canonical float32 mono samples, decoded the first time (within timeout seconds)"""
+        if self._samples is not None:
+            return self._samples
+
+        start = time.time()
+        if self.wav_source is not None:
+            decoded = decode_audio(self.wav_source, 'wav', CANONICAL_SAMPLE_RATE, self.temp_files_to_cleanup, timeout)
+        else:
+            decoded = decode_audio(self.source, self.audio_format, CANONICAL_SAMPLE_RATE, self.temp_files_to_cleanup, timeout)
+        self._samples, self.source_rate, self.source_channels = decoded
+        elapsed = time.time() - start
+        self.conversion_time += elapsed
+        self.conversion_count += 1
+
+        source_bytes, canonical_bytes = self.wav_sizes()
+        normalisation_stats.record(source_bytes, canonical_bytes, elapsed)
+        ratio = source_bytes / canonical_bytes if canonical_bytes else 1.0
+        logger.debug("📉 Normalised %.1fs of audio (%s Hz x%s → %d Hz mono): WAV %d → %d bytes (%.1fx smaller) in %.3fs",
+                     len(self._samples) / CANONICAL_SAMPLE_RATE, self.source_rate, self.source_channels,
+                     CANONICAL_SAMPLE_RATE, source_bytes, canonical_bytes, ratio, elapsed)
+        return self._samples
+
+    def wav_file(self):
+        """A named in-memory 16 kHz mono WAV file object, encoded the first time"""
+        if self._wav_bytes is None:
+            self._wav_bytes = encode_wav(self.samples())
+
+        wav_file = io.BytesIO(self._wav_bytes)
+        wav_file.name = 'audio.wav'
+        return wav_file
+
+    def engine_started(self, engine):
+        """Record that an engine consumes this audio; every engine after the first reuses the conversion"""
+        with self.engine_lock:
+            self.engine_runs += 1
+            if self.engine_runs > 1:
+                logger.debug("♻️ %s reuses the converted audio", engine)
+
+    @property
+    def reuse_count(self):
+        """Engine runs that would each have converted the upload again before it was shared"""
+        return max(0, self.engine_runs - 1)
+
+    def content_hash(self):
+        """SHA-256 of the canonical samples, independent of the upload's container"""
+        if self._content_hash is None:
+            self._content_hash = hashlib.sha256(memoryview(self.samples())).hexdigest()
+        return self._content_hash
+
+    def wav_sizes(self):
+        """(bytes a WAV at the source's rate/channels would take, canonical WAV bytes)"""
+        frame_count = len(self._samples)
+        canonical_bytes = pcm16_wav_size(frame_count, CANONICAL_SAMPLE_RATE, 1)
+        source_bytes = pcm16_wav_size(
+            frame_count,
+            self.source_rate or CANONICAL_SAMPLE_RATE,
+            self.source_channels or 1
+        )
+        return source_bytes, canonical_bytes
+
+    def metadata(self):
+        """Conversion statistics for the response"""
+        average_time = self.conversion_time / self.conversion_count if self.conversion_count else 0.0
+        metadata = {
+            'source_format': self.audio_format,
+            'preconverted': self.preconverted,
+            'conversions': self.conversion_count,
+            'conversion_time': round(self.conversion_time, 3),
+            'conversions_reused': self.reuse_count,
+            'conversion_time_saved': round(average_time * self.reuse_count, 3),
+            'sample_rate': CANONICAL_SAMPLE_RATE,
+        }
+        if self._samples is not None:
+            source_bytes, canonical_bytes = self.wav_sizes()
+            metadata.update({
+                'source_sample_rate': self.source_rate,
+                'source_channels': self.source_channels,
+                'source_wav_bytes': source_bytes,
+                'canonical_wav_bytes': canonical_bytes,
+                'bytes_saved': source_bytes - canonical_bytes,
+            })
+        return metadata
@@ -0,0 +1,165 @@
+"""
+Energy-based voice activity detection and segmentation for long audio
+
+SpeechBrain decodes a clip as one utterance, so a 30-minute lecture is one
+huge, serial CRDNN+RNNLM pass. `segment_speech` splits canonical mono audio
+at silences into segments of at most `max_segment_seconds`, which can then be
+batched and decoded in parallel and stitched back in order. Everything is
+vectorised over fixed-length frames; no per-sample Python loops.
+
+`compress_silence` uses the same detector to drop leading/trailing silence
+and shorten long pauses before audio is uploaded to Whisper, keeping a time
+map so timestamps in the result can be put back on the original timeline.
+"""
+
+import threading
+
+import numpy as np
+
+# Frames quieter than this are always silence, whatever the noise floor
+ABSOLUTE_SILENCE_DB = -60.0
+
+# Frames louder than this are never trimmed as silence before a Whisper upload,
+# however loud the rest of the clip is: quiet speech must still reach the engine
+TRIM_SILENCE_DB = -45.0
+
+
+def frame_energies(samples, frame_length):
+    """Energy in dB of each complete, non-overlapping frame"""
+    frame_count = len(samples) // frame_length
+    # A view of the float32 samples: no full-length float64 or squared copy for long clips
+    frames = samples[:frame_count * frame_length].astype(np.float32, copy=False).reshape(frame_count, frame_length)
+    return 10.0 * np.log10(np.einsum('ij,ij->i', frames, frames) / frame_length + 1e-10)
+
+
+def voiced_regions(voiced):
+    """(start, end) frame ranges of each run of True in a boolean array"""
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def split_region(energies, start, end, max_frames):
+    """Cut a region longer than max_frames at its quietest frames"""
+    pieces = []
+    while end - start > max_frames:
+        window = energies[start + max_frames // 2:start + max_frames]
+        cut = start + max_frames // 2 + int(np.argmin(window))
+        pieces.append((start, cut))
+        start = cut
+    pieces.append((start, end))
+    return pieces
+
+
+def segment_speech(samples, sample_rate, max_segment_seconds, frame_ms=30, margin_db=12.0,
+                   min_silence_ms=300, padding_ms=150, max_threshold_db=None):
+    """
+    Split audio into speech segments
+
+    A frame is speech if its energy is `margin_db` above the noise floor
+    (10th percentile of frame energies), capped at `max_threshold_db` if
+    given. Pauses shorter than `min_silence_ms`
+    don't split a segment, segments longer than `max_segment_seconds` are cut
+    at their quietest point, and each segment is padded by `padding_ms`.
+    Returns a list of (start_sample, end_sample); empty if nothing is voiced.
+    """
+    frame_length = max(1, int(sample_rate * frame_ms / 1000))
+    energies = frame_energies(samples, frame_length)
+    if len(energies) == 0:
+        return [(0, len(samples))] if len(samples) else []
+
+    threshold = max(np.percentile(energies, 10) + margin_db, ABSOLUTE_SILENCE_DB)
+    if max_threshold_db is not None:
+        threshold = min(threshold, max_threshold_db)
+    voiced = energies > threshold
+
+    # Bridge short pauses so words and sentences stay together
+    min_silence_frames = max(1, min_silence_ms // frame_ms)
+    for start, end in voiced_regions(~voiced):
+        if start > 0 and end < len(voiced) and end - start < min_silence_frames:
+            voiced[start:end] = True
+
+    max_frames = max(1, int(max_segment_seconds * 1000 / frame_ms))
+    padding = int(sample_rate * padding_ms / 1000)
+    segments = []
+    for start, end in voiced_regions(voiced):
+        # Only pad at real silences; padding a forced cut would repeat audio
+        for piece_start, piece_end in split_region(energies, start, end, max_frames):
+            segments.append((
+                max(0, int(piece_start) * frame_length - (padding if piece_start == start else 0)),
+                min(len(samples), int(piece_end) * frame_length + (padding if piece_end == end else 0))
+            ))
+    return segments
+
+
+def stitch_segments(segments, texts, sample_rate):
+    """Join segment transcriptions in order; returns (text, [{'start', 'end', 'text'}])"""
+    timeline = [
+        {'start': round(int(start) / sample_rate, 2), 'end': round(int(end) / sample_rate, 2), 'text': text.strip()}
+        for (start, end), text in zip(segments, texts)
+    ]
+    return ' '.join(item['text'] for item in timeline if item['text']), timeline
+
+
+def compress_silence(samples, sample_rate, gap_ms=300, **vad_options):
+    """
+    Remove leading/trailing silence and shorten pauses to gap_ms
+
+    Only frames below TRIM_SILENCE_DB can be dropped, so a quiet passage in
+    an otherwise loud recording is kept. Returns (compressed_samples, time_map). time_map is a list of
+    (compressed_start, original_start, length) in samples, one per kept
+    speech region. If nothing is voiced the audio is returned unchanged.
+    """
+    vad_options.setdefault('max_threshold_db', TRIM_SILENCE_DB)
+    regions = segment_speech(samples, sample_rate, len(samples) / sample_rate + 1, **vad_options)
+    if not regions:
+        return samples, [(0, 0, len(samples))]
+
+    gap = np.zeros(int(sample_rate * gap_ms / 1000), dtype=samples.dtype)
+    pieces = []
+    time_map = []
+    position = 0
+    for start, end in regions:
+        if pieces:
+            pieces.append(gap)
+            position += len(gap)
+        pieces.append(samples[start:end])
+        time_map.append((position, start, end - start))
+        position += end - start
+    return np.concatenate(pieces), time_map
+
+
+def map_to_original(seconds, time_map, sample_rate):
+    """Map a time in compressed audio back to the original recording"""
+    position = seconds * sample_rate
+    for compressed_start, original_start, length in reversed(time_map):
+        if position >= compressed_start:
+            # Times inside an inserted gap map to the end of the region before it
+            return round((original_start + min(position - compressed_start, length)) / sample_rate, 2)
+    return round(time_map[0][1] / sample_rate, 2) if time_map else seconds
+
+
+class TrimStats:
+    """Running totals of what silence trimming saved on remote uploads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clips = 0
+        self.seconds_saved = 0.0
+        self.bytes_saved = 0
+
+    def record(self, seconds_saved, bytes_saved):
+        with self.lock:
+            self.clips += 1
+            self.seconds_saved += seconds_saved
+            self.bytes_saved += bytes_saved
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'clips': self.clips,
+                'seconds_saved': round(self.seconds_saved, 2),
+                'bytes_saved': self.bytes_saved,
+            }
+
+
+trim_stats = TrimStats()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Scaling curve for the SpeechBrain inference process pool
+
+Loads the model once, then for each process count forks a fresh pool (the
+CPUs are split evenly between the processes for torch threads and affinity)
+and fires concurrent single-clip requests at it, the way the micro-batcher
+does under load. Prints clips/sec and speedup over one process.
+
+Usage: python benchmark_inference_pool.py [clips] [process counts ...]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from speechbrain.inference import EncoderDecoderASR
+
+from benchmark_speechbrain_batching import create_test_clips
+from inference_pool import InferencePool
+
+DEFAULT_CLIPS = 32
+CLIPS_PER_BATCH = 4
+
+
+def available_cpus():
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+
+
+def default_process_counts(cpu_count):
+    counts = [1]
+    while counts[-1] * 2 <= cpu_count:
+        counts.append(counts[-1] * 2)
+    return counts
+
+
+def main(clip_count, process_counts):
+    cpu_count = available_cpus()
+    print(f"🧠 Loading SpeechBrain model ({cpu_count} CPUs)...")
+    model = EncoderDecoderASR.from_hparams(
+        source="speechbrain/asr-crdnn-rnnlm-librispeech",
+        savedir="./pretrained_models/asr-crdnn-rnnlm-librispeech",
+        run_opts={"device": "cpu"}
+    )
+
+    clips = create_test_clips(clip_count)
+    batches = [clips[start:start + CLIPS_PER_BATCH] for start in range(0, clip_count, CLIPS_PER_BATCH)]
+
+    print(f"📊 {clip_count} clips in batches of {CLIPS_PER_BATCH}")
+    print(f"{'processes':>10} {'threads':>8} {'seconds':>9} {'clips/s':>9} {'speedup':>9}")
+
+    baseline = None
+    for processes in process_counts:
+        threads = max(1, cpu_count // processes)
+        pool = InferencePool(processes, threads, pin_cpus=True)
+        pool.start(model)
+        try:
+            pool.warm_up(clips[:2])
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=processes) as executor:
+                list(executor.map(pool.transcribe, batches))
+            elapsed = time.perf_counter() - start
+        finally:
+            pool.stop()
+
+        throughput = clip_count / elapsed
+        baseline = baseline or throughput
+        print(f"{processes:>10} {threads:>8} {elapsed:>9.2f} {throughput:>9.2f} {throughput / baseline:>8.2f}x")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(args[0] if args else DEFAULT_CLIPS, args[1:] or default_process_counts(available_cpus()))
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Request-thread cost of logging, before and after the logging profiles
+
+Replays the log calls of one /transcribe-audio request (a 40-word
+transcript) as the handlers made them before (twelve INFO lines through
+`logging.basicConfig`) and as they make them now, under the "debug" and
+"production" profiles. Output goes to a file, as it does when stderr is
+redirected. Times are measured on the calling thread only, which is what
+a request waits for; the production profile's writes happen on the
+listener thread.
+
+Usage: python benchmark_logging.py [requests]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from job_queue import percentile
+from structured_logging import TRANSCRIPT, configure_logging
+
+DEFAULT_REQUESTS = 20_000
+TRANSCRIPT_TEXT = ' '.join(f'word{index}' for index in range(40))
+
+logger = logging.getLogger('benchmark')
+
+
+def old_request():
+    logger.info("=== OPENAI WHISPER TRANSCRIPTION REQUEST STARTED ===")
+    logger.info(f"Audio format: {'m4a'}")
+    logger.info(f"Timestamp: {'2026-01-01T00:00:00'}")
+    logger.info(f"Spooled audio size: {48000} bytes")
+    logger.info(f"Using transcription service: {'speechbrain'}")
+    logger.info(f"🎙️ Trying {'speechbrain'} for transcription...")
+    logger.info("🧠 Using SpeechBrain for transcription...")
+    logger.info(f"✅ SpeechBrain transcription completed: {TRANSCRIPT_TEXT}")
+    logger.info(f"📝 Transcription stored: {TRANSCRIPT_TEXT}")
+    logger.info(f"Word count: {40}")
+    logger.info(f"Character count: {len(TRANSCRIPT_TEXT)}")
+    logger.info("=== OPENAI WHISPER TRANSCRIPTION REQUEST COMPLETED ===")
+
+
+def new_request():
+    logger.debug("=== OPENAI WHISPER TRANSCRIPTION REQUEST STARTED ===")
+    logger.debug("Spooled %d bytes of %s audio (timestamp %s)", 48000, 'm4a', '2026-01-01T00:00:00')
+    logger.debug("Using transcription service: %s", 'speechbrain')
+    logger.debug("🎙️ Trying %s for transcription", 'speechbrain')
+    logger.debug("✅ SpeechBrain transcription completed: %s", TRANSCRIPT_TEXT, extra=TRANSCRIPT)
+    logger.info("📝 Transcription stored: %s (%s, %d words)", '17', 'speechbrain', 40,
+                extra={'service': 'speechbrain', 'session_id': None, 'word_count': 40,
+                       'character_count': len(TRANSCRIPT_TEXT), 'engine_time': 0.8})
+    logger.debug("📝 Transcription text: %s", TRANSCRIPT_TEXT, extra=TRANSCRIPT)
+    logger.debug("=== OPENAI WHISPER TRANSCRIPTION REQUEST COMPLETED ===")
+
+
+def run(label, setup, request, count, directory):
+    path = os.path.join(directory, f'{label}.log')
+    with open(path, 'w', encoding='utf-8') as stream:
+        listener = setup(stream)
+        latencies = []
+        for _ in range(count):
+            start = time.perf_counter()
+            request()
+            latencies.append((time.perf_counter() - start) * 1e6)
+        if listener is not None:
+            listener.stop()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+    size = os.path.getsize(path)
+    print(f"{label:>28} {percentile(latencies, 0.5):>9.1f} {percentile(latencies, 0.99):>9.1f} "
+          f"{size / count:>10.0f}")
+
+
+def basic_config(stream):
+    logging.basicConfig(level=logging.INFO, stream=stream, force=True)
+
+
+def main(count):
+    print(f"📊 {count} requests; µs per request on the request thread")
+    print(f"{'logging':>28} {'p50':>9} {'p99':>9} {'bytes/req':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        run('basicConfig, before', basic_config, old_request, count, directory)
+        run('debug profile', lambda stream: configure_logging('debug', 'INFO', stream=stream),
+            new_request, count, directory)
+        run('production, 1% debug',
+            lambda stream: configure_logging('production', 'INFO', 0.01, stream=stream, debug_loggers=('benchmark',)),
+            new_request, count, directory)
+        run('production, no debug',
+            lambda stream: configure_logging('production', 'INFO', 0.0, stream=stream, debug_loggers=('benchmark',)),
+            new_request, count, directory)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS)
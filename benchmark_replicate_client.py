@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark for the pooled Replicate client
+
+Starts fake_replicate_server.py in-process and sends concurrent Whisper-style
+uploads (a short WAV each) through ReplicateClient, once per in-flight limit.
+Reports uploads/sec, p50/p95 latency and how many TCP connections the server
+had to accept, which shows whether the session pool is reusing them.
+
+Usage: python benchmark_replicate_client.py [uploads] [latency seconds] [max in-flight ...]
+"""
+
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_replicate_server import FakeReplicateServer
+from job_queue import percentile
+from replicate_client import ReplicateClient
+from test_upload_modes import create_test_wav_bytes
+
+DEFAULT_UPLOADS = 50
+DEFAULT_LATENCY = 1.0
+DEFAULT_IN_FLIGHT = [8, 16, 50]
+MODEL_VERSION = 'fake-whisper'
+
+
+def main(uploads, latency, in_flight_limits):
+    audio_bytes = create_test_wav_bytes()
+    print(f"📊 {uploads} concurrent uploads of {len(audio_bytes)} bytes, {latency}s model latency")
+    print(f"{'in-flight':>10} {'seconds':>9} {'uploads/s':>10} {'p50 s':>7} {'p95 s':>7} {'connections':>12} {'polls':>6}")
+
+    for max_in_flight in in_flight_limits:
+        server = FakeReplicateServer(latency=latency).start()
+        client = ReplicateClient(server.base_url, api_token='fake', max_in_flight=max_in_flight,
+                                 pool_size=max_in_flight, poll_interval=0.1, timeout=120)
+
+        def upload(_):
+            start = time.perf_counter()
+            audio_file = io.BytesIO(audio_bytes)
+            audio_file.name = 'audio.wav'
+            client.run(MODEL_VERSION, {'audio': audio_file})
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=uploads) as executor:
+            latencies = list(executor.map(upload, range(uploads)))
+        elapsed = time.perf_counter() - start
+
+        server.shutdown()
+        server.server_close()
+        print(f"{max_in_flight:>10} {elapsed:>9.2f} {uploads / elapsed:>10.2f} "
+              f"{percentile(latencies, 0.5):>7.2f} {percentile(latencies, 0.95):>7.2f} "
+              f"{server.connections:>12} {client.stats()['polls']:>6}")
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(
+        int(args[0]) if args else DEFAULT_UPLOADS,
+        float(args[1]) if len(args) > 1 else DEFAULT_LATENCY,
+        [int(arg) for arg in args[2:]] or DEFAULT_IN_FLIGHT
+    )
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Query latency of the search index at 100k transcriptions
+
+Indexes synthetic transcripts (12-40 words drawn from a Zipf-like
+distribution over a 5,000-word vocabulary, in sessions of 20) and times a
+page of 20 results for rare, common, phrase, prefix and session-filtered
+queries. The same queries run as a linear scan over the texts, which is
+what a client had to do with the full /transcriptions download.
+
+Usage: python benchmark_search_index.py [transcripts]
+"""
+
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+from job_queue import percentile
+from search_index import SearchIndex, tokenize
+
+DEFAULT_TRANSCRIPTS = 100_000
+VOCABULARY_SIZE = 5_000
+RECORDS_PER_SESSION = 20
+RUNS = 50
+PAGE = 20
+
+
+def make_records(count):
+    rng = random.Random(42)
+    vocabulary = [f'word{rank}' for rank in range(VOCABULARY_SIZE)]
+    weights = [1 / (rank + 1) for rank in range(VOCABULARY_SIZE)]
+    records = []
+    for index in range(count):
+        words = rng.choices(vocabulary, weights, k=rng.randint(12, 40))
+        records.append({
+            'id': index + 1,
+            'session_id': f'session-{index // RECORDS_PER_SESSION}',
+            'service': 'browser_speech_recognition' if index % 3 else 'speechbrain',
+            'transcription': ' '.join(words),
+        })
+    return records
+
+
+def scan(records, query, session_id=None):
+    """Linear scan: every record's text, first PAGE matches"""
+    phrase = re.compile(r'\b' + re.escape(query.strip('"')) + r'\b')
+    matches = []
+    for record in records:
+        if session_id is not None and record['session_id'] != session_id:
+            continue
+        if phrase.search(record['transcription'].lower()):
+            matches.append(record['id'])
+            if len(matches) == PAGE:
+                break
+    return matches
+
+
+def time_runs(function):
+    latencies = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return percentile(latencies, 0.5), percentile(latencies, 0.95)
+
+
+def main(count):
+    records = make_records(count)
+    tokens = sum(len(tokenize(record['transcription'])) for record in records)
+
+    start = time.perf_counter()
+    index = SearchIndex()
+    index.add_many(records)
+    build_time = time.perf_counter() - start
+
+    # Measured on a second build, since tracing slows indexing down several times
+    tracemalloc.start()
+    traced = SearchIndex()
+    traced.add_many(records)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"📊 {count} transcripts, {tokens} words: indexed in {build_time:.1f}s, "
+          f"{memory / 1e6:.0f} MB ({index.stats()['tokens']} distinct words)")
+    queries = [
+        ('rare word', 'word4000', None),
+        ('common word', 'word1', None),
+        ('two common words', 'word1 word2', None),
+        ('phrase', '"word1 word2"', None),
+        ('prefix', 'word49*', None),
+        ('session filter', 'word1', f'session-{count // RECORDS_PER_SESSION // 2}'),
+        ('no match', 'word4000 word4001 word4002', None),
+    ]
+    print(f"{'query':>18} {'index p50':>10} {'p95':>8} {'scan p50':>10} {'p95':>8}  (ms, first {PAGE} matches)")
+    for label, query, session_id in queries:
+        index_p50, index_p95 = time_runs(lambda: index.search(query, session_id=session_id, limit=PAGE))
+        if ' ' in query.strip('"') and not query.startswith('"') or '*' in query:
+            scan_p50 = scan_p95 = None  # AND / prefix queries aren't a single pattern
+        else:
+            scan_p50, scan_p95 = time_runs(lambda: scan(records, query, session_id))
+        scan_text = f"{scan_p50:>10.2f} {scan_p95:>8.2f}" if scan_p50 is not None else f"{'-':>10} {'-':>8}"
+        print(f"{label:>18} {index_p50:>10.3f} {index_p95:>8.3f} {scan_text}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TRANSCRIPTS)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Memory per stored transcript: the old dict list against the session cache
+
+Builds the same browser auto-save records (sessions of
+MAX_SESSION_TRANSCRIPTIONS transcripts) twice and measures the allocations
+with tracemalloc: once as the dicts that used to pile up in the global
+`transcription_results` list, once as TranscriptRecord objects grouped per
+session in SessionCache. Transcript text is created before measuring, since
+both layouts hold the same strings; its size is reported separately.
+
+Usage: python benchmark_session_memory.py [transcripts]
+"""
+
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+from config import MAX_SESSION_TRANSCRIPTIONS, MAX_TRANSCRIPTION_LENGTH, SESSION_TIMEOUT
+from session_cache import CachedSession, SessionCache, TranscriptRecord
+
+DEFAULT_TRANSCRIPTS = 100_000
+
+
+def make_values(count):
+    """Per-record values as the request handler would see them (fresh strings each time)"""
+    start = datetime(2024, 1, 1)
+    values = []
+    for index in range(count):
+        text = f'note {index} about the quarterly planning meeting and follow up actions'
+        values.append({
+            'id': index + 1,
+            'timestamp': (start + timedelta(seconds=index)).isoformat(),
+            'transcription': text,
+            'session_id': f'session-{index // MAX_SESSION_TRANSCRIPTIONS}',
+            'confidence': 0.9,
+            'service': ''.join(['browser_', 'speech_recognition']),
+            'word_count': len(text.split()),
+            'character_count': len(text),
+        })
+    return values
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, kept
+
+
+def main(count):
+    text_bytes = sum(sys.getsizeof(record['transcription']) for record in make_values(count))
+
+    values = make_values(count)
+    dict_bytes, _ = measure(lambda: [
+        {key: record[key] for key in ('timestamp', 'transcription', 'session_id', 'confidence', 'service',
+                                      'word_count', 'character_count')}
+        for record in values
+    ])
+
+    def build_cache():
+        cache = SessionCache(None, SESSION_TIMEOUT, MAX_SESSION_TRANSCRIPTIONS, MAX_TRANSCRIPTION_LENGTH, sys.maxsize)
+        for record in values:
+            session = cache.sessions.get(record['session_id'])
+            if session is None:
+                session = cache.sessions[record['session_id']] = CachedSession([], (0, None))
+            session.records.append(TranscriptRecord(record))
+        return cache
+
+    values = make_values(count)
+    cache_bytes, cache = measure(build_cache)
+
+    print(f"📊 {count} transcripts in {len(cache.sessions)} sessions "
+          f"(text itself: {text_bytes / count:.0f} bytes/transcript in both layouts)")
+    print(f"{'layout':>28} {'bytes/transcript':>17} {'total MB':>9}")
+    print(f"{'dicts in a global list':>28} {dict_bytes / count:>17.0f} {dict_bytes / 1e6:>9.1f}")
+    print(f"{'__slots__ records per session':>28} {cache_bytes / count:>17.0f} {cache_bytes / 1e6:>9.1f}")
+    print(f"Saved {1 - cache_bytes / dict_bytes:.0%} of the per-record overhead")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TRANSCRIPTS)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark SpeechBrain throughput at different batch sizes on CPU
+
+Loads the same ASR model as the server and decodes a fixed set of synthetic
+clips (varied lengths, so padding cost is included) with batch sizes
+1, 4, 8 and 16, reporting clips/sec for each. One untimed warm-up batch runs
+first so model allocation doesn't count against batch size 1.
+
+Usage: python benchmark_speechbrain_batching.py [clips] [batch sizes ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+import torch
+from speechbrain.inference import EncoderDecoderASR
+
+from audio_pipeline import CANONICAL_SAMPLE_RATE
+from speechbrain_batcher import transcribe_in_batches
+
+DEFAULT_CLIPS = 32
+DEFAULT_BATCH_SIZES = [1, 4, 8, 16]
+
+
+def create_test_clips(count, seed=0):
+    """Tone-plus-noise clips of 2 to 8 seconds"""
+    rng = np.random.default_rng(seed)
+    clips = []
+    for _ in range(count):
+        seconds = rng.uniform(2.0, 8.0)
+        t = np.arange(int(seconds * CANONICAL_SAMPLE_RATE)) / CANONICAL_SAMPLE_RATE
+        tone = 0.1 * np.sin(2 * np.pi * rng.uniform(150, 400) * t)
+        clips.append((tone + 0.01 * rng.standard_normal(len(t))).astype(np.float32))
+    return clips
+
+
+def main(clip_count, batch_sizes):
+    torch.set_num_threads(torch.get_num_threads())
+    print(f"🧠 Loading SpeechBrain model (torch threads: {torch.get_num_threads()})...")
+    model = EncoderDecoderASR.from_hparams(
+        source="speechbrain/asr-crdnn-rnnlm-librispeech",
+        savedir="./pretrained_models/asr-crdnn-rnnlm-librispeech",
+        run_opts={"device": "cpu"}
+    )
+
+    clips = create_test_clips(clip_count)
+    audio_seconds = sum(len(clip) for clip in clips) / CANONICAL_SAMPLE_RATE
+    transcribe_in_batches(model, clips[:2], 2)
+
+    print(f"📊 {clip_count} clips, {audio_seconds:.0f}s of audio")
+    print(f"{'batch':>6} {'seconds':>9} {'clips/s':>9} {'speedup':>9}")
+
+    baseline = None
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        with torch.inference_mode():
+            transcribe_in_batches(model, clips, batch_size)
+        elapsed = time.perf_counter() - start
+
+        throughput = clip_count / elapsed
+        baseline = baseline or throughput
+        print(f"{batch_size:>6} {elapsed:>9.2f} {throughput:>9.2f} {throughput / baseline:>8.2f}x")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(args[0] if args else DEFAULT_CLIPS, args[1:] or DEFAULT_BATCH_SIZES)
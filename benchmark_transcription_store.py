@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Session lookup latency of the SQLite transcription store as it grows
+
+Fills a throwaway database in steps up to the largest size (1M records by
+default, spread over sessions of ~20 transcriptions each) and, at each size,
+times `by_session()` for random sessions. The same lookup over the old
+in-memory list (a linear scan) is timed alongside for comparison, up to
+LIST_SCAN_LIMIT records, and so is a /stats read of the usage rollups.
+
+Usage: python benchmark_transcription_store.py [records ...]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from job_queue import percentile
+from transcription_rollups import rebuild_rollups
+from transcription_store import RECORD_FIELDS, TranscriptionStore
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+RECORDS_PER_SESSION = 20
+LOOKUPS = 500
+LIST_SCAN_LIMIT = 1_000_000
+INSERT_BATCH = 50_000
+
+
+def make_record(index):
+    text = f'note {index} about the quarterly planning meeting and follow up actions'
+    return {
+        'timestamp': f'2024-01-01T00:00:{index % 60:02d}',
+        'session_id': f'session-{index // RECORDS_PER_SESSION}',
+        'service': 'browser_speech_recognition' if index % 3 else 'speechbrain',
+        'transcription': text,
+        'word_count': len(text.split()),
+        'character_count': len(text),
+    }
+
+
+def fill(store, records, start, stop):
+    """Bulk insert records[start:stop] (much faster than one add() per row), then recompute the rollups"""
+    connection = store._connection()
+    for batch_start in range(start, stop, INSERT_BATCH):
+        batch = records[batch_start:min(batch_start + INSERT_BATCH, stop)]
+        with connection:
+            connection.executemany(
+                f"INSERT INTO transcriptions ({', '.join(RECORD_FIELDS)}, created_at) "
+                f"VALUES ({', '.join('?' for _ in RECORD_FIELDS)}, ?)",
+                ([record.get(field) for field in RECORD_FIELDS] + [time.time()] for record in batch)
+            )
+    with connection:
+        rebuild_rollups(connection)
+
+
+def time_lookups(lookup, sessions):
+    latencies = []
+    for session_id in sessions:
+        start = time.perf_counter()
+        lookup(session_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return percentile(latencies, 0.5), percentile(latencies, 0.99)
+
+
+def main(sizes):
+    sizes = sorted(sizes)
+    print(f"📊 Session lookups ({LOOKUPS} random sessions of {RECORDS_PER_SESSION} records per size)")
+    print(f"{'records':>10} {'sqlite p50 ms':>14} {'sqlite p99 ms':>14} {'list p50 ms':>12} {'list p99 ms':>12} "
+          f"{'stats p50 ms':>13}")
+
+    records = [make_record(index) for index in range(sizes[-1])]
+    with tempfile.TemporaryDirectory() as directory:
+        store = TranscriptionStore(os.path.join(directory, 'benchmark.db'))
+        filled = 0
+        for size in sizes:
+            fill(store, records, filled, size)
+            filled = size
+            sessions = [f'session-{random.randrange(size // RECORDS_PER_SESSION)}' for _ in range(LOOKUPS)]
+
+            sqlite_p50, sqlite_p99 = time_lookups(store.by_session, sessions)
+            if size <= LIST_SCAN_LIMIT:
+                in_memory = records[:size]
+                list_p50, list_p99 = time_lookups(
+                    lambda session_id: [t for t in in_memory if t.get('session_id') == session_id],
+                    sessions[:50]
+                )
+                list_columns = f"{list_p50:>12.3f} {list_p99:>12.3f}"
+            else:
+                list_columns = f"{'-':>12} {'-':>12}"
+            stats_p50, _ = time_lookups(lambda session_id: store.rollups(24, 30, session_id), sessions[:50])
+            print(f"{size:>10} {sqlite_p50:>14.3f} {sqlite_p99:>14.3f} {list_columns} {stats_p50:>13.3f}")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
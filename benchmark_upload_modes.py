@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark the three /transcribe-audio upload modes (JSON base64, multipart, raw)
+
+For 1-, 10- and 60-minute clips this measures how long the server takes to
+spool the request body and how much the peak RSS grows while doing it.
+Each measurement runs in a fresh process so peaks don't leak between runs, and
+the request body is prepared on disk beforehand so only server-side cost is
+counted. Transcription itself is not run.
+
+Usage: python benchmark_upload_modes.py [minutes ...]
+"""
+
+import base64
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+MODES = ['json', 'multipart', 'raw']
+DEFAULT_DURATIONS = [1, 10, 60]  # minutes
+SAMPLE_RATE = 16000
+BOUNDARY = 'benchmarkboundary'
+
+
+def create_test_wav(path, minutes):
+    """Write a 16 kHz mono 16-bit WAV of the given length (low-level noise)"""
+    frames_per_chunk = SAMPLE_RATE * 10
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        for _ in range(minutes * 6):
+            wav_file.writeframes(os.urandom(frames_per_chunk * 2))
+
+
+def write_request_body(mode, wav_path, body_path):
+    """Write the HTTP body for a mode to disk and return its content type"""
+    if mode == 'json':
+        with open(wav_path, 'rb') as f:
+            audio_base64 = base64.b64encode(f.read()).decode('utf-8')
+        with open(body_path, 'w') as f:
+            json.dump({'audio_data': audio_base64, 'audio_format': 'wav'}, f)
+        return 'application/json'
+
+    if mode == 'multipart':
+        with open(body_path, 'wb') as body, open(wav_path, 'rb') as wav_file:
+            body.write((
+                f'--{BOUNDARY}\r\n'
+                'Content-Disposition: form-data; name="audio_format"\r\n\r\n'
+                'wav\r\n'
+                f'--{BOUNDARY}\r\n'
+                'Content-Disposition: form-data; name="audio"; filename="clip.wav"\r\n'
+                'Content-Type: audio/wav\r\n\r\n'
+            ).encode('utf-8'))
+            while True:
+                chunk = wav_file.read(1024 * 1024)
+                if not chunk:
+                    break
+                body.write(chunk)
+            body.write(f'\r\n--{BOUNDARY}--\r\n'.encode('utf-8'))
+        return f'multipart/form-data; boundary={BOUNDARY}'
+
+    os.link(wav_path, body_path)
+    return 'application/octet-stream'
+
+
+def run_child(body_path, content_type):
+    """Spool one request body through the server code and report cost"""
+    import app
+
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    body_size = os.path.getsize(body_path)
+
+    with open(body_path, 'rb') as body:
+        start = time.perf_counter()
+        with app.app.test_request_context(
+            '/transcribe-audio?audio_format=wav',
+            method='POST',
+            input_stream=body,
+            content_type=content_type,
+            content_length=body_size,
+        ):
+            spool_file, audio_size, _ = app.spool_audio_upload()
+        elapsed = time.perf_counter() - start
+
+    spool_file.close()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(json.dumps({
+        'latency': elapsed,
+        'rss_growth_kb': peak_rss - baseline_rss,
+        'body_size': body_size,
+        'audio_size': audio_size,
+    }))
+
+
+def main(durations):
+    print("📊 Upload mode benchmark (server-side spool only)")
+    print(f"{'clip':>8} {'mode':>10} {'body MB':>9} {'latency s':>10} {'peak RSS +MB':>13}")
+
+    work_dir = tempfile.mkdtemp(prefix='upload_bench_')
+    try:
+        for minutes in durations:
+            wav_path = os.path.join(work_dir, f'clip_{minutes}.wav')
+            create_test_wav(wav_path, minutes)
+
+            for mode in MODES:
+                body_path = os.path.join(work_dir, f'body_{minutes}_{mode}')
+                content_type = write_request_body(mode, wav_path, body_path)
+
+                output = subprocess.run(
+                    [sys.executable, __file__, '--child', body_path, content_type],
+                    capture_output=True, text=True, check=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                os.unlink(body_path)
+
+                print(f"{minutes:>6}m {mode:>10} {result['body_size'] / 1e6:>9.1f} "
+                      f"{result['latency']:>10.3f} {result['rss_growth_kb'] / 1024:>13.1f}")
+
+            os.unlink(wav_path)
+    finally:
+        os.rmdir(work_dir)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        run_child(sys.argv[2], sys.argv[3])
+    else:
+        main([int(arg) for arg in sys.argv[1:]] or DEFAULT_DURATIONS)
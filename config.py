@@ -7,7 +7,7 @@ FLASK_PORT = 5000
 FLASK_DEBUG = True
 
 # Transcription settings
-TRANSCRIPTIONS_FOLDER = "transcriptions"
+TRANSCRIPTIONS_FOLDER = "transcriptions"  # legacy *_transcription.txt files, served by name; keep data/ out of it
 DEFAULT_LANGUAGE = "en-US"
 
 # Session management
@@ -16,6 +16,8 @@ MAX_SESSION_TRANSCRIPTIONS = 100
 
 # Logging configuration
 LOG_LEVEL = "INFO"
+LOG_PROFILE = "production"  # "production": queued JSON lines; "debug": verbose plain text, transcripts included
+LOG_DEBUG_SAMPLE_RATE = 0.01  # share of the app's debug-level detail kept in the production profile (never transcripts)
 
 # Browser Speech Recognition settings
 SPEECH_RECOGNITION_CONFIG = {
@@ -27,4 +29,106 @@ SPEECH_RECOGNITION_CONFIG = {
 
 # File storage settings
 MAX_TRANSCRIPTION_LENGTH = 10000  # characters
-AUTO_SAVE_INTERVAL = 30  # seconds 
\ No newline at end of file
+AUTO_SAVE_INTERVAL = 30  # seconds 
+
+# Audio upload settings
+MAX_AUDIO_UPLOAD_SIZE = 512 * 1024 * 1024  # bytes
+UPLOAD_CHUNK_SIZE = 64 * 1024  # bytes copied per read when spooling uploads
+UPLOAD_SPOOL_MEMORY_LIMIT = 32 * 1024 * 1024  # uploads above this spill to a temp file
+
+# Chunked upload sessions
+MAX_UPLOAD_CHUNK_SIZE = 16 * 1024 * 1024  # bytes per chunk
+UPLOAD_SESSION_TIMEOUT = 3600  # seconds an idle upload session is kept
+STREAMING_CONVERSION_TIMEOUT = 120  # seconds to wait for ffmpeg at finalize
+
+# Transcription cache (keyed by hash of the normalised audio)
+TRANSCRIPTION_CACHE_FOLDER = "data/cache"
+TRANSCRIPTION_CACHE_MEMORY_ENTRIES = 256
+TRANSCRIPTION_CACHE_DISK_BYTES = 64 * 1024 * 1024
+TRANSCRIPTION_CACHE_TTL = 7 * 24 * 3600  # seconds
+
+# Async transcription jobs (POST /transcribe-audio?async=1)
+TRANSCRIPTION_WORKERS = 4
+MAX_QUEUED_JOBS = 64
+JOB_RESULT_TTL = 3600  # seconds finished job results are kept
+
+# SpeechBrain batching (/transcribe-batch and the single-clip micro-batcher)
+SPEECHBRAIN_MAX_BATCH_SIZE = 8  # clips per forward pass
+SPEECHBRAIN_BATCH_WAIT = 0.05  # seconds a clip waits for others to share its batch
+MAX_BATCH_CLIPS = 32  # clips accepted by one /transcribe-batch request
+
+# Model loading (create_app)
+SPEECHBRAIN_BACKGROUND_LOAD = True  # load on a thread so the server starts accepting connections at once
+SPEECHBRAIN_WARMUP = True  # run one inference on synthetic audio before reporting ready
+WARMUP_AUDIO_SECONDS = 1.0
+
+# SpeechBrain inference processes (forked after the model loads; 0 = run in the server process)
+SPEECHBRAIN_INFERENCE_PROCESSES = 0
+TORCH_THREADS_PER_PROCESS = 2
+PIN_INFERENCE_CPUS = True  # give each process its own CPUs (Linux)
+
+# Long-audio mode: split at silences and decode segments in parallel (SpeechBrain)
+LONG_AUDIO_THRESHOLD = 60  # seconds; longer clips are segmented unless long_audio=false
+VAD_MAX_SEGMENT_SECONDS = 20
+VAD_MIN_SILENCE_MS = 300  # shorter pauses don't split a segment
+VAD_ENERGY_MARGIN_DB = 12  # dB above the noise floor that counts as speech
+
+# Silence trimming before remote Whisper uploads (override per request with trim_silence)
+WHISPER_TRIM_SILENCE = False  # opt in per request with trim_silence=true
+WHISPER_MAX_PAUSE_MS = 300  # longer pauses are shortened to this
+
+# Replicate (OpenAI Whisper) client
+REPLICATE_API_URL = "https://api.replicate.com/v1"  # point at fake_replicate_server.py to test offline
+WHISPER_MODEL_VERSION = "8099696689d249cf8b122d833c36ac3f75505c666a395ca40ef26f68e7d3d16e"
+REPLICATE_MAX_IN_FLIGHT = 8  # concurrent predictions
+REPLICATE_POOL_SIZE = 16  # pooled HTTP connections
+REPLICATE_TIMEOUT = 300  # seconds per Whisper call, including queueing for a slot
+REPLICATE_POLL_INTERVAL = 0.5  # seconds, backing off to 5
+
+# Engine routing (order of Whisper / SpeechBrain / Google per request)
+ADAPTIVE_ROUTING = True  # False keeps the fixed Whisper → SpeechBrain → Google order
+ROUTER_WINDOW = 100  # recent calls per engine used for latency and error rate
+ROUTER_MIN_SAMPLES = 5  # calls before an engine's latency is trusted
+BREAKER_FAILURE_THRESHOLD = 5  # consecutive failures that open an engine's circuit breaker
+BREAKER_ERROR_RATE = 0.5  # or error rate over the window
+BREAKER_COOLDOWN = 30  # seconds before a tripped engine gets a trial request
+
+# Hedged requests: race the first two engines once the first is slow (override per request with hedge)
+HEDGED_REQUESTS = False
+HEDGE_DELAY = None  # seconds; None = the first engine's HEDGE_PERCENTILE latency
+HEDGE_PERCENTILE = 0.9
+HEDGE_DEFAULT_DELAY = 2.0  # seconds, until the first engine has enough history
+HEDGE_WORKERS = 8  # threads running hedged engine calls
+
+# Request deadlines (override per request with deadline, in seconds)
+REQUEST_DEADLINE = 120  # seconds a /transcribe-audio request may take end to end
+MAX_REQUEST_DEADLINE = 600  # upper limit on client-supplied deadlines
+
+# Transcription store (SQLite in WAL mode, shared by all worker processes)
+TRANSCRIPTION_DB_PATH = "data/transcriptions.db"
+TRANSCRIPTIONS_PAGE_SIZE = 100  # default GET /transcriptions page size
+MAX_TRANSCRIPTIONS_PAGE_SIZE = 1000
+
+# In-memory view of active sessions (bounded by SESSION_TIMEOUT, MAX_SESSION_TRANSCRIPTIONS, MAX_TRANSCRIPTION_LENGTH)
+SESSION_CACHE_MAX_SESSIONS = 1000
+
+# Append-only transcription log (replaces one .txt file per transcription)
+TRANSCRIPTION_LOG_FOLDER = "data/log"
+TRANSCRIPTION_LOG_SEGMENT_BYTES = 16 * 1024 * 1024  # start a new segment after this many bytes
+
+# Background transcription writer (batches log appends and store inserts off the request path)
+PERSISTENCE_QUEUE_SIZE = 10000  # records waiting to be written before saves are refused with 503
+PERSISTENCE_BATCH_SIZE = 500  # records written per log append / SQLite transaction
+PERSISTENCE_ENQUEUE_TIMEOUT = 2.0  # seconds a save waits for room in a full queue
+PERSISTENCE_FSYNC = "batch"  # fsync the log: "none", "batch" (once per batch) or "record" (after every record)
+PERSISTENCE_READ_TIMEOUT = 5.0  # seconds a read waits for earlier saves to be written
+
+# Full-text search (GET /search)
+SEARCH_PAGE_SIZE = 20  # default results per page (up to MAX_TRANSCRIPTIONS_PAGE_SIZE)
+SEARCH_SYNC_WINDOW = 1000  # ids below the highest indexed one re-checked for records other workers stored late
+
+# Usage rollups (GET /stats)
+STATS_HOURS = 24  # hourly rollups returned by default (override with ?hours=)
+STATS_DAYS = 30  # daily rollups returned by default (override with ?days=)
+MAX_STATS_HOURS = 24 * 31
+MAX_STATS_DAYS = 366
@@ -0,0 +1,218 @@
+"""
+Latency-aware routing between transcription engines
+
+The fallback chain used to be fixed (Whisper → SpeechBrain → Google), so a
+Whisper outage or slowdown was paid on every request. The router keeps a
+rolling window of each engine's latency and outcome, fits latency against
+clip duration, and orders engines by expected time for the clip at hand
+(penalised by their error rate). A circuit breaker per engine takes engines
+that keep failing out of rotation for a cooldown, then lets one trial
+request through before closing again.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from job_queue import percentile
+
+logger = logging.getLogger(__name__)
+
+# Number of recent routing decisions kept for /health
+DECISION_HISTORY = 20
+
+
+class CircuitBreaker:
+    """closed → open (after repeated failures) → half_open (after cooldown) → closed"""
+
+    def __init__(self, failure_threshold, error_rate_threshold, cooldown):
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_started = None
+        self.trips = 0
+
+    def available(self, take_trial=True):
+        """
+        Whether a request may use the engine now
+
+        When half-open, only the first caller gets the trial request (pass
+        take_trial=False to check without claiming it). A trial that never
+        reports back is released after another cooldown.
+        """
+        now = time.time()
+        if self.state == 'open' and now - self.opened_at >= self.cooldown:
+            self.state = 'half_open'
+            self.trial_started = None
+        if self.state != 'half_open':
+            return self.state == 'closed'
+        if self.trial_started is not None and now - self.trial_started < self.cooldown:
+            return False
+        if take_trial:
+            self.trial_started = now
+        return True
+
+    def record(self, ok, error_rate, samples, min_samples):
+        if ok:
+            self.consecutive_failures = 0
+            if self.state == 'half_open':
+                self.state = 'closed'
+                self.trial_started = None
+            return None
+
+        self.consecutive_failures += 1
+        should_open = (
+            self.state == 'half_open'
+            or self.consecutive_failures >= self.failure_threshold
+            or (samples >= min_samples and error_rate >= self.error_rate_threshold)
+        )
+        if should_open and self.state != 'open':
+            self.state = 'open'
+            self.opened_at = time.time()
+            self.trips += 1
+            return 'opened'
+        return None
+
+
+class EngineStats:
+    """Rolling window of (clip seconds, latency, ok) for one engine"""
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+
+    def record(self, clip_seconds, latency, ok):
+        self.samples.append((clip_seconds, latency, ok))
+
+    def error_rate(self):
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, _, ok in self.samples if not ok) / len(self.samples)
+
+    def successes(self):
+        return [(seconds, latency) for seconds, latency, ok in self.samples if ok]
+
+    def latency_model(self, min_samples):
+        """(intercept, seconds per audio second) fitted to successful calls, or None"""
+        successes = self.successes()
+        if len(successes) < min_samples:
+            return None
+        durations = np.array([seconds for seconds, _ in successes])
+        latencies = np.array([latency for _, latency in successes])
+        if np.ptp(durations) < 1e-3:
+            return float(np.median(latencies)), 0.0
+        slope, intercept = np.polyfit(durations, latencies, 1)
+        return max(float(intercept), 0.0), max(float(slope), 0.0)
+
+
+class EngineRouter:
+    """Orders engines per request from their observed latency, errors and breaker state"""
+
+    def __init__(self, window, min_samples, failure_threshold, error_rate_threshold, cooldown):
+        self.window = window
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.breakers = {}
+        self.decisions = deque(maxlen=DECISION_HISTORY)
+
+    def _engine(self, engine):
+        if engine not in self.stats:
+            self.stats[engine] = EngineStats(self.window)
+            self.breakers[engine] = CircuitBreaker(self.failure_threshold, self.error_rate_threshold, self.cooldown)
+        return self.stats[engine], self.breakers[engine]
+
+    def expected_latency(self, engine, clip_seconds):
+        """Expected seconds to a result, inflated by the engine's error rate; None without data"""
+        with self.lock:
+            return self._expected_latency(engine, clip_seconds)
+
+    def _expected_latency(self, engine, clip_seconds):
+        # Caller holds self.lock: record() appends to the same sample window
+        stats, _ = self._engine(engine)
+        model = stats.latency_model(self.min_samples)
+        if model is None:
+            return None
+        intercept, slope = model
+        return (intercept + slope * clip_seconds) / max(1.0 - stats.error_rate(), 0.05)
+
+    def latency_percentile(self, engine, fraction):
+        """Percentile of an engine's successful call latencies; None without enough data"""
+        with self.lock:
+            latencies = [latency for _, latency in self._engine(engine)[0].successes()]
+        if len(latencies) < self.min_samples:
+            return None
+        return percentile(latencies, fraction)
+
+    def order(self, candidates, clip_seconds, preferred=None):
+        """
+        Return candidates in the order they should be tried
+
+        Engines with an open breaker are dropped (unless every engine is
+        open). Engines without enough data keep their given position; the
+        rest are sorted by expected latency. An explicitly requested
+        (preferred) engine stays first unless its breaker is open, so audio
+        meant for one engine is not sent to another first for speed.
+        """
+        with self.lock:
+            open_engines = [engine for engine in candidates if not self._engine(engine)[1].available()]
+            healthy = [engine for engine in candidates if engine not in open_engines] or list(candidates)
+            expected = {engine: self._expected_latency(engine, clip_seconds) for engine in healthy}
+
+            known = sorted((engine for engine in healthy if expected[engine] is not None), key=lambda e: expected[e])
+            ordered = []
+            for engine in healthy:
+                # Unmeasured engines keep their slot; measured ones fill theirs fastest-first
+                ordered.append(engine if expected[engine] is None else known.pop(0))
+
+            if preferred in ordered and preferred not in open_engines:
+                ordered.remove(preferred)
+                ordered.insert(0, preferred)
+
+            self.decisions.append({
+                'time': time.time(),
+                'clip_seconds': round(clip_seconds, 2),
+                'preferred': preferred,
+                'order': ordered,
+                'skipped': open_engines,
+                'expected_latency': {engine: round(value, 3) for engine, value in expected.items() if value is not None},
+            })
+        if ordered and ordered[0] != preferred:
+            logger.debug("🧭 Routing %.1fs clip to %s (preferred %s, skipped %s)", clip_seconds, ordered[0], preferred, open_engines)
+        return ordered
+
+    def record(self, engine, clip_seconds, latency, ok):
+        """Record the outcome of one engine call"""
+        with self.lock:
+            stats, breaker = self._engine(engine)
+            stats.record(clip_seconds, latency, ok)
+            if breaker.record(ok, stats.error_rate(), len(stats.samples), self.min_samples) == 'opened':
+                logger.warning(f"🔌 Circuit breaker opened for {engine} (error rate {stats.error_rate():.0%})")
+
+    def snapshot(self):
+        with self.lock:
+            engines = {}
+            for engine, stats in self.stats.items():
+                breaker = self.breakers[engine]
+                breaker.available(take_trial=False)
+                latencies = [latency for _, latency in stats.successes()]
+                model = stats.latency_model(self.min_samples)
+                engines[engine] = {
+                    'samples': len(stats.samples),
+                    'error_rate': round(stats.error_rate(), 3),
+                    'latency_p50': round(percentile(latencies, 0.5), 3),
+                    'latency_p90': round(percentile(latencies, 0.9), 3),
+                    'latency_p99': round(percentile(latencies, 0.99), 3),
+                    'latency_model': {'overhead': round(model[0], 3), 'per_audio_second': round(model[1], 3)} if model else None,
+                    'breaker': breaker.state,
+                    'breaker_trips': breaker.trips,
+                }
+            return {'engines': engines, 'recent_decisions': list(self.decisions)}
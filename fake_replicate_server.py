@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Replicate HTTP API
+
+Implements the endpoints ReplicateClient uses: create, get and cancel
+predictions, and file uploads. Each prediction reports `processing` until
+`latency` seconds have passed and then succeeds with a Whisper-shaped
+output (or fails, for a `failure_rate` share of them). The server counts the
+TCP connections it accepts, so connection reuse can be checked.
+
+Usage: python fake_replicate_server.py [port] [latency seconds]
+Then point REPLICATE_API_URL at http://localhost:<port>/v1
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+
+
+class FakeReplicateServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=1.0, failure_rate=0.0):
+        super().__init__(('127.0.0.1', port), FakeReplicateHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.lock = threading.Lock()
+        self.predictions = {}
+        self.connections = 0
+        self.created = 0
+        self.canceled = 0
+        self.uploads = 0
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/v1'
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='fake-replicate', daemon=True).start()
+        return self
+
+    def prediction_view(self, prediction_id):
+        prediction = self.predictions[prediction_id]
+        if prediction['status'] in ('starting', 'processing') and time.time() >= prediction['ready_at']:
+            if random.random() < self.failure_rate:
+                prediction.update(status='failed', error='Simulated model failure')
+            else:
+                prediction.update(status='succeeded', output={
+                    'transcription': 'this is a fake transcription',
+                    'segments': [{'start': 0.0, 'end': 1.0, 'text': ' this is a fake transcription'}],
+                })
+        elif prediction['status'] == 'starting':
+            prediction['status'] = 'processing'
+
+        url = f"{self.base_url}/predictions/{prediction_id}"
+        return {
+            'id': prediction_id,
+            'status': prediction['status'],
+            'output': prediction.get('output'),
+            'error': prediction.get('error'),
+            'urls': {'get': url, 'cancel': f'{url}/cancel'},
+        }
+
+
+class FakeReplicateHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, as the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def do_POST(self):
+        server = self.server
+        body = self._read_body()
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self._send(401, {'detail': 'Missing token'})
+
+        with server.lock:
+            if self.path == '/v1/predictions':
+                request = json.loads(body)
+                if 'version' not in request or 'input' not in request:
+                    return self._send(422, {'detail': 'version and input are required'})
+                prediction_id = uuid.uuid4().hex
+                server.predictions[prediction_id] = {'status': 'starting', 'ready_at': time.time() + server.latency}
+                server.created += 1
+                return self._send(201, server.prediction_view(prediction_id))
+
+            if self.path == '/v1/files':
+                server.uploads += 1
+                file_id = uuid.uuid4().hex
+                return self._send(201, {'id': file_id, 'urls': {'get': f'{server.base_url}/files/{file_id}'}})
+
+            if self.path.startswith('/v1/predictions/') and self.path.endswith('/cancel'):
+                prediction_id = self.path.split('/')[3]
+                if prediction_id not in server.predictions:
+                    return self._send(404, {'detail': 'Not found'})
+                server.predictions[prediction_id]['status'] = 'canceled'
+                server.canceled += 1
+                return self._send(200, server.prediction_view(prediction_id))
+
+        self._send(404, {'detail': 'Not found'})
+
+    def do_GET(self):
+        server = self.server
+        if self.path.startswith('/v1/predictions/'):
+            prediction_id = self.path.split('/')[3]
+            with server.lock:
+                if prediction_id in server.predictions:
+                    return self._send(200, server.prediction_view(prediction_id))
+        self._send(404, {'detail': 'Not found'})
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    server = FakeReplicateServer(port, latency)
+    print(f"🤖 Fake Replicate API on {server.base_url} ({latency}s per prediction)")
+    server.serve_forever()
@@ -0,0 +1,27 @@
+"""
+Per-process resources in forked children
+
+With gunicorn --preload (and the SpeechBrain inference pool) the server
+forks after its module-level objects exist. A child inherits their open
+file descriptions, so a file lock taken through one does not exclude the
+parent; it inherits SQLite connections, which must not be used across a
+fork; and it has none of the parent's background threads. Objects holding
+such resources register a method here to re-create them in each child.
+"""
+
+import os
+import weakref
+
+
+def after_fork_in_child(method):
+    """Call a bound method in every child forked from now on, for as long as its object is alive"""
+    if not hasattr(os, 'register_at_fork'):
+        return  # Windows: no fork
+    reference = weakref.WeakMethod(method)
+
+    def hook():
+        bound = reference()
+        if bound is not None:
+            bound()
+
+    os.register_at_fork(after_in_child=hook)
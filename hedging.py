@@ -0,0 +1,107 @@
+"""
+Hedged engine requests
+
+With hedging on, the first engine in the routing order gets a head start of
+`delay` seconds (by default its own p90 latency). If it hasn't answered by
+then, the second engine is started too and whichever returns a good result
+first wins; the other is told to cancel through its threading.Event (a
+Replicate prediction is cancelled server-side, a local decode's result is
+simply dropped). This trims the tail where the serial chain would pay one
+engine's slow failure and then the next engine's full latency.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from job_queue import TIMING_WINDOW, percentile
+
+logger = logging.getLogger(__name__)
+
+
+class HedgeStats:
+    """How often hedging fired and the latency hedged requests saw, per primary engine"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.fired = 0
+        self.hedge_wins = 0
+        self.latencies = {}  # primary engine -> deque of end-to-end seconds
+
+    def record(self, primary, latency, fired, hedge_won):
+        with self.lock:
+            self.requests += 1
+            self.fired += fired
+            self.hedge_wins += hedge_won
+            self.latencies.setdefault(primary, deque(maxlen=TIMING_WINDOW)).append(latency)
+
+    def snapshot(self, baseline_percentile):
+        """baseline_percentile(engine, fraction) gives that engine's own latency percentile"""
+        with self.lock:
+            by_primary = {}
+            for engine, latencies in self.latencies.items():
+                latencies = list(latencies)
+                hedged_p99 = percentile(latencies, 0.99)
+                engine_p99 = baseline_percentile(engine, 0.99)
+                by_primary[engine] = {
+                    'requests': len(latencies),
+                    'latency_p50': round(percentile(latencies, 0.5), 3),
+                    'latency_p95': round(percentile(latencies, 0.95), 3),
+                    'latency_p99': round(hedged_p99, 3),
+                    'engine_latency_p95': round(baseline_percentile(engine, 0.95), 3),
+                    'engine_latency_p99': round(engine_p99, 3),
+                    'p99_removed': round(max(engine_p99 - hedged_p99, 0.0), 3),
+                }
+            return {
+                'requests': self.requests,
+                'fired': self.fired,
+                'fire_rate': round(self.fired / self.requests, 3) if self.requests else 0.0,
+                'hedge_wins': self.hedge_wins,
+                'by_primary': by_primary,
+            }
+
+
+def run_hedged(executor, attempt, primary, secondary, delay, stats):
+    """
+    Race `attempt(engine, cancel_event)` on two engines
+
+    Returns (engine, result) for the first success. Raises the last error if
+    both fail; if the primary fails before the delay the secondary is just
+    run next, as in the serial chain.
+    """
+    start = time.time()
+    cancel_events = {primary: threading.Event(), secondary: threading.Event()}
+    futures = {executor.submit(attempt, primary, cancel_events[primary]): primary}
+
+    done, _ = wait(futures, timeout=delay)
+    fired = not done
+    if fired:
+        logger.info(f"🏁 {primary} slower than {delay:.2f}s, hedging with {secondary}")
+        futures[executor.submit(attempt, secondary, cancel_events[secondary])] = secondary
+    elif next(iter(done)).exception() is not None:
+        # Primary failed quickly; fall back without a race
+        futures[executor.submit(attempt, secondary, cancel_events[secondary])] = secondary
+
+    pending = set(futures)
+    last_error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                last_error = future.exception()
+                continue
+
+            winner = futures[future]
+            for engine, event in cancel_events.items():
+                if engine != winner:
+                    event.set()
+            stats.record(primary, time.time() - start, fired, fired and winner == secondary)
+            if fired:
+                logger.info(f"🏁 Hedged race won by {winner}")
+            return winner, future.result()
+
+    stats.record(primary, time.time() - start, fired, False)
+    raise last_error
@@ -0,0 +1,177 @@
+"""
+Process pool for SpeechBrain inference
+
+Inference on Flask's request threads contends for the GIL and torch's thread
+pool, so one long clip slows every other request. The pool forks N worker
+processes *after* the model is loaded: the weights are inherited
+copy-on-write instead of loaded N times. Each worker gets its own
+torch.set_num_threads and, where the OS supports it, a disjoint set of CPUs.
+Callers block on an idle worker's pipe (which releases the GIL) rather than
+running the model themselves.
+
+Workers must be forked before the parent runs any inference: an OpenMP
+thread pool started in the parent does not survive fork. Warm-up therefore
+runs inside each worker.
+"""
+
+import gc
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+from speechbrain_batcher import TORCH_AVAILABLE, transcribe_batch_samples
+
+if TORCH_AVAILABLE:
+    import torch
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(model, conn, threads, cpus):
+    """Inference process: pin, size torch's thread pool, then serve batches"""
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    if TORCH_AVAILABLE:
+        torch.set_num_threads(threads)
+
+    while True:
+        try:
+            clips = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            conn.send((True, transcribe_batch_samples(model, clips)))
+        except Exception as e:
+            conn.send((False, str(e)))
+
+
+class InferencePool:
+    """Fixed set of forked inference processes, each used by one caller at a time"""
+
+    def __init__(self, processes, threads_per_process, pin_cpus):
+        self.processes = processes
+        self.threads_per_process = threads_per_process
+        self.pin_cpus = pin_cpus
+        self.context = multiprocessing.get_context('fork')
+        self.model = None
+        self.workers = {}  # index -> (process, parent end of its pipe)
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.busy = 0
+        self.batches = 0
+        self.clips = 0
+        self.restarts = 0
+        self.inference_time = 0.0
+
+    @property
+    def started(self):
+        return self.model is not None
+
+    def start(self, model):
+        """Fork the workers; call once, after the model is loaded"""
+        self.model = model
+        # Keep the garbage collector from touching (and so copying) inherited objects
+        if hasattr(gc, 'freeze'):
+            gc.collect()
+            gc.freeze()
+
+        for index in range(self.processes):
+            self._spawn(index)
+            self.idle.put(index)
+
+        logger.info(f"🧠 Started {self.processes} inference processes "
+                    f"({self.threads_per_process} torch threads each)")
+
+    def _cpus_for(self, index):
+        if not self.pin_cpus or not hasattr(os, 'sched_getaffinity'):
+            return None
+        available = sorted(os.sched_getaffinity(0))
+        first = index * self.threads_per_process
+        return {available[(first + offset) % len(available)] for offset in range(self.threads_per_process)}
+
+    def _spawn(self, index):
+        parent_conn, child_conn = self.context.Pipe()
+        cpus = self._cpus_for(index)
+        process = self.context.Process(
+            target=_worker_main,
+            args=(self.model, child_conn, self.threads_per_process, cpus),
+            name=f'inference-worker-{index}',
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self.workers[index] = (process, parent_conn)
+        logger.info(f"🧠 Inference process {index} started (pid {process.pid}, cpus {sorted(cpus) if cpus else 'any'})")
+
+    def _call(self, index, clips):
+        process, conn = self.workers[index]
+        try:
+            conn.send(clips)
+            ok, value = conn.recv()
+        except (EOFError, OSError) as e:
+            logger.error(f"❌ Inference process {index} died: {e}")
+            conn.close()
+            process.join(timeout=1)
+            with self.lock:
+                self.restarts += 1
+            self._spawn(index)
+            raise Exception("Inference process crashed")
+
+        if not ok:
+            raise Exception(value)
+        return value
+
+    def transcribe(self, clips):
+        """Run one padded batch on the next idle worker"""
+        index = self.idle.get()
+        with self.lock:
+            self.busy += 1
+        start = time.time()
+        try:
+            return self._call(index, clips)
+        finally:
+            with self.lock:
+                self.busy -= 1
+                self.batches += 1
+                self.clips += len(clips)
+                self.inference_time += time.time() - start
+            self.idle.put(index)
+
+    def warm_up(self, clips):
+        """Run clips once on every worker"""
+        indexes = [self.idle.get() for _ in range(self.processes)]
+        try:
+            for index in indexes:
+                self.workers[index][1].send(clips)
+            # Collect every reply before raising so no pipe is left with one pending
+            errors = [value for ok, value in (self.workers[index][1].recv() for index in indexes) if not ok]
+            if errors:
+                raise Exception(errors[0])
+        finally:
+            for index in indexes:
+                self.idle.put(index)
+
+    def stop(self):
+        """Shut the workers down (they exit when their pipe closes)"""
+        for process, conn in self.workers.values():
+            conn.close()
+            process.join(timeout=5)
+        self.workers.clear()
+        self.idle = queue.Queue()
+        self.model = None
+
+    def stats(self):
+        with self.lock:
+            return {
+                'processes': self.processes if self.started else 0,
+                'threads_per_process': self.threads_per_process,
+                'busy': self.busy,
+                'idle': self.idle.qsize(),
+                'batches': self.batches,
+                'clips': self.clips,
+                'restarts': self.restarts,
+                'average_batch_time': round(self.inference_time / self.batches, 3) if self.batches else 0.0,
+            }
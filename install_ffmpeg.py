@@ -4,7 +4,7 @@
 FFmpeg Installation Helper Script
 
 This script helps install FFmpeg on Windows for audio conversion support.
-FFmpeg is required for pydub to handle M4A audio files.
+FFmpeg is required to decode M4A audio files.
 """
 
 import os
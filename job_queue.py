@@ -0,0 +1,177 @@
+"""
+Bounded worker pool for asynchronous transcription jobs
+
+`POST /transcribe-audio?async=1` spools the upload, submits the transcription
+here and returns a job id straight away; `GET /jobs/<id>` reports progress.
+A fixed number of worker threads drain a bounded queue, so slow remote calls
+occupy a worker instead of a request thread. Submissions beyond the queue
+limit are refused rather than piling up.
+"""
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Number of recent jobs the wait/service time figures are computed over
+TIMING_WINDOW = 200
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+class TranscriptionJob:
+    """A queued unit of work and, once finished, its result"""
+
+    def __init__(self, func, args):
+        self.job_id = uuid.uuid4().hex
+        self.func = func
+        self.args = args
+        self.state = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.http_status = None
+
+    def to_dict(self):
+        now = time.time()
+        job = {
+            'job_id': self.job_id,
+            'state': self.state,
+            'created_at': self.created_at,
+            'wait_time': round((self.started_at or now) - self.created_at, 3),
+        }
+        if self.started_at is not None:
+            job['service_time'] = round((self.finished_at or now) - self.started_at, 3)
+        if self.finished_at is not None:
+            job['result'] = self.result
+            job['http_status'] = self.http_status
+        return job
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class JobQueue:
+    """Fixed-size thread pool fed by a bounded FIFO queue"""
+
+    def __init__(self, workers, max_queued, result_ttl):
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.queue = queue.Queue(maxsize=max_queued)
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.threads = []
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_times = deque(maxlen=TIMING_WINDOW)
+        self.service_times = deque(maxlen=TIMING_WINDOW)
+
+    def _ensure_workers(self):
+        # Started lazily so forking WSGI servers get threads in each worker
+        with self.lock:
+            if self.threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'transcription-worker-{index}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        logger.info(f"👷 Started {self.workers} transcription workers")
+
+    def submit(self, func, *args):
+        """
+        Queue func(*args) and return the job
+
+        func must return (result_payload, http_status). Raises QueueFullError
+        if the queue is at capacity.
+        """
+        self._ensure_workers()
+        self._expire_finished()
+
+        job = TranscriptionJob(func, args)
+        with self.lock:
+            self.jobs[job.job_id] = job
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            with self.lock:
+                del self.jobs[job.job_id]
+                self.rejected += 1
+            raise QueueFullError(f'Transcription queue is full ({self.queue.maxsize} jobs waiting)')
+
+        logger.debug("📥 Job %s queued (depth %d)", job.job_id, self.queue.qsize())
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            job.started_at = time.time()
+            job.state = 'running'
+            with self.lock:
+                self.running += 1
+                self.wait_times.append(job.started_at - job.created_at)
+
+            try:
+                job.result, job.http_status = job.func(*job.args)
+            except Exception as e:
+                logger.error(f"❌ Job {job.job_id} crashed: {e}")
+                job.result = {'status': 'error', 'message': f'Unexpected error: {str(e)}'}
+                job.http_status = 500
+            finally:
+                job.func = job.args = None
+                finished_at = time.time()
+                job.state = 'succeeded' if job.http_status == 200 else 'failed'
+                job.finished_at = finished_at
+                with self.lock:
+                    self.running -= 1
+                    self.service_times.append(job.finished_at - job.started_at)
+                    if job.state == 'succeeded':
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                self.queue.task_done()
+
+            logger.info(f"📤 Job {job.job_id} {job.state} in {job.finished_at - job.started_at:.2f}s "
+                        f"(waited {job.started_at - job.created_at:.2f}s)")
+
+    def _expire_finished(self):
+        cutoff = time.time() - self.result_ttl
+        with self.lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job_id in expired:
+                del self.jobs[job_id]
+
+    def stats(self):
+        with self.lock:
+            wait_times = list(self.wait_times)
+            service_times = list(self.service_times)
+            return {
+                'workers': self.workers,
+                'queue_depth': self.queue.qsize(),
+                'queue_capacity': self.queue.maxsize,
+                'running': self.running,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'wait_time_avg': round(sum(wait_times) / len(wait_times), 3) if wait_times else 0.0,
+                'wait_time_p95': round(percentile(wait_times, 0.95), 3),
+                'service_time_avg': round(sum(service_times) / len(service_times), 3) if service_times else 0.0,
+                'service_time_p95': round(percentile(service_times, 0.95), 3),
+            }
@@ -0,0 +1,76 @@
+"""
+One-time ASR model loading and warm-up
+
+`create_app()` starts a ModelLoader, which loads the model exactly once per
+process (optionally on a background thread so the server can accept
+connections meanwhile) and then runs a throwaway inference so the first real
+request doesn't pay for lazy allocation. `/ready` reports ready only once
+that has finished.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ModelLoader:
+    """Runs load → warm-up once and tracks which stage the process is in"""
+
+    def __init__(self, load, warm_up, available):
+        self.load = load
+        self.warm_up = warm_up
+        self.available = available
+        self.lock = threading.Lock()
+        self.state = 'not_started' if available else 'unavailable'
+        self.error = None
+        self.started_at = None
+        self.load_time = None
+        self.warmup_time = None
+
+    def start(self, background=True, warm_up=True):
+        """Begin loading unless this process already has; returns immediately if background"""
+        with self.lock:
+            if self.state != 'not_started':
+                return
+            self.state = 'loading'
+            self.started_at = time.time()
+
+        if background:
+            threading.Thread(target=self._run, args=(warm_up,), name='model-loader', daemon=True).start()
+        else:
+            self._run(warm_up)
+
+    def _run(self, warm_up):
+        try:
+            if not self.load():
+                raise Exception("Model failed to load")
+            self.load_time = time.time() - self.started_at
+
+            if warm_up:
+                self.state = 'warming_up'
+                start = time.time()
+                self.warm_up()
+                self.warmup_time = time.time() - start
+                logger.info(f"🔥 Model warm-up finished in {self.warmup_time:.2f}s")
+
+            self.state = 'ready'
+        except Exception as e:
+            logger.error(f"❌ Model not ready: {e}")
+            self.error = str(e)
+            self.state = 'failed'
+
+    @property
+    def ready(self):
+        # Without the optional model installed there is nothing to wait for
+        return self.state in ('ready', 'unavailable')
+
+    def snapshot(self):
+        return {
+            'state': self.state,
+            'ready': self.ready,
+            'error': self.error,
+            'load_time': round(self.load_time, 3) if self.load_time is not None else None,
+            'warmup_time': round(self.warmup_time, 3) if self.warmup_time is not None else None,
+        }
@@ -0,0 +1,186 @@
+"""
+Background writer for transcription records
+
+Saving a transcription used to append it to the log and insert it into the
+store on the request thread, so a burst of saves queued up behind disk
+latency. Records are now handed to one writer thread through a bounded
+queue: it takes whatever has accumulated (up to max_batch records), makes
+the batch durable with `append_batch(records)` (one log append and fsync),
+and then applies it with `apply_batch(records)` (one SQLite transaction).
+
+`submit()` returns once its record's batch has been appended, so a save is
+only acknowledged after it is in the log - concurrent saves share one
+fsync. If the append keeps failing, every submitter of the batch gets the
+error. A batch that is appended but cannot be applied is kept and retried
+ahead of later batches; it is never dropped, and the log replays it at
+startup if the process dies first. When the queue (plus the batches waiting
+to be applied) is full, callers wait up to enqueue_timeout for room and
+then get QueueFullError, so a stalled disk turns into 503s instead of
+unbounded memory.
+
+A request that reads back what it saved calls `barrier()` first, which
+waits until everything queued before the call has been applied.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from job_queue import QueueFullError, TIMING_WINDOW, percentile
+
+logger = logging.getLogger(__name__)
+
+# Tries per batch before an append is given up on (its submitters get the error)
+WRITE_ATTEMPTS = 3
+RETRY_DELAY = 0.5
+
+
+class PersistenceWriter:
+    """Bounded queue of records drained in batches by a single writer thread"""
+
+    def __init__(self, append_batch, apply_batch, max_queued, max_batch, enqueue_timeout):
+        self.append_batch = append_batch
+        self.apply_batch = apply_batch
+        self.max_queued = max_queued
+        self.max_batch = max_batch
+        self.enqueue_timeout = enqueue_timeout
+        self.condition = threading.Condition()
+        self.pending = deque()  # (queued_at, record, appended future), oldest first
+        self.unapplied = []  # (queued_at, record) appended but not yet applied, oldest first
+        self.thread = None
+        self.writing_since = None  # queued_at of the oldest record in the batch being written
+        self.submitted = 0
+        self.written = 0  # records applied, or refused because their append failed
+        self.failed = 0
+        self.rejected = 0
+        self.batches = 0
+        self.lags = deque(maxlen=TIMING_WINDOW)
+
+    def _ensure_thread(self):
+        # Started lazily so forking WSGI servers get a writer in each worker
+        with self.condition:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._run, name='persistence-writer', daemon=True)
+            self.thread.start()
+        logger.info("💾 Started the transcription writer")
+
+    def submit(self, record):
+        """
+        Queue a record and wait until its batch is appended
+
+        Raises QueueFullError if there is no room within enqueue_timeout, or
+        the append's error if the batch could not be appended.
+        """
+        self.submit_many([record])
+
+    def submit_many(self, records):
+        """Queue several records at once (all or none) and wait once for them to be appended"""
+        self._ensure_thread()
+        deadline = time.monotonic() + self.enqueue_timeout
+        room_needed = min(len(records), self.max_queued)
+        appended = [Future() for _ in records]
+        with self.condition:
+            while len(self.pending) + len(self.unapplied) + room_needed > self.max_queued:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += len(records)
+                    raise QueueFullError(f'Transcription writer is behind ({len(self.pending) + len(self.unapplied)} records waiting)')
+                self.condition.wait(remaining)
+            queued_at = time.time()
+            self.pending.extend(zip([queued_at] * len(records), records, appended))
+            self.submitted += len(records)
+            self.condition.notify_all()
+        for future in appended:
+            future.result()
+
+    def barrier(self, timeout=None):
+        """Wait until every record queued before this call is applied; False on timeout"""
+        with self.condition:
+            target = self.submitted
+            return self.condition.wait_for(lambda: self.written >= target, timeout)
+
+    def _attempt(self, write, records, action, attempts):
+        """Call write(records) up to attempts times; returns the last error, or None once it succeeds"""
+        for attempt in range(1, attempts + 1):
+            try:
+                write(records)
+                return None
+            except Exception as e:
+                error = e
+                logger.error(f"❌ {action} {len(records)} transcriptions failed (attempt {attempt}): {e}")
+                if attempt < attempts:
+                    time.sleep(RETRY_DELAY * attempt)
+        return error
+
+    def _applied(self, batch):
+        written_at = time.time()
+        with self.condition:
+            self.written += len(batch)
+            self.lags.extend(written_at - queued_at for queued_at, _ in batch)
+            self.condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                # Wake up now and then to retry batches that could not be applied
+                self.condition.wait_for(lambda: self.pending, RETRY_DELAY * WRITE_ATTEMPTS if self.unapplied else None)
+                batch = [self.pending.popleft() for _ in range(min(len(self.pending), self.max_batch))]
+                unapplied = self.unapplied
+                oldest = unapplied or batch
+                self.writing_since = oldest[0][0] if oldest else None
+                self.condition.notify_all()  # room for waiting submitters
+
+            if unapplied and self._attempt(self.apply_batch, [record for _, record in unapplied], 'Applying', 1) is None:
+                with self.condition:
+                    self.unapplied = []
+                self._applied(unapplied)
+
+            if batch:
+                records = [record for _, record, _ in batch]
+                error = self._attempt(self.append_batch, records, 'Appending', WRITE_ATTEMPTS)
+                for _, _, appended in batch:
+                    if error is None:
+                        appended.set_result(None)
+                    else:
+                        appended.set_exception(error)
+                batch = [(queued_at, record) for queued_at, record, _ in batch]
+                if error is not None:
+                    with self.condition:
+                        self.failed += len(batch)
+                        self.written += len(batch)  # Nothing to wait for
+                        self.condition.notify_all()
+                elif self._attempt(self.apply_batch, records, 'Applying', WRITE_ATTEMPTS) is None:
+                    self._applied(batch)
+                else:
+                    # In the log already: keep it for the next round rather than lose it until a restart
+                    with self.condition:
+                        self.unapplied = self.unapplied + batch
+                with self.condition:
+                    self.batches += 1
+
+            with self.condition:
+                self.writing_since = None
+                self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            oldest = self.writing_since
+            if oldest is None and (self.unapplied or self.pending):
+                oldest = (self.unapplied or self.pending)[0][0]
+            lags = list(self.lags)
+            return {
+                'queue_depth': len(self.pending),
+                'queue_capacity': self.max_queued,
+                'unapplied': len(self.unapplied),
+                'submitted': self.submitted,
+                'written': self.written - self.failed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'batches': self.batches,
+                'batch_size_avg': round(self.written / self.batches, 1) if self.batches else 0.0,
+                'lag_seconds': round(time.time() - oldest, 3) if oldest else 0.0,
+                'lag_p95': round(percentile(lags, 0.95), 3),
+            }
@@ -0,0 +1,207 @@
+"""
+Pooled Replicate API client
+
+`replicate.run()` opens a new connection per call, blocks until the model
+finishes and has no limit on concurrent predictions or on how long it waits.
+This client talks to the HTTP API directly over one pooled `requests.Session`:
+it creates a prediction, then polls it (backing off) until it finishes or
+the call's deadline passes, in which case the prediction is cancelled. At
+most `max_in_flight` predictions run at once; callers beyond that wait for
+a slot, but never past their deadline.
+
+`base_url` can point at fake_replicate_server.py for offline testing.
+"""
+
+import base64
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ('succeeded', 'failed', 'canceled')
+
+
+class ReplicateError(Exception):
+    """A prediction could not be created or did not succeed"""
+
+
+class PredictionTimeout(ReplicateError):
+    """The call's deadline passed before the prediction finished"""
+
+
+class PredictionCancelled(ReplicateError):
+    """The caller cancelled the prediction (e.g. another engine answered first)"""
+
+
+class ReplicateClient:
+    """Create-then-poll Replicate client with a shared connection pool and an in-flight cap"""
+
+    def __init__(self, base_url, api_token=None, max_in_flight=8, pool_size=16, timeout=300,
+                 poll_interval=0.5, max_poll_interval=5.0, request_timeout=30, data_uri_limit=1024 * 1024):
+        self.base_url = base_url.rstrip('/')
+        self._api_token = api_token
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.request_timeout = request_timeout
+        self.data_uri_limit = data_uri_limit
+
+        self.session = requests.Session()
+        # Only idempotent reads are retried; a retried create could start a second prediction
+        retries = Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504), allowed_methods=['GET'])
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.polls = 0
+
+    @property
+    def api_token(self):
+        return self._api_token or os.environ.get('REPLICATE_API_TOKEN')
+
+    @property
+    def configured(self):
+        return self.api_token is not None
+
+    def _request(self, method, url, deadline, **kwargs):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise PredictionTimeout('Deadline passed before the Replicate request was sent')
+        if not url.startswith('http'):
+            url = f'{self.base_url}{url}'
+
+        response = self.session.request(
+            method, url,
+            headers={'Authorization': f'Bearer {self.api_token}'},
+            timeout=min(remaining, self.request_timeout),
+            **kwargs
+        )
+        if response.status_code >= 400:
+            raise ReplicateError(f'Replicate API {method} {url} returned {response.status_code}: {response.text[:200]}')
+        return response.json()
+
+    def prepare_file(self, file_obj, deadline):
+        """Turn a file object into something Replicate accepts as input"""
+        file_obj.seek(0)
+        data = file_obj.read()
+        name = os.path.basename(getattr(file_obj, 'name', 'audio.wav'))
+
+        if len(data) <= self.data_uri_limit:
+            return f"data:audio/wav;base64,{base64.b64encode(data).decode('ascii')}"
+
+        # Larger files go through the Files API and are passed by URL
+        uploaded = self._request('POST', '/files', deadline, files={'content': (name, data, 'audio/wav')})
+        return uploaded['urls']['get']
+
+    def create_prediction(self, version, input, deadline):
+        """Start a prediction and return it without waiting for the model"""
+        return self._request('POST', '/predictions', deadline, json={'version': version, 'input': input})
+
+    def cancel(self, prediction):
+        try:
+            url = prediction.get('urls', {}).get('cancel') or f"/predictions/{prediction['id']}/cancel"
+            self._request('POST', url, time.monotonic() + self.request_timeout)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not cancel prediction {prediction.get('id')}: {e}")
+
+    def wait(self, prediction, deadline, cancel_event=None):
+        """
+        Poll a prediction until it reaches a terminal state
+
+        The prediction is cancelled if the deadline passes or cancel_event is set.
+        """
+        interval = self.poll_interval
+        get_url = prediction.get('urls', {}).get('get') or f"/predictions/{prediction['id']}"
+        cancel_event = cancel_event or threading.Event()
+
+        while prediction['status'] not in TERMINAL_STATES:
+            if cancel_event.wait(min(interval, max(0.0, deadline - time.monotonic()))):
+                self.cancel(prediction)
+                raise PredictionCancelled(f"Prediction {prediction['id']} cancelled")
+            if time.monotonic() >= deadline:
+                self.cancel(prediction)
+                raise PredictionTimeout(f"Prediction {prediction['id']} did not finish before its deadline")
+            interval = min(interval * 1.5, self.max_poll_interval)
+            prediction = self._request('GET', get_url, deadline)
+            with self.lock:
+                self.polls += 1
+
+        return prediction
+
+    def run(self, version, input, timeout=None, cancel_event=None):
+        """
+        Run a model and return its output
+
+        File objects in `input` are uploaded first. Raises PredictionTimeout
+        if no slot frees up or the prediction doesn't finish within `timeout`
+        seconds (default: the client's timeout), PredictionCancelled once
+        cancel_event is set, ReplicateError otherwise.
+        """
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+
+        if not self.slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            with self.lock:
+                self.timed_out += 1
+            raise PredictionTimeout(f'All {self.max_in_flight} Replicate slots stayed busy until the deadline')
+
+        with self.lock:
+            self.in_flight += 1
+        try:
+            prepared = {
+                key: self.prepare_file(value, deadline) if hasattr(value, 'read') else value
+                for key, value in input.items()
+            }
+            prediction = self.create_prediction(version, prepared, deadline)
+            logger.debug("🤖 Replicate prediction %s created", prediction['id'])
+            prediction = self.wait(prediction, deadline, cancel_event)
+
+            if prediction['status'] != 'succeeded':
+                raise ReplicateError(f"Prediction {prediction['id']} {prediction['status']}: {prediction.get('error')}")
+
+            with self.lock:
+                self.succeeded += 1
+            return prediction.get('output')
+
+        except PredictionTimeout:
+            with self.lock:
+                self.timed_out += 1
+            raise
+        except PredictionCancelled:
+            with self.lock:
+                self.cancelled += 1
+            raise
+        except Exception:
+            with self.lock:
+                self.failed += 1
+            raise
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+            self.slots.release()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'configured': self.configured,
+                'max_in_flight': self.max_in_flight,
+                'in_flight': self.in_flight,
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+                'timed_out': self.timed_out,
+                'cancelled': self.cancelled,
+                'polls': self.polls,
+            }
@@ -0,0 +1,108 @@
+"""
+End-to-end deadlines for transcription requests
+
+A request gets a time budget, either from the client (`deadline`, in seconds)
+or REQUEST_DEADLINE. Every stage (decode, each engine) asks the Deadline how
+much is left and is given no more than that: ffmpeg is killed, Replicate
+predictions are cancelled, SpeechBrain results stop being waited for and
+Google's socket times out. Engines whose expected latency doesn't fit in
+what is left are skipped. Each stage's duration and outcome is recorded, so
+a request that runs out of time can still report how far it got.
+"""
+
+import contextlib
+import threading
+import time
+
+
+class DeadlineExceeded(Exception):
+    """The request's budget ran out during `stage`"""
+
+    def __init__(self, stage, deadline):
+        super().__init__(f'Deadline of {deadline.budget:g}s exceeded during {stage}')
+        self.stage = stage
+        self.deadline = deadline
+
+
+def parse_deadline(value, default, maximum):
+    """Budget in seconds from a client-supplied value, capped at maximum; raises ValueError"""
+    if value is None or value == '':
+        return default
+    try:
+        budget = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid deadline: {value!r} (expected seconds)')
+    if budget <= 0:
+        raise ValueError('Deadline must be positive')
+    return min(budget, maximum)
+
+
+class Deadline:
+    """A request's time budget and the stages that have spent it"""
+
+    def __init__(self, budget, started=None):
+        self.budget = budget
+        self.started = started if started is not None else time.monotonic()
+        self.expires_at = self.started + budget
+        self.lock = threading.Lock()
+        self.stages = []
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def fits(self, expected_seconds):
+        """Whether a stage expected to take expected_seconds (None = unknown) can finish in time"""
+        return expected_seconds is None or expected_seconds <= self.remaining()
+
+    def record(self, stage, seconds, outcome, **details):
+        with self.lock:
+            self.stages.append({'stage': stage, 'seconds': round(seconds, 3), 'outcome': outcome, **details})
+
+    def skip(self, stage, expected_seconds):
+        """Record a stage left out because it wouldn't finish in time"""
+        self.record(stage, 0.0, 'skipped', expected_seconds=round(expected_seconds, 3),
+                    remaining_seconds=round(self.remaining(), 3))
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Time a stage and record its outcome
+
+        Raises DeadlineExceeded if there is no budget left to start it. An
+        exception raised after the budget ran out (a killed ffmpeg, a
+        timed-out socket, ...) is reported as DeadlineExceeded too.
+        """
+        if self.expired:
+            self.record(name, 0.0, 'not_started')
+            raise DeadlineExceeded(name, self)
+
+        start = time.monotonic()
+        try:
+            yield self
+        except DeadlineExceeded:
+            self.record(name, time.monotonic() - start, 'timed_out')
+            raise
+        except Exception as e:
+            if self.expired:
+                self.record(name, time.monotonic() - start, 'timed_out')
+                raise DeadlineExceeded(name, self) from e
+            self.record(name, time.monotonic() - start, 'failed')
+            raise
+        self.record(name, time.monotonic() - start, 'ok')
+
+    def report(self):
+        with self.lock:
+            stages = list(self.stages)
+        return {
+            'budget_seconds': self.budget,
+            'elapsed_seconds': round(self.elapsed(), 3),
+            'remaining_seconds': round(self.remaining(), 3),
+            'stages': stages,
+        }
@@ -0,0 +1,297 @@
+"""
+In-memory full-text index of stored transcriptions
+
+Maps each token to its postings: the ids of the records containing it, in
+ascending order, with the token's word positions in each record. Postings are
+flat arrays (about 16 bytes per record a token occurs in, plus 4 per extra
+occurrence) rather than per-record objects. Records are added as they are
+stored, and the whole index is rebuilt from the store at startup.
+
+A session saved as deltas is indexed as its rebuilt document, under the id
+of its latest delta record, so phrases that span saves match and replaced
+text does not. Each new version tombstones the one before (and the session's
+other delta records); tombstoned entries are skipped, and dropped from the
+postings once there are more of them than live ones.
+
+Query syntax: words are ANDed; "quoted words" must appear next to each other
+in that order; a word ending in * matches every token starting with it, also
+inside a phrase. A page of matches is found by walking the postings of the
+rarest word from the cursor on and checking each candidate against the rest,
+so the cost depends on how far the walk goes, not on how many records match
+in total. With a session filter, the session's own records are walked
+instead when there are fewer of them.
+"""
+
+import array
+import bisect
+import heapq
+import re
+import sys
+import threading
+
+# Tombstoned postings entries tolerated before a compaction, whatever the index size
+COMPACT_MIN_GARBAGE = 10000
+
+TOKEN_PATTERN = re.compile(r"\w+(?:'\w+)*")
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def tokenize(text):
+    """Lowercased word tokens of a text, in order"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def parse_query(query):
+    """
+    Split a query into phrases, each a list of (token, is_prefix)
+
+    Raises ValueError if there is nothing to search for.
+    """
+    phrases = []
+    for quoted, word in QUERY_PATTERN.findall(query or ''):
+        phrase = []
+        for piece in (quoted or word).split():
+            tokens = tokenize(piece)
+            phrase.extend((token, False) for token in tokens)
+            if tokens and piece.endswith('*'):
+                phrase[-1] = (phrase[-1][0], True)
+        if phrase:
+            phrases.append(phrase)
+    if not phrases:
+        raise ValueError('q must contain at least one word')
+    return phrases
+
+
+class Postings:
+    """Record ids (ascending) and word positions of one token"""
+
+    __slots__ = ('ids', 'starts', 'positions', 'ordered')
+
+    def __init__(self):
+        self.ids = array.array('Q')
+        self.starts = array.array('I')  # where each record's positions begin
+        self.positions = array.array('I')
+        self.ordered = True
+
+    def add(self, record_id, positions):
+        if self.ids and record_id < self.ids[-1]:
+            # Ids are reserved before records are written, so one can arrive late
+            self.ordered = False
+        self.ids.append(record_id)
+        self.starts.append(len(self.positions))
+        self.positions.extend(positions)
+
+    def _rebuild(self, entries):
+        self.__init__()
+        for record_id, positions in entries:
+            self.add(record_id, positions)
+
+    def sort(self):
+        if self.ordered:
+            return
+        self._rebuild(sorted((self.ids[index], self.positions_at(index)) for index in range(len(self.ids))))
+
+    def keep(self, live):
+        """Drop the entries of records live(record_id) rejects"""
+        self._rebuild([(self.ids[index], self.positions_at(index))
+                       for index in range(len(self.ids)) if live(self.ids[index])])
+
+    def positions_at(self, index):
+        end = self.starts[index + 1] if index + 1 < len(self.starts) else len(self.positions)
+        return self.positions[self.starts[index]:end]
+
+    def find(self, record_id):
+        """Index of record_id in ids, or -1"""
+        index = bisect.bisect_left(self.ids, record_id)
+        return index if index < len(self.ids) and self.ids[index] == record_id else -1
+
+
+class SearchIndex:
+    """Inverted index over record text with session and service filters"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.postings = {}  # token -> Postings
+            self.vocabulary = []  # sorted tokens, for prefix queries
+            self.documents = {}  # record id -> (session_id, service), or None once tombstoned
+            self.sessions = {}  # session_id -> ids of its records
+            self.session_documents = {}  # session_id -> (id, postings entries) of its indexed document
+            self.entries = 0  # postings entries, including tombstoned ones
+            self.garbage = 0  # tombstoned postings entries
+            self.max_id = 0
+
+    def add_many(self, records):
+        """Index records (dicts with id, transcription, session_id, service); already indexed ids are skipped"""
+        with self.lock:
+            for record in records:
+                record_id = record['id']
+                if record_id in self.documents:
+                    continue
+                self._add(record_id, record.get('session_id'), record.get('service'), record.get('transcription'))
+
+    def _add(self, record_id, session_id, service, text):
+        """Index one text; returns how many postings entries it took. Call with the lock held"""
+        self.documents[record_id] = (sys.intern(session_id) if session_id else None,
+                                     sys.intern(service) if service else None)
+        self.max_id = max(self.max_id, record_id)
+        if session_id:
+            self.sessions.setdefault(session_id, array.array('Q')).append(record_id)
+
+        token_positions = {}
+        for position, token in enumerate(tokenize(text or '')):
+            token_positions.setdefault(token, []).append(position)
+        for token, positions in token_positions.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = Postings()
+                bisect.insort(self.vocabulary, token)
+            postings.add(record_id, positions)
+        self.entries += len(token_positions)
+        return len(token_positions)
+
+    def set_document(self, session_id, record_id, text, service=None, superseded=()):
+        """
+        Index a session's rebuilt document under the id of its latest delta record
+
+        Replaces the document indexed for the session before. The superseded
+        ids (the session's other delta records) are tombstoned so they are
+        never indexed on their own. A document older than the indexed one is
+        ignored.
+        """
+        with self.lock:
+            for old_id in superseded:
+                if old_id != record_id and old_id not in self.documents:
+                    self.documents[old_id] = None
+            previous = self.session_documents.get(session_id)
+            if previous is not None:
+                if previous[0] >= record_id:
+                    return
+                self.documents[previous[0]] = None
+                self.garbage += previous[1]
+            self.session_documents[session_id] = (record_id, self._add(record_id, session_id, service, text))
+            if self.garbage > max(COMPACT_MIN_GARBAGE, self.entries - self.garbage):
+                self._compact()
+
+    def _compact(self):
+        """Drop tombstoned entries from the postings and session lists. Call with the lock held"""
+        def live(record_id):
+            return self.documents.get(record_id) is not None
+
+        for token in list(self.postings):
+            postings = self.postings[token]
+            postings.keep(live)
+            if not postings.ids:
+                del self.postings[token]
+        self.vocabulary = sorted(self.postings)
+        for session_id, ids in self.sessions.items():
+            self.sessions[session_id] = array.array('Q', filter(live, ids))
+        self.entries -= self.garbage
+        self.garbage = 0
+
+    def document_sessions(self, ids):
+        """{id: session_id} for those of ids that are indexed as a session's document"""
+        sessions = {}
+        with self.lock:
+            for record_id in ids:
+                document = self.documents.get(record_id)
+                if document is not None and self.session_documents.get(document[0], (None,))[0] == record_id:
+                    sessions[record_id] = document[0]
+        return sessions
+
+    def missing(self, ids):
+        """Those of ids that are not indexed"""
+        with self.lock:
+            return [record_id for record_id in ids if record_id not in self.documents]
+
+    def _expand(self, token, prefix):
+        """Postings of the token, or of every token it is a prefix of"""
+        if not prefix:
+            postings = self.postings.get(token)
+            matches = [postings] if postings else []
+        else:
+            matches = []
+            for index in range(bisect.bisect_left(self.vocabulary, token), len(self.vocabulary)):
+                if not self.vocabulary[index].startswith(token):
+                    break
+                matches.append(self.postings[self.vocabulary[index]])
+        for postings in matches:
+            postings.sort()
+        return matches
+
+    @staticmethod
+    def _positions(matcher, record_id):
+        """Positions of any of the matcher's tokens in a record"""
+        positions = set()
+        for postings in matcher:
+            index = postings.find(record_id)
+            if index >= 0:
+                positions.update(postings.positions_at(index))
+        return positions
+
+    def _matches(self, phrases, record_id):
+        for phrase in phrases:
+            if len(phrase) == 1:
+                if not any(postings.find(record_id) >= 0 for postings in phrase[0]):
+                    return False
+                continue
+            word_positions = [self._positions(matcher, record_id) for matcher in phrase]
+            if not any(all(start + offset in word_positions[offset] for offset in range(1, len(phrase)))
+                       for start in word_positions[0]):
+                return False
+        return True
+
+    def search(self, query, session_id=None, service=None, after=None, limit=20):
+        """
+        Ids of matching records above the `after` cursor, ascending
+
+        Returns (ids, more): at most limit ids, and whether there are more
+        matches after them. Raises ValueError for an empty query.
+        """
+        terms = parse_query(query)
+        with self.lock:
+            phrases = [[self._expand(token, prefix) for token, prefix in phrase] for phrase in terms]
+            matchers = [matcher for phrase in phrases for matcher in phrase]
+            if not all(matchers):
+                return [], False
+
+            start = after + 1 if after is not None else 0
+            rarest = min(matchers, key=lambda matcher: sum(len(postings.ids) for postings in matcher))
+            if session_id is not None and len(self.sessions.get(session_id, ())) < sum(len(p.ids) for p in rarest):
+                # A session is usually far smaller than any word's postings
+                candidates = sorted(record_id for record_id in self.sessions.get(session_id, ()) if record_id >= start)
+            else:
+                candidates = heapq.merge(*(postings.ids[bisect.bisect_left(postings.ids, start):]
+                                           for postings in rarest))
+            ids, previous = [], None
+            for record_id in candidates:
+                if record_id == previous:
+                    continue
+                previous = record_id
+                document = self.documents.get(record_id)
+                if document is None:
+                    continue
+                if session_id is not None and document[0] != session_id:
+                    continue
+                if service is not None and document[1] != service:
+                    continue
+                if self._matches(phrases, record_id):
+                    if len(ids) == limit:
+                        return ids, True
+                    ids.append(record_id)
+            return ids, False
+
+    def stats(self):
+        with self.lock:
+            postings = sum(len(entry.ids) for entry in self.postings.values())
+            positions = sum(len(entry.positions) for entry in self.postings.values())
+            return {
+                'records': sum(1 for document in self.documents.values() if document is not None),
+                'session_documents': len(self.session_documents),
+                'tokens': len(self.postings),
+                'postings': postings,
+                'index_bytes': postings * 12 + positions * 4,
+            }
@@ -0,0 +1,142 @@
+"""
+Compact in-memory view of recent sessions' transcriptions
+
+The browser client reads a session back (`/transcriptions/session/<id>`)
+while it is still recording, so those sessions are kept in memory in front
+of the SQLite store. Records are `__slots__` objects with the repeated
+strings (session id, service, format) interned, grouped per session. The
+view is bounded by the session settings in config.py: a session idle for
+SESSION_TIMEOUT is dropped, and a session with more than
+MAX_SESSION_TRANSCRIPTIONS records, or one longer than
+MAX_TRANSCRIPTION_LENGTH characters, is served from the store instead.
+
+Other worker processes write to the same store, so every read first checks
+the session's (count, last id) in the store's index and reloads on change.
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from transcription_store import RECORD_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Columns whose values repeat across records and are worth interning
+INTERNED_COLUMNS = ('session_id', 'service', 'audio_format')
+
+
+class TranscriptRecord:
+    """One stored transcription, without a per-record dict"""
+
+    __slots__ = RECORD_COLUMNS
+
+    def __init__(self, record):
+        for column in RECORD_COLUMNS:
+            value = record.get(column)
+            if column in INTERNED_COLUMNS and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, column, value)
+
+    def to_dict(self):
+        """The record as the store returns it (unset columns left out)"""
+        values = ((column, getattr(self, column)) for column in RECORD_COLUMNS)
+        return {column: value for column, value in values if value is not None}
+
+
+class CachedSession:
+    """A session's records plus the store version they were read at"""
+
+    __slots__ = ('records', 'version', 'last_access')
+
+    def __init__(self, records, version):
+        self.records = records
+        self.version = version
+        self.last_access = time.time()
+
+
+class SessionCache:
+    """Per-session transcript lists with idle expiry and size caps, read through to the store"""
+
+    def __init__(self, store, session_timeout, max_session_transcriptions, max_transcription_length, max_sessions):
+        self.store = store
+        self.session_timeout = session_timeout
+        self.max_session_transcriptions = max_session_transcriptions
+        self.max_transcription_length = max_transcription_length
+        self.max_sessions = max_sessions
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()  # session_id -> CachedSession, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def _cacheable(self, records):
+        return (len(records) <= self.max_session_transcriptions
+                and all(len(record.get('transcription') or '') <= self.max_transcription_length for record in records))
+
+    def _expire_idle(self):
+        """Drop sessions idle past the timeout (the LRU order puts them first); call with the lock held"""
+        cutoff = time.time() - self.session_timeout
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session.last_access >= cutoff:
+                break
+            del self.sessions[session_id]
+            self.expired += 1
+
+    def get(self, session_id):
+        """The session's records as dicts, oldest first"""
+        version = self.store.session_version(session_id)
+        with self.lock:
+            self._expire_idle()
+            session = self.sessions.get(session_id)
+            if session is not None and session.version == version:
+                session.last_access = time.time()
+                self.sessions.move_to_end(session_id)
+                self.hits += 1
+                return [record.to_dict() for record in session.records]
+            self.misses += 1
+
+        records = self.store.by_session(session_id)
+        version = (len(records), records[-1]['id'] if records else None)
+        with self.lock:
+            if records and self._cacheable(records):
+                self.sessions[session_id] = CachedSession([TranscriptRecord(record) for record in records], version)
+                self.sessions.move_to_end(session_id)
+                while len(self.sessions) > self.max_sessions:
+                    self.sessions.popitem(last=False)
+            else:
+                self.sessions.pop(session_id, None)
+        return records
+
+    def add(self, record):
+        """Append a just-stored record (with its id) to its session, if that session is cached"""
+        session_id = record.get('session_id')
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return
+            if not self._cacheable([record]) or len(session.records) >= self.max_session_transcriptions:
+                del self.sessions[session_id]
+                return
+            session.records.append(TranscriptRecord(record))
+            session.version = (session.version[0] + 1, record['id'])
+            session.last_access = time.time()
+            self.sessions.move_to_end(session_id)
+
+    def clear(self):
+        with self.lock:
+            self.sessions.clear()
+
+    def stats(self):
+        with self.lock:
+            self._expire_idle()
+            return {
+                'sessions': len(self.sessions),
+                'records': sum(len(session.records) for session in self.sessions.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+            }
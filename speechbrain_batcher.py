@@ -0,0 +1,169 @@
+"""
+Batched SpeechBrain inference
+
+`EncoderDecoderASR.transcribe_batch` decodes a padded batch of clips in one
+forward pass, which is far cheaper per clip than one call each. This module
+pads canonical 16 kHz clips into a batch, and provides a micro-batcher that
+gathers concurrent single-clip requests for up to `max_wait` seconds (or
+until `max_batch_size` clips are waiting) and runs them together.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def transcribe_batch_samples(model, clips):
+    """
+    Transcribe a list of float32 mono arrays in one padded forward pass
+
+    Returns the transcriptions in the same order as `clips`.
+    """
+    if not TORCH_AVAILABLE:
+        raise Exception("PyTorch not available")
+    if not clips:
+        return []
+
+    max_length = max(len(clip) for clip in clips)
+    if max_length == 0:
+        raise Exception("Decoded audio is empty")
+
+    padded = np.zeros((len(clips), max_length), dtype=np.float32)
+    for row, clip in enumerate(clips):
+        padded[row, :len(clip)] = clip
+
+    wavs = torch.from_numpy(padded)
+    wav_lens = torch.tensor([len(clip) / max_length for clip in clips], dtype=torch.float32)
+    predicted_words, _ = model.transcribe_batch(wavs, wav_lens)
+    return list(predicted_words)
+
+
+def length_sorted_batches(clips, max_batch_size):
+    """
+    Split clip indexes into batches of up to max_batch_size
+
+    Clips are grouped by length so short ones aren't padded out to the
+    longest clip in the request.
+    """
+    order = sorted(range(len(clips)), key=lambda index: len(clips[index]))
+    return [order[start:start + max_batch_size] for start in range(0, len(order), max_batch_size)]
+
+
+def transcribe_in_batches(model, clips, max_batch_size):
+    """Transcribe any number of clips, max_batch_size per forward pass, in input order"""
+    results = [None] * len(clips)
+    for indexes in length_sorted_batches(clips, max_batch_size):
+        batch_results = transcribe_batch_samples(model, [clips[index] for index in indexes])
+        for index, text in zip(indexes, batch_results):
+            results[index] = text
+    return results
+
+
+class MicroBatcher:
+    """
+    Groups concurrent single-clip SpeechBrain requests into shared batches
+
+    `run_batch(clips)` performs one forward pass and returns the texts.
+    `runners` batches can be in flight at once (one per inference process).
+    """
+
+    def __init__(self, run_batch, max_batch_size, max_wait, runners=1):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.runners = runners
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.threads = []
+        self.batches = 0
+        self.clips = 0
+        self.largest_batch = 0
+
+    def _ensure_threads(self):
+        with self.lock:
+            if self.threads:
+                return
+            for index in range(self.runners):
+                thread = threading.Thread(target=self._run, name=f'speechbrain-batcher-{index}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def submit(self, samples):
+        """Queue one clip; returns a Future for its transcription"""
+        self._ensure_threads()
+        future = Future()
+        self.queue.put((samples, future))
+        return future
+
+    def transcribe(self, samples, timeout=None):
+        """Transcribe one clip, sharing a forward pass with concurrent callers"""
+        future = self.submit(samples)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()  # dropped if its batch hasn't started
+            raise
+
+    def _collect_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Skip clips whose caller stopped waiting before their batch started
+            batch = [(samples, future) for samples, future in self._collect_batch()
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            clips = [samples for samples, _ in batch]
+            futures = [future for _, future in batch]
+
+            try:
+                start = time.time()
+                results = self.run_batch(clips)
+                logger.debug("🧠 Micro-batch of %d clips decoded in %.2fs", len(batch), time.time() - start)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            with self.lock:
+                self.batches += 1
+                self.clips += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+            for future, text in zip(futures, results):
+                future.set_result(text)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait': self.max_wait,
+                'runners': self.runners,
+                'batches': self.batches,
+                'clips': self.clips,
+                'average_batch_size': round(self.clips / self.batches, 2) if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'waiting': self.queue.qsize(),
+            }
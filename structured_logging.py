@@ -0,0 +1,166 @@
+"""
+Logging profiles for the server
+
+The server used to log through `logging.basicConfig`, so every record was
+formatted and written to stderr on the request thread, and each request
+logged its full transcript and several lines of detail at INFO. Two
+profiles are now available (LOG_PROFILE in config.py):
+
+- "production": request threads only put records on an in-memory queue
+  (QueueHandler); a QueueListener thread formats them as one JSON object
+  per line and writes them out. Records at LOG_LEVEL and above are always
+  kept. Debug-level detail from the app's own loggers is sampled:
+  LOG_DEBUG_SAMPLE_RATE of it is kept, and the rest is dropped before it
+  is queued or formatted. Other libraries stay at LOG_LEVEL, so their
+  debug calls never build a record. Records that carry transcript text
+  (logged with `extra=TRANSCRIPT`) are never emitted.
+- "debug": the old verbose behaviour. Plain text written synchronously,
+  with every debug-level detail, transcripts included.
+
+Fields passed with `extra=` appear as keys of the JSON object. A worker
+forked from a process that configured "production" inherits the listener
+without its thread, so the queue handler gives each child a new queue and
+listener thread (fork_hooks.py).
+"""
+
+import copy
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+from fork_hooks import after_fork_in_child
+
+LOG_PROFILES = ('production', 'debug')
+
+DEBUG_FORMAT = '%(levelname)s:%(name)s:%(message)s'
+
+# Pass as `extra=` on records whose message includes transcript text; only the debug profile emits them
+TRANSCRIPT = {'transcript': True}
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, thread, message, extras and exception"""
+
+    def format(self, record):
+        entry = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """
+    Keep records at `level` and above, and `rate` of the debug records
+
+    Sampling is deterministic (every round(1 / rate)-th debug record), so
+    the kept share is exact and the filter takes no lock.
+    """
+
+    def __init__(self, level, rate):
+        super().__init__()
+        self.level = level
+        self.period = max(1, round(1 / rate))
+        self.counter = itertools.count(1)
+
+    def filter(self, record):
+        if record.levelno >= self.level:
+            return True
+        if record.levelno > logging.DEBUG:
+            return False
+        return next(self.counter) % self.period == 0
+
+
+class TranscriptFilter(logging.Filter):
+    """Drop records logged with `extra=TRANSCRIPT`"""
+
+    def filter(self, record):
+        return not getattr(record, 'transcript', False)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the traceback separate from the message, for JSON output"""
+
+    def __init__(self, listener):
+        super().__init__(listener.queue)
+        self.listener = listener
+        after_fork_in_child(self._after_fork)
+
+    def _after_fork(self):
+        # Records the parent had queued are the parent's to write
+        self.queue = self.listener.queue = queue.SimpleQueue()
+        if self.listener._thread is not None:
+            self.listener._thread = None
+            self.listener.start()
+
+    def prepare(self, record):
+        # Resolve %-arguments and the traceback now: both can change once the caller moves on
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def configure_logging(profile, level='INFO', debug_sample_rate=0.0, stream=None, debug_loggers=()):
+    """
+    Install a logging profile on the root logger
+
+    `debug_loggers` names the loggers whose debug detail "production"
+    samples; every other logger logs at `level`.
+
+    Returns the started QueueListener for "production" (stop it at exit to
+    flush queued records), or None for "debug". Raises ValueError for an
+    unknown profile or a sample rate outside [0, 1].
+    """
+    if profile not in LOG_PROFILES:
+        raise ValueError(f"LOG_PROFILE must be one of {', '.join(LOG_PROFILES)}, not {profile!r}")
+    if not 0 <= debug_sample_rate <= 1:
+        raise ValueError('LOG_DEBUG_SAMPLE_RATE must be between 0 and 1')
+    level = logging.getLevelName(level) if isinstance(level, str) else level
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for name in debug_loggers:
+        logging.getLogger(name).setLevel(logging.NOTSET)
+
+    if profile == 'debug':
+        output.setFormatter(logging.Formatter(DEBUG_FORMAT))
+        root.addHandler(output)
+        root.setLevel(logging.DEBUG)
+        return None
+
+    output.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(queue.SimpleQueue(), output, respect_handler_level=True)
+    handler = StructuredQueueHandler(listener)
+    handler.addFilter(TranscriptFilter())
+    # Debug calls on other loggers (and on all of them without sampling) stop at the level check
+    root.setLevel(level)
+    if debug_sample_rate > 0:
+        handler.addFilter(DebugSampler(level, debug_sample_rate))
+        for name in debug_loggers:
+            logging.getLogger(name).setLevel(min(level, logging.DEBUG))
+    root.addHandler(handler)
+    listener.start()
+    return listener
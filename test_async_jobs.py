@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for async transcription jobs (/transcribe-audio?async=1 and /jobs/<id>)
+"""
+
+import time
+import requests
+
+from test_upload_modes import create_test_wav_bytes
+
+SERVER_URL = 'http://localhost:5000'
+
+
+def test_async_job():
+    """Submit a clip asynchronously and poll the job until it finishes"""
+    print("🧪 Testing async transcription jobs...")
+
+    try:
+        response = requests.post(
+            f'{SERVER_URL}/transcribe-audio?async=1&audio_format=wav&service=speechbrain',
+            data=create_test_wav_bytes(),
+            headers={'Content-Type': 'application/octet-stream'},
+            timeout=10
+        )
+        if response.status_code != 202:
+            print(f"❌ Expected 202, got {response.status_code}: {response.text}")
+            return False
+
+        job_id = response.json()['job_id']
+        print(f"✅ Job queued: {job_id}")
+
+        for _ in range(120):
+            job = requests.get(f'{SERVER_URL}/jobs/{job_id}', timeout=10).json()['job']
+            if job['state'] in ('succeeded', 'failed'):
+                print(f"✅ Job {job['state']} (waited {job['wait_time']}s, ran {job['service_time']}s)")
+                print(f"   - Result: {job['result'].get('transcription') or job['result'].get('message')}")
+                return True
+            time.sleep(1)
+
+        print("❌ Job did not finish within 2 minutes")
+        return False
+
+    except requests.exceptions.ConnectionError:
+        print("❌ Could not connect to server. Is it running?")
+        return False
+    except Exception as e:
+        print(f"❌ Async job test failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    test_async_job()
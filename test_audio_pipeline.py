@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the shared audio preparation (offline)
+"""
+
+import io
+
+import numpy as np
+
+from audio_pipeline import CANONICAL_SAMPLE_RATE, PreparedAudio, encode_wav
+
+
+def make_prepared_audio(seconds=1.0):
+    samples = (0.1 * np.sin(np.linspace(0, 440 * 2 * np.pi * seconds, int(CANONICAL_SAMPLE_RATE * seconds))))
+    wav = encode_wav(samples.astype(np.float32))
+    return PreparedAudio(io.BytesIO(wav), 'wav', [])
+
+
+def test_reuse_counts_engines_only():
+    """Hashing, length lookups and repeated reads are not counted as saved conversions"""
+    print("🧪 Testing conversion reuse accounting...")
+    prepared = make_prepared_audio()
+    prepared.samples()
+    prepared.content_hash()
+    prepared.wav_file()
+    prepared.wav_file()
+    prepared.engine_started('openai_whisper')
+    first = prepared.metadata()
+    if (first['conversions'], first['conversions_reused'], first['conversion_time_saved']) != (1, 0, 0.0):
+        print(f"❌ One engine reported a reuse: {first}")
+        return False
+
+    prepared.engine_started('google_fallback')
+    second = prepared.metadata()
+    if second['conversions_reused'] != 1 or second['conversion_time_saved'] != round(prepared.conversion_time, 3):
+        print(f"❌ Fallback engine not counted once: {second}")
+        return False
+    print(f"✅ {second['conversions_reused']} reuse after the fallback, {second['conversion_time_saved']}s saved")
+    return True
+
+
+if __name__ == "__main__":
+    test_reuse_counts_engines_only()
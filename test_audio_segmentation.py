@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for voice activity detection and silence trimming (offline)
+"""
+
+import tracemalloc
+
+import numpy as np
+
+from audio_segmentation import compress_silence, frame_energies, map_to_original
+
+SAMPLE_RATE = 16000
+
+
+def speech_like(seconds, level_db, seed=1):
+    """Noise with a syllable-rate envelope, scaled to an RMS level in dBFS"""
+    count = int(SAMPLE_RATE * seconds)
+    envelope = 0.5 + 0.5 * np.abs(np.sin(np.linspace(0, seconds * 4 * np.pi, count)))
+    samples = np.random.RandomState(seed).randn(count) * envelope
+    return (samples * 10 ** (level_db / 20) / np.sqrt(np.mean(samples ** 2))).astype(np.float32)
+
+
+def test_frame_energies():
+    """Frame energies match a float64 reference without full-length temporaries"""
+    print("🧪 Testing frame energies...")
+    samples = (np.random.RandomState(0).randn(SAMPLE_RATE * 600) * 0.1).astype(np.float32)
+    tracemalloc.start()
+    energies = frame_energies(samples, 480)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    frames = samples[:len(energies) * 480].reshape(-1, 480).astype(np.float64)
+    reference = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    if np.abs(reference - energies).max() > 1e-3:
+        print(f"❌ Energies differ from the reference by {np.abs(reference - energies).max():.4f} dB")
+        return False
+    if peak > samples.nbytes // 10:
+        print(f"❌ Peak memory {peak} bytes for {samples.nbytes} bytes of audio")
+        return False
+    print(f"✅ 10 minutes of audio: {len(energies)} frames, peak {peak / 1e6:.1f} MB")
+    return True
+
+
+def test_compress_silence():
+    """Silence is trimmed and long pauses shortened, but quiet speech is kept"""
+    print("🧪 Testing silence trimming...")
+    # Loud speech that drops 26 dB to about -30 dBFS, between stretches of near-silence
+    samples = np.concatenate([
+        speech_like(1, -75), speech_like(4, -4, 2), speech_like(4, -30, 3),
+        speech_like(2, -75, 4), speech_like(1, -10, 5), speech_like(1, -75, 6),
+    ])
+    compressed, time_map = compress_silence(samples, SAMPLE_RATE, gap_ms=300)
+    kept = [length / SAMPLE_RATE for _, _, length in time_map]
+    if len(time_map) != 2 or not 8.0 <= kept[0] <= 8.5 or not 1.0 <= kept[1] <= 1.5:
+        print(f"❌ Wrong regions kept: {time_map}")
+        return False
+    if len(compressed) != sum(int(SAMPLE_RATE * seconds) for seconds in kept) + int(SAMPLE_RATE * 0.3):
+        print(f"❌ Compressed length {len(compressed)} does not match the time map")
+        return False
+
+    silent = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    unchanged, silent_map = compress_silence(silent, SAMPLE_RATE)
+    if len(unchanged) != len(silent) or silent_map != [(0, 0, len(silent))]:
+        print(f"❌ Silent clip was changed: {silent_map}")
+        return False
+    print(f"✅ Kept {kept[0]:.2f}s and {kept[1]:.2f}s of {len(samples) / SAMPLE_RATE:.0f}s")
+    return True
+
+
+def test_map_to_original():
+    """Times in trimmed audio map back to the original timeline"""
+    print("🧪 Testing time mapping...")
+    # 2s kept from 1s, a 0.5s gap, then 1s kept from 6s
+    time_map = [(0, SAMPLE_RATE, 2 * SAMPLE_RATE), (int(2.5 * SAMPLE_RATE), 6 * SAMPLE_RATE, SAMPLE_RATE)]
+    cases = [(0.0, 1.0), (1.5, 2.5), (2.2, 3.0), (2.5, 6.0), (3.25, 6.75), (9.0, 7.0)]
+    for compressed, expected in cases:
+        mapped = map_to_original(compressed, time_map, SAMPLE_RATE)
+        if mapped != expected:
+            print(f"❌ {compressed}s mapped to {mapped}s, expected {expected}s")
+            return False
+    if map_to_original(1.0, [], SAMPLE_RATE) != 1.0:
+        print("❌ Empty time map changed the time")
+        return False
+    print(f"✅ {len(cases)} times mapped")
+    return True
+
+
+if __name__ == "__main__":
+    test_frame_energies()
+    test_compress_silence()
+    test_map_to_original()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the batch transcription endpoint (/transcribe-batch)
+"""
+
+import base64
+
+import requests
+
+from test_upload_modes import create_test_wav_bytes
+
+SERVER_URL = 'http://localhost:5000'
+CLIP_COUNT = 4
+
+
+def test_batch_multipart():
+    """Send several clips as repeated 'audio' file fields"""
+    print("🧪 Testing /transcribe-batch (multipart)...")
+
+    audio_bytes = create_test_wav_bytes()
+    files = [('audio', (f'clip{index}.wav', audio_bytes, 'audio/wav')) for index in range(CLIP_COUNT)]
+
+    try:
+        response = requests.post(f'{SERVER_URL}/transcribe-batch', files=files, timeout=120)
+        data = response.json()
+        print(f"📊 Status: {response.status_code} ({data.get('status')})")
+
+        if response.status_code == 503:
+            print("⚠️ SpeechBrain model not loaded on the server, skipping")
+            return True
+        if len(data.get('results', [])) != CLIP_COUNT:
+            print(f"❌ Expected {CLIP_COUNT} results, got {data}")
+            return False
+
+        for result in data['results']:
+            print(f"   clip {result['index']}: {result['status']} {result.get('transcription', result.get('message'))}")
+        print(f"✅ {data['succeeded']}/{data['count']} clips in {data['processing_time']}s")
+        return True
+
+    except requests.exceptions.ConnectionError:
+        print("❌ Could not connect to server. Is it running?")
+        return False
+    except Exception as e:
+        print(f"❌ Batch test failed: {e}")
+        return False
+
+
+def test_batch_json_bad_clip():
+    """A clip that can't be decoded is reported without failing the others"""
+    print("🧪 Testing /transcribe-batch (JSON, one bad clip)...")
+
+    audio_base64 = base64.b64encode(create_test_wav_bytes()).decode('utf-8')
+    clips = [
+        {'audio_data': audio_base64, 'audio_format': 'wav'},
+        {'audio_data': base64.b64encode(b'not audio').decode('utf-8'), 'audio_format': 'wav'},
+    ]
+
+    try:
+        response = requests.post(f'{SERVER_URL}/transcribe-batch', json={'clips': clips}, timeout=120)
+        if response.status_code == 503:
+            print("⚠️ SpeechBrain model not loaded on the server, skipping")
+            return True
+
+        results = response.json()['results']
+        if results[1]['status'] != 'error':
+            print(f"❌ Bad clip was not reported as an error: {results[1]}")
+            return False
+        print(f"✅ Bad clip reported: {results[1]['message']}")
+        return True
+
+    except requests.exceptions.ConnectionError:
+        print("❌ Could not connect to server. Is it running?")
+        return False
+    except Exception as e:
+        print(f"❌ Batch test failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    test_batch_multipart()
+    test_batch_json_bad_clip()
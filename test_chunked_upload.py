@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the resumable chunked upload API (/uploads)
+"""
+
+import requests
+
+from test_upload_modes import create_test_wav_bytes
+
+SERVER_URL = 'http://localhost:5000'
+CHUNK_SIZE = 16 * 1024
+
+
+def test_chunked_upload():
+    """Upload a clip in chunks, retry one chunk, then finalize"""
+    print("🧪 Testing chunked upload sessions...")
+
+    audio_bytes = create_test_wav_bytes()
+    chunks = [audio_bytes[i:i + CHUNK_SIZE] for i in range(0, len(audio_bytes), CHUNK_SIZE)]
+
+    try:
+        response = requests.post(f'{SERVER_URL}/uploads', json={
+            'audio_format': 'wav',
+            'service': 'speechbrain'
+        }, timeout=10)
+        if response.status_code != 201:
+            print(f"❌ Could not create upload session: {response.status_code}")
+            return False
+
+        upload_id = response.json()['upload_id']
+        print(f"✅ Upload session created: {upload_id}")
+
+        for index, chunk in enumerate(chunks):
+            response = requests.put(f'{SERVER_URL}/uploads/{upload_id}/chunks/{index}', data=chunk, timeout=10)
+            if response.status_code != 200:
+                print(f"❌ Chunk {index} failed: {response.text}")
+                return False
+
+        # Re-sending a stored chunk must be acknowledged, not appended again
+        response = requests.put(f'{SERVER_URL}/uploads/{upload_id}/chunks/0', data=chunks[0], timeout=10)
+        if not response.json().get('duplicate'):
+            print("❌ Retried chunk was not recognised as a duplicate")
+            return False
+        print("✅ Retried chunk acknowledged as duplicate")
+
+        status = requests.get(f'{SERVER_URL}/uploads/{upload_id}', timeout=10).json()
+        if status['received_bytes'] != len(audio_bytes) or status['next_chunk'] != len(chunks):
+            print(f"❌ Unexpected upload status: {status}")
+            return False
+        print(f"✅ Server received {status['received_bytes']} bytes in {status['next_chunk']} chunks")
+
+        response = requests.post(f'{SERVER_URL}/uploads/{upload_id}/finalize', timeout=120)
+        data = response.json()
+        print(f"📊 Finalize status: {response.status_code} ({data.get('status')})")
+        if data.get('status') == 'success' and data.get('audio_size') != len(audio_bytes):
+            print(f"❌ audio_size {data.get('audio_size')} != {len(audio_bytes)}")
+            return False
+
+        return response.status_code not in (400, 404, 409, 413)
+
+    except requests.exceptions.ConnectionError:
+        print("❌ Could not connect to server. Is it running?")
+        return False
+    except Exception as e:
+        print(f"❌ Chunked upload test failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    test_chunked_upload()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for latency-aware engine routing and circuit breakers (offline)
+"""
+
+import sys
+import threading
+import time
+
+from engine_router import CircuitBreaker, EngineRouter
+
+
+def make_router(cooldown=30):
+    return EngineRouter(window=50, min_samples=3, failure_threshold=3, error_rate_threshold=0.5, cooldown=cooldown)
+
+
+def test_latency_fit_and_order():
+    """Latency is fitted against clip length; measured engines are ordered fastest-first"""
+    print("🧪 Testing routing order...")
+    router = make_router()
+    for seconds in (5, 10, 20, 40):
+        router.record('openai_whisper', seconds, 2.0 + 0.1 * seconds, True)  # remote: overhead, then fast
+        router.record('speechbrain', seconds, 0.5 * seconds, True)  # local: slow per audio second
+
+    expected = router.expected_latency('speechbrain', 10)
+    if abs(expected - 5.0) > 1e-6 or abs(router.expected_latency('openai_whisper', 10) - 3.0) > 1e-6:
+        print(f"❌ Wrong latency fit: {expected}")
+        return False
+
+    short = router.order(['openai_whisper', 'speechbrain', 'google_fallback'], 2)
+    long = router.order(['openai_whisper', 'speechbrain', 'google_fallback'], 60)
+    if short != ['speechbrain', 'openai_whisper', 'google_fallback'] or long[0] != 'openai_whisper':
+        print(f"❌ Wrong order: short clip {short}, long clip {long}")
+        return False
+    # An explicitly requested engine keeps first place however slow it looks; its fallbacks are reordered
+    preferred = router.order(['speechbrain', 'openai_whisper', 'google_fallback'], 60, preferred='speechbrain')
+    if preferred != ['speechbrain', 'openai_whisper', 'google_fallback']:
+        print(f"❌ Requested engine moved: {preferred}")
+        return False
+    for _ in range(3):
+        router.record('speechbrain', 10, 1.0, False)
+    if router.order(['speechbrain', 'google_fallback'], 60, preferred='speechbrain') != ['google_fallback']:
+        print("❌ Requested engine with an open breaker kept first")
+        return False
+    print(f"✅ 2s clip → {short[0]}, 60s clip → {long[0]}")
+    return True
+
+
+def test_breaker_trips_and_recovers():
+    """Repeated failures take an engine out of rotation until the cooldown ends"""
+    print("🧪 Testing circuit breaker...")
+    router = make_router(cooldown=0.2)
+    for _ in range(3):
+        router.record('openai_whisper', 10, 1.0, False)
+    if router.order(['openai_whisper', 'speechbrain'], 10) != ['speechbrain']:
+        print(f"❌ Open breaker not skipped: {router.snapshot()['engines']}")
+        return False
+    if router.order(['openai_whisper'], 10) != ['openai_whisper']:
+        print("❌ Engine dropped although every engine is open")
+        return False
+
+    time.sleep(0.25)
+    if router.order(['openai_whisper', 'speechbrain'], 10)[0] != 'openai_whisper':
+        print("❌ No trial after the cooldown")
+        return False
+    router.record('openai_whisper', 10, 1.0, True)
+    state = router.snapshot()['engines']['openai_whisper']
+    if (state['breaker'], state['breaker_trips']) != ('closed', 1):
+        print(f"❌ Breaker did not close after a good trial: {state}")
+        return False
+    print("✅ Tripped after 3 failures, closed after one good trial")
+    return True
+
+
+def test_half_open_single_trial():
+    """Only one request gets through a half-open breaker"""
+    print("🧪 Testing half-open trial...")
+    breaker = CircuitBreaker(failure_threshold=1, error_rate_threshold=1.0, cooldown=0.1)
+    breaker.record(False, 1.0, 1, 5)
+    time.sleep(0.15)
+    if not breaker.available(take_trial=False) or breaker.trial_started is not None:
+        print("❌ Checking the breaker claimed the trial")
+        return False
+    allowed = [breaker.available() for _ in range(5)]
+    if allowed != [True, False, False, False, False]:
+        print(f"❌ Half-open breaker let through {allowed}")
+        return False
+    breaker.record(False, 1.0, 1, 5)
+    if breaker.state != 'open' or breaker.trips != 2:
+        print(f"❌ Failed trial did not reopen the breaker: {breaker.state}")
+        return False
+    print("✅ One trial request, reopened when it failed")
+    return True
+
+
+def test_concurrent_record_and_lookup():
+    """Latency lookups while other requests record outcomes never see a half-updated window"""
+    print("🧪 Testing concurrent router use...")
+    router = make_router()
+    for seconds in range(1, 11):
+        router.record('speechbrain', seconds, 0.5 * seconds, True)
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        seconds = 0
+        while not stop.is_set():
+            seconds = seconds % 60 + 1
+            router.record('speechbrain', seconds, 0.5 * seconds, seconds % 7 != 0)
+
+    def reader():
+        try:
+            for _ in range(2000):
+                router.expected_latency('speechbrain', 10)
+                router.latency_percentile('speechbrain', 0.9)
+                router.order(['speechbrain', 'google_fallback'], 10)
+        except Exception as e:
+            errors.append(repr(e))
+
+    # Switch threads as often as possible so an unlocked walk of the window gets interrupted
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    threads = [threading.Thread(target=writer) for _ in range(2)]
+    try:
+        for thread in threads:
+            thread.start()
+        reader()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        sys.setswitchinterval(switch_interval)
+    if errors:
+        print(f"❌ {errors[0]}")
+        return False
+    print("✅ 2000 lookups alongside two recording threads")
+    return True
+
+
+if __name__ == "__main__":
+    test_latency_fit_and_order()
+    test_breaker_trips_and_recovers()
+    test_half_open_single_trial()
+    test_concurrent_record_and_lookup()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for hedged engine requests (offline)
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from hedging import HedgeStats, run_hedged
+
+
+def fake_engines(behaviour):
+    """
+    attempt(engine, cancel_event) driven by behaviour[engine] = (seconds, error or result)
+
+    Records which engines started and which were told to cancel.
+    """
+    started, cancelled = [], []
+
+    def attempt(engine, cancel_event):
+        started.append(engine)
+        seconds, outcome = behaviour[engine]
+        if cancel_event.wait(seconds):
+            cancelled.append(engine)
+            raise RuntimeError(f'{engine} cancelled')
+        if isinstance(outcome, Exception):
+            raise outcome
+        return {'transcription': outcome}
+
+    return attempt, started, cancelled
+
+
+def test_hedge_wins_and_cancels_loser():
+    """A slow primary is hedged; the faster secondary wins and the primary is cancelled"""
+    print("🧪 Testing hedged race...")
+    attempt, started, cancelled = fake_engines({'whisper': (2.0, 'slow'), 'speechbrain': (0.05, 'fast')})
+    stats = HedgeStats()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        begin = time.monotonic()
+        winner, result = run_hedged(executor, attempt, 'whisper', 'speechbrain', 0.1, stats)
+        elapsed = time.monotonic() - begin
+        time.sleep(0.05)  # let the loser see its cancel event
+    snapshot = stats.snapshot(lambda engine, fraction: 2.0)
+    if (winner, result['transcription']) != ('speechbrain', 'fast') or elapsed > 0.5:
+        print(f"❌ Wrong winner {winner} after {elapsed:.2f}s")
+        return False
+    if started != ['whisper', 'speechbrain'] or cancelled != ['whisper']:
+        print(f"❌ Started {started}, cancelled {cancelled}")
+        return False
+    if (snapshot['fired'], snapshot['hedge_wins']) != (1, 1):
+        print(f"❌ Hedge not recorded: {snapshot}")
+        return False
+    print(f"✅ speechbrain won in {elapsed:.2f}s, whisper cancelled")
+    return True
+
+
+def test_fast_primary_is_not_hedged():
+    """A primary that answers within the delay never starts the secondary"""
+    print("🧪 Testing fast primary...")
+    attempt, started, _ = fake_engines({'whisper': (0.01, 'quick'), 'speechbrain': (0.01, 'unused')})
+    stats = HedgeStats()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        winner, _ = run_hedged(executor, attempt, 'whisper', 'speechbrain', 0.5, stats)
+    if winner != 'whisper' or started != ['whisper'] or stats.fired != 0:
+        print(f"❌ Winner {winner}, started {started}, fired {stats.fired}")
+        return False
+    print("✅ No hedge for a fast primary")
+    return True
+
+
+def test_fallbacks_and_failures():
+    """A primary that fails fast falls back without a race; both failing raises the last error"""
+    print("🧪 Testing hedge fallbacks...")
+    attempt, started, _ = fake_engines({'whisper': (0.0, ValueError('down')), 'speechbrain': (0.05, 'fallback')})
+    stats = HedgeStats()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        winner, result = run_hedged(executor, attempt, 'whisper', 'speechbrain', 1.0, stats)
+        if (winner, result['transcription'], stats.fired) != ('speechbrain', 'fallback', 0):
+            print(f"❌ Fast failure not followed by the secondary: {winner}, {stats.fired}")
+            return False
+
+        attempt, started, _ = fake_engines({'whisper': (0.2, ValueError('whisper failed')),
+                                            'speechbrain': (0.1, ValueError('speechbrain failed'))})
+        try:
+            run_hedged(executor, attempt, 'whisper', 'speechbrain', 0.05, stats)
+            print("❌ Both engines failed but a result was returned")
+            return False
+        except ValueError as e:
+            error = str(e)
+    if error != 'whisper failed' or sorted(started) != ['speechbrain', 'whisper'] or stats.requests != 2:
+        print(f"❌ Raised {error!r}, started {started}, {stats.requests} requests recorded")
+        return False
+    print(f"✅ Fell back to speechbrain; both failing raised {error!r}")
+    return True
+
+
+if __name__ == "__main__":
+    test_hedge_wins_and_cancels_loser()
+    test_fast_primary_is_not_hedged()
+    test_fallbacks_and_failures()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the background transcription writer (offline)
+"""
+
+import threading
+import time
+
+import persistence_writer
+from job_queue import QueueFullError
+from persistence_writer import PersistenceWriter
+
+
+def submit_in_background(writer, records):
+    """submit() each record from its own thread; returns the threads and the errors they raised"""
+    errors = []
+
+    def submit(record):
+        try:
+            writer.submit(record)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=submit, args=(record,)) for record in records]
+    for thread in threads:
+        thread.start()
+    return threads, errors
+
+
+def test_batches_and_barrier():
+    """Records queued during a slow write go out together; barrier() waits for them to be applied"""
+    print("🧪 Testing batched writes...")
+    appended, written, batches = [], [], []
+    release = threading.Event()
+
+    def append_batch(records):
+        batches.append(len(records))
+        appended.extend(record['id'] for record in records)
+
+    def apply_batch(records):
+        release.wait()
+        written.extend(record['id'] for record in records)
+
+    writer = PersistenceWriter(append_batch, apply_batch, max_queued=100, max_batch=50, enqueue_timeout=1)
+    writer.submit({'id': 0})  # acknowledged once appended, while its apply is still blocked
+    threads, _ = submit_in_background(writer, [{'id': index} for index in range(1, 30)])
+    if appended != [0] or writer.barrier(timeout=0.1):
+        print(f"❌ Acknowledged before the append, or barrier() returned before the records were applied: {appended}")
+        return False
+    release.set()
+    for thread in threads:
+        thread.join()
+    if not writer.barrier(timeout=5) or sorted(written) != list(range(30)):
+        print(f"❌ Records missing: {written}")
+        return False
+    if len(batches) > 3:
+        print(f"❌ Records not batched: {batches}")
+        return False
+    print(f"✅ 30 records in batches of {batches}: {writer.stats()}")
+    return True
+
+
+def test_submit_many():
+    """Records submitted together go out in one append, and are refused together when there is no room"""
+    print("🧪 Testing submit_many...")
+    batches = []
+    writer = PersistenceWriter(lambda records: batches.append(len(records)), lambda records: None,
+                               max_queued=10, max_batch=50, enqueue_timeout=0.1)
+    writer.submit_many([{'id': index} for index in range(8)])
+    if batches != [8] or not writer.barrier(timeout=5):
+        print(f"❌ Records not appended together: {batches}")
+        return False
+    release = threading.Event()
+    writer.apply_batch = lambda records: release.wait()
+    writer.submit({'id': 8})  # appended; the writer then blocks applying it
+    threads, _ = submit_in_background(writer, [{'id': 9}, {'id': 10}])
+    time.sleep(0.1)
+    try:
+        writer.submit_many([{'id': index} for index in range(11, 20)])
+        print("❌ Queued 9 records with room for 8")
+        return False
+    except QueueFullError:
+        pass
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+    if writer.stats()['submitted'] != 11:
+        print(f"❌ Part of a refused submit was queued: {writer.stats()}")
+        return False
+    print("✅ 8 records in one append; 9 refused together")
+    return True
+
+
+def test_backpressure():
+    """A full queue makes submit() wait and then refuse the record"""
+    print("🧪 Testing backpressure...")
+    release = threading.Event()
+    writer = PersistenceWriter(lambda records: None, lambda records: release.wait(),
+                               max_queued=2, max_batch=1, enqueue_timeout=0.2)
+    writer.submit({'id': 1})  # appended, then the writer blocks applying it
+    threads, _ = submit_in_background(writer, [{'id': 2}, {'id': 3}])
+    time.sleep(0.1)
+    started = time.monotonic()
+    try:
+        writer.submit({'id': 4})
+        print("❌ Full queue accepted a record")
+        return False
+    except QueueFullError as e:
+        waited = time.monotonic() - started
+        message = str(e)
+    stats = writer.stats()
+    release.set()
+    for thread in threads:
+        thread.join()
+    if waited < 0.15 or stats['rejected'] != 1 or stats['lag_seconds'] <= 0:
+        print(f"❌ Unexpected backpressure: waited {waited:.2f}s, {stats}")
+        return False
+    print(f"✅ Refused after {waited:.2f}s ({message}), lag {stats['lag_seconds']}s")
+    return True
+
+
+def test_failed_writes():
+    """A failed append is reported to its submitter; a failed apply is retried, not dropped"""
+    print("🧪 Testing failed writes...")
+    retry_delay = persistence_writer.RETRY_DELAY
+    persistence_writer.RETRY_DELAY = 0.01
+    written = []
+    apply_failures = [4]  # more than one batch's worth of attempts
+
+    def append_batch(records):
+        if any(record.get('bad') for record in records):
+            raise OSError('disk full')
+
+    def apply_batch(records):
+        if apply_failures[0]:
+            apply_failures[0] -= 1
+            raise RuntimeError('database is locked')
+        written.extend(record['id'] for record in records)
+
+    try:
+        writer = PersistenceWriter(append_batch, apply_batch, max_queued=10, max_batch=10, enqueue_timeout=1)
+        writer.submit({'id': 1})  # appended; its apply fails three times and it is kept
+        try:
+            writer.submit({'id': 2, 'bad': True})
+            print("❌ Failed append was acknowledged")
+            return False
+        except OSError as e:
+            error = str(e)
+        kept = writer.stats()['unapplied']
+        writer.submit({'id': 3})
+        if not writer.barrier(timeout=5) or sorted(written) != [1, 3]:
+            print(f"❌ Records lost: {written}, {writer.stats()}")
+            return False
+        stats = writer.stats()
+    finally:
+        persistence_writer.RETRY_DELAY = retry_delay
+    if kept != 1 or (stats['failed'], stats['written'], stats['unapplied']) != (1, 2, 0):
+        print(f"❌ Unexpected counts: kept {kept}, {stats}")
+        return False
+    print(f"✅ Append failure raised {error!r}; record kept through 4 failed applies")
+    return True
+
+
+if __name__ == "__main__":
+    test_batches_and_barrier()
+    test_submit_many()
+    test_backpressure()
+    test_failed_writes()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the pooled Replicate client, run against the local fake API
+"""
+
+import io
+
+from fake_replicate_server import FakeReplicateServer
+from replicate_client import PredictionTimeout, ReplicateClient, ReplicateError
+from test_upload_modes import create_test_wav_bytes
+
+
+def make_audio_file():
+    audio_file = io.BytesIO(create_test_wav_bytes())
+    audio_file.name = 'audio.wav'
+    return audio_file
+
+
+def test_prediction_succeeds():
+    """A prediction is created, polled until it succeeds and its output returned"""
+    print("🧪 Testing create-then-poll...")
+    server = FakeReplicateServer(latency=0.3).start()
+    try:
+        client = ReplicateClient(server.base_url, api_token='fake', poll_interval=0.05)
+        output = client.run('fake-whisper', {'audio': make_audio_file()}, timeout=10)
+        if output.get('transcription') != 'this is a fake transcription':
+            print(f"❌ Unexpected output: {output}")
+            return False
+        print(f"✅ Output received after {client.stats()['polls']} polls")
+        return True
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_deadline_cancels_prediction():
+    """A prediction still running at the deadline is cancelled and reported as a timeout"""
+    print("🧪 Testing per-call deadline...")
+    server = FakeReplicateServer(latency=5.0).start()
+    try:
+        client = ReplicateClient(server.base_url, api_token='fake', poll_interval=0.05)
+        try:
+            client.run('fake-whisper', {'audio': make_audio_file()}, timeout=0.5)
+        except PredictionTimeout as e:
+            if server.canceled != 1:
+                print("❌ Timed-out prediction was not cancelled")
+                return False
+            print(f"✅ Timed out and cancelled: {e}")
+            return True
+        print("❌ Call did not time out")
+        return False
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_failed_prediction():
+    """A failed prediction raises ReplicateError"""
+    print("🧪 Testing failed prediction...")
+    server = FakeReplicateServer(latency=0.1, failure_rate=1.0).start()
+    try:
+        client = ReplicateClient(server.base_url, api_token='fake', poll_interval=0.05)
+        try:
+            client.run('fake-whisper', {'audio': make_audio_file()}, timeout=10)
+        except ReplicateError as e:
+            print(f"✅ Failure reported: {e}")
+            return True
+        print("❌ Failed prediction was not reported")
+        return False
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    test_prediction_succeeds()
+    test_deadline_cancels_prediction()
+    test_failed_prediction()
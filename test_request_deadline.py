@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for request deadlines and their propagation to the Replicate client
+"""
+
+import time
+
+from fake_replicate_server import FakeReplicateServer
+from replicate_client import PredictionTimeout, ReplicateClient
+from request_deadline import Deadline, DeadlineExceeded, parse_deadline
+from test_replicate_client import make_audio_file
+
+
+def test_parse_deadline():
+    """Client deadlines fall back to the default, are capped and must be positive"""
+    print("🧪 Testing deadline parsing...")
+    if parse_deadline(None, 120, 600) != 120 or parse_deadline('30', 120, 600) != 30.0:
+        print("❌ Default or explicit deadline not used")
+        return False
+    if parse_deadline(5000, 120, 600) != 600:
+        print("❌ Deadline was not capped")
+        return False
+    for bad in ('soon', '-1', 0):
+        try:
+            parse_deadline(bad, 120, 600)
+        except ValueError:
+            continue
+        print(f"❌ Accepted invalid deadline {bad!r}")
+        return False
+    print("✅ Deadlines parsed")
+    return True
+
+
+def test_stage_outcomes():
+    """Stages are timed; failures after the budget ran out become DeadlineExceeded"""
+    print("🧪 Testing stage accounting...")
+    deadline = Deadline(0.2)
+    with deadline.stage('decode'):
+        pass
+    deadline.skip('openai_whisper', 5.0)
+    try:
+        with deadline.stage('speechbrain'):
+            time.sleep(0.3)
+            raise OSError('socket timed out')
+    except DeadlineExceeded as e:
+        if e.stage != 'speechbrain':
+            print(f"❌ Wrong stage reported: {e.stage}")
+            return False
+    else:
+        print("❌ Late failure was not reported as a timeout")
+        return False
+    try:
+        with deadline.stage('google_fallback'):
+            pass
+        print("❌ Stage started with no budget left")
+        return False
+    except DeadlineExceeded:
+        pass
+
+    outcomes = [(stage['stage'], stage['outcome']) for stage in deadline.report()['stages']]
+    expected = [('decode', 'ok'), ('openai_whisper', 'skipped'), ('speechbrain', 'timed_out'),
+                ('google_fallback', 'not_started')]
+    if outcomes != expected:
+        print(f"❌ Unexpected stages: {outcomes}")
+        return False
+    print(f"✅ Stages recorded: {outcomes}")
+    return True
+
+
+def test_remaining_budget_bounds_prediction():
+    """A prediction given the remaining budget is cancelled when it runs out"""
+    print("🧪 Testing deadline propagation to Replicate...")
+    server = FakeReplicateServer(latency=5.0).start()
+    try:
+        client = ReplicateClient(server.base_url, api_token='fake', poll_interval=0.05)
+        deadline = Deadline(0.5)
+        start = time.time()
+        try:
+            with deadline.stage('openai_whisper'):
+                client.run('fake-whisper', {'audio': make_audio_file()}, timeout=deadline.remaining())
+        except DeadlineExceeded:
+            elapsed = time.time() - start
+            if elapsed > 1.5 or server.canceled != 1:
+                print(f"❌ Took {elapsed:.2f}s, {server.canceled} predictions cancelled")
+                return False
+            print(f"✅ Stopped after {elapsed:.2f}s and cancelled the prediction")
+            return True
+        except PredictionTimeout:
+            print("❌ Timeout was not reported against the deadline")
+            return False
+        print("❌ Call did not time out")
+        return False
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    test_parse_deadline()
+    test_stage_outcomes()
+    test_remaining_budget_bounds_prediction()
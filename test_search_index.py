@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the full-text search index (offline)
+"""
+
+import search_index
+from search_index import SearchIndex, parse_query
+from transcript_documents import rebuild_document, upsert_delta
+
+RECORDS = [
+    {'id': 1, 'session_id': 'a', 'service': 'speechbrain', 'transcription': 'The quarterly planning meeting'},
+    {'id': 2, 'session_id': 'a', 'service': 'whisper', 'transcription': 'Planning the party, then a meeting'},
+    {'id': 3, 'session_id': 'b', 'service': 'speechbrain', 'transcription': "Don't forget the meeting notes"},
+    {'id': 4, 'session_id': 'b', 'service': 'speechbrain', 'transcription': 'Meetings run long; plan less'},
+]
+
+
+def build():
+    index = SearchIndex()
+    index.add_many(RECORDS[2:])
+    index.add_many(RECORDS[:2])  # arrive after higher ids, as queued writes can
+    return index
+
+
+def test_queries():
+    """Words, phrases, prefixes and filters"""
+    print("🧪 Testing search queries...")
+    index = build()
+    cases = [
+        (('meeting',), {}, [1, 2, 3]),
+        (('"planning meeting"',), {}, [1]),
+        (('plan*',), {}, [1, 2, 4]),
+        (('"the meet*"',), {}, [3]),
+        (("don't notes",), {}, [3]),
+        (('meeting',), {'session_id': 'a', 'service': 'whisper'}, [2]),
+        (('meeting party',), {}, [2]),
+        (('nothing',), {}, []),
+    ]
+    for args, filters, expected in cases:
+        ids, more = index.search(*args, **filters)
+        if ids != expected or more:
+            print(f"❌ {args[0]!r} {filters}: {ids}, expected {expected}")
+            return False
+    print(f"✅ {len(cases)} queries matched")
+    return True
+
+
+def test_paging_and_errors():
+    """Pages follow the after cursor; an empty query is rejected"""
+    print("🧪 Testing search paging...")
+    index = build()
+    first, more = index.search('plan*', limit=2)
+    second, last = index.search('plan*', after=first[-1], limit=2)
+    if (first, more, second, last) != ([1, 2], True, [4], False):
+        print(f"❌ Pages {first} {more} / {second} {last}")
+        return False
+    try:
+        parse_query(' "" * ')
+        print("❌ Empty query accepted")
+        return False
+    except ValueError:
+        pass
+    print(f"✅ Paged: {first} then {second}; {index.stats()}")
+    return True
+
+
+def test_session_documents():
+    """A session saved as deltas is searched as its rebuilt document; superseded text does not match"""
+    print("🧪 Testing session documents...")
+    compact_min = search_index.COMPACT_MIN_GARBAGE
+    search_index.COMPACT_MIN_GARBAGE = 0
+    try:
+        index = build()
+        saves = ['hello', 'hello there', 'hello there world', 'hello there, wonderful people']
+        document, records = '', []
+        for record_id, text in enumerate(saves, start=10):
+            offset, delta = upsert_delta(document, text)
+            records.append({'id': record_id, 'session_id': 's', 'service': 'browser',
+                            'transcription': delta, 'text_offset': offset})
+            document, _ = rebuild_document(records)
+            index.set_document('s', record_id, document, 'browser', [record['id'] for record in records[:-1]])
+        index.set_document('s', 11, 'hello there', 'browser', [10])  # a stale rebuild arriving late
+
+        cases = [('"hello there"', [13]), ('wor*', []), ('wonder*', [13]), ('people', [13]), ('meeting', [1, 2, 3])]
+        for query, expected in cases:
+            ids, _ = index.search(query)
+            if ids != expected:
+                print(f"❌ {query!r} found {ids}, expected {expected}")
+                return False
+        if index.search('hello', session_id='s')[0] != [13] or index.document_sessions([3, 12, 13]) != {13: 's'}:
+            print(f"❌ Session filter or document lookup wrong: {index.document_sessions([3, 12, 13])}")
+            return False
+        if index.stats()['records'] != 5 or index.missing([10, 11, 12, 13]):
+            print(f"❌ Superseded versions counted or reported missing: {index.stats()}")
+            return False
+
+        # Keep saving: tombstoned entries are compacted away once they outnumber live ones
+        for record_id in range(14, 64):
+            document += f' word{record_id}'
+            index.set_document('s', record_id, document, 'browser', [record_id - 1])
+        stats = index.stats()
+        if 'world' in index.postings or index.garbage > index.entries - index.garbage:
+            print(f"❌ Superseded versions left behind: {stats}, {index.garbage} tombstoned entries")
+            return False
+    finally:
+        search_index.COMPACT_MIN_GARBAGE = compact_min
+    print(f"✅ {len(saves)} delta saves searched as one document; 50 more compacted to {stats}")
+    return True
+
+
+if __name__ == "__main__":
+    test_queries()
+    test_paging_and_errors()
+    test_session_documents()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the in-memory session view in front of the transcription store (offline)
+"""
+
+import os
+import tempfile
+import time
+
+from session_cache import SessionCache
+from test_transcription_store import make_record
+from transcription_store import TranscriptionStore
+
+
+def store_record(store, cache, text, session_id='a'):
+    record = make_record(text, session_id)
+    record['id'] = store.add(record)
+    cache.add(record)
+    return record
+
+
+def test_cached_session_follows_writes():
+    """Reads are served from memory, pick up local adds and notice writes from another worker"""
+    print("🧪 Testing session cache freshness...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'store.db')
+        store = TranscriptionStore(path)
+        cache = SessionCache(store, 300, 100, 10000, 10)
+        store_record(store, cache, 'one')
+        cache.get('a')
+        store_record(store, cache, 'two')
+        records = cache.get('a')
+        if records != store.by_session('a'):
+            print("❌ Cached records differ from the stored ones")
+            return False
+        texts = [record['transcription'] for record in records]
+        if texts != ['one', 'two'] or cache.hits != 1:
+            print(f"❌ Local add not served from memory: {texts}, {cache.stats()}")
+            return False
+
+        # Another worker process writing to the same database
+        TranscriptionStore(path).add(make_record('three', 'a'))
+        texts = [record['transcription'] for record in cache.get('a')]
+        if texts != ['one', 'two', 'three']:
+            print(f"❌ Stale session returned: {texts}")
+            return False
+        print(f"✅ Session a: {texts}")
+        return True
+
+
+def test_limits():
+    """Idle sessions expire; sessions over the caps are served from the store"""
+    print("🧪 Testing session cache limits...")
+    with tempfile.TemporaryDirectory() as directory:
+        store = TranscriptionStore(os.path.join(directory, 'store.db'))
+        cache = SessionCache(store, 0.1, 2, 20, 10)
+        store_record(store, cache, 'short', 'idle')
+        cache.get('idle')
+        time.sleep(0.2)
+        if cache.stats()['sessions'] != 0:
+            print("❌ Idle session not expired")
+            return False
+
+        for text in ('one', 'two', 'three'):
+            store_record(store, cache, text, 'big')
+        store_record(store, cache, 'x' * 50, 'long')
+        if len(cache.get('big')) != 3 or len(cache.get('long')) != 1 or cache.stats()['sessions'] != 0:
+            print(f"❌ Oversized sessions kept in memory: {cache.stats()}")
+            return False
+        print(f"✅ Limits applied: {cache.stats()}")
+        return True
+
+
+if __name__ == "__main__":
+    test_cached_session_follows_writes()
+    test_limits()
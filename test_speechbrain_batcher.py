@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the SpeechBrain micro-batcher (offline, with a fake model)
+"""
+
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+from speechbrain_batcher import MicroBatcher
+
+
+def test_timeouts_drop_waiting_clips():
+    """A caller that stops waiting gets a timeout, and its clip is never decoded if its batch hadn't started"""
+    print("🧪 Testing micro-batcher timeouts...")
+    release = threading.Event()
+    decoded = []
+
+    def run_batch(clips):
+        release.wait()
+        decoded.extend(len(clip) for clip in clips)
+        return [f'{len(clip)} samples' for clip in clips]
+
+    batcher = MicroBatcher(run_batch, max_batch_size=2, max_wait=0.01, runners=1)
+    first = batcher.submit(np.zeros(100, dtype=np.float32))  # its batch blocks the only runner
+    time.sleep(0.05)
+    started = time.monotonic()
+    try:
+        batcher.transcribe(np.zeros(200, dtype=np.float32), timeout=0.1)
+        print("❌ transcribe() did not time out")
+        return False
+    except FutureTimeoutError:
+        waited = time.monotonic() - started
+    release.set()
+    if first.result(timeout=5) != '100 samples':
+        print("❌ Running batch lost its result")
+        return False
+    third = batcher.transcribe(np.zeros(300, dtype=np.float32), timeout=5)
+    if decoded != [100, 300] or third != '300 samples' or waited > 0.5:
+        print(f"❌ Decoded {decoded} after waiting {waited:.2f}s")
+        return False
+    print(f"✅ Gave up after {waited:.2f}s; the abandoned clip was skipped")
+    return True
+
+
+if __name__ == "__main__":
+    test_timeouts_drop_waiting_clips()
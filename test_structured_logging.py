@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the production and debug logging profiles (offline)
+"""
+
+import io
+import json
+import logging
+import os
+import tempfile
+
+from structured_logging import TRANSCRIPT, DebugSampler, configure_logging
+
+
+def restore_logging():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(logging.WARNING)
+    logging.getLogger('test_structured_logging').setLevel(logging.NOTSET)
+
+
+def test_production_profile():
+    """Records go through the queue as JSON lines, with extras and tracebacks as fields; transcripts never do"""
+    print("🧪 Testing production logging...")
+    stream = io.StringIO()
+    listener = configure_logging('production', 'INFO', 0.25, stream=stream, debug_loggers=('test_structured_logging',))
+    logger = logging.getLogger('test_structured_logging')
+    try:
+        logger.info("📝 Stored %s", 'record-1', extra={'word_count': 3})
+        for index in range(8):
+            logger.debug("detail %d", index)
+            logger.debug("📝 Transcription text: %s", 'hello there', extra=TRANSCRIPT)
+        logger.info("📝 Transcription text: %s", 'hello there', extra=TRANSCRIPT)
+        library_debug = logging.getLogger('some_library').isEnabledFor(logging.DEBUG)
+        root_level = logging.getLogger().level
+        try:
+            raise RuntimeError('boom')
+        except RuntimeError:
+            logger.exception("❌ Failed")
+    finally:
+        listener.stop()
+        restore_logging()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    messages = [line['message'] for line in lines]
+    if messages != ["📝 Stored record-1", "detail 3", "detail 7", "❌ Failed"]:
+        print(f"❌ Unexpected records: {messages}")
+        return False
+    if library_debug or root_level != logging.INFO:
+        print("❌ Debug sampling reached loggers outside the app")
+        return False
+    if lines[0]['word_count'] != 3 or lines[0]['level'] != 'INFO' or 'RuntimeError: boom' not in lines[-1]['exception']:
+        print(f"❌ Missing fields: {lines[0]}, {lines[-1]}")
+        return False
+    print(f"✅ {len(lines)} JSON records, 2 of 8 debug records sampled")
+    return True
+
+
+def test_debug_profile_and_validation():
+    """The debug profile keeps every record as plain text; bad settings are rejected"""
+    print("🧪 Testing debug logging...")
+    stream = io.StringIO()
+    try:
+        listener = configure_logging('debug', 'INFO', stream=stream)
+        logging.getLogger('test_structured_logging').debug("📝 Transcription text: %s", 'hello there')
+    finally:
+        restore_logging()
+    if listener is not None or stream.getvalue() != "DEBUG:test_structured_logging:📝 Transcription text: hello there\n":
+        print(f"❌ Unexpected debug output: {stream.getvalue()!r}")
+        return False
+
+    for profile, rate in (('verbose', 0.0), ('production', 1.5)):
+        try:
+            configure_logging(profile, 'INFO', rate)
+            print(f"❌ Accepted {profile!r} with rate {rate}")
+            return False
+        except ValueError:
+            pass
+
+    sampler = DebugSampler(logging.WARNING, 1.0)
+    info = logging.LogRecord('x', logging.INFO, '', 0, 'info', None, None)
+    if sampler.filter(info):
+        print("❌ INFO below LOG_LEVEL was sampled like debug detail")
+        return False
+    print("✅ Debug profile is verbose; bad settings rejected")
+    return True
+
+
+def test_forked_worker():
+    """A child forked after production logging was configured still writes its records"""
+    print("🧪 Testing logging in forked workers...")
+    with tempfile.TemporaryFile('w+') as stream:
+        listener = configure_logging('production', 'INFO', stream=stream)
+        logger = logging.getLogger('test_structured_logging')
+        try:
+            logger.info("from the parent")
+            pid = os.fork()
+            if pid == 0:
+                logger.info("from the child")
+                listener.stop()  # as atexit does
+                os._exit(0)
+            os.waitpid(pid, 0)
+            logger.info("parent again")
+        finally:
+            listener.stop()
+            restore_logging()
+        stream.seek(0)
+        messages = sorted(json.loads(line)['message'] for line in stream.read().splitlines())
+    if messages != ["from the child", "from the parent", "parent again"]:
+        print(f"❌ Unexpected records: {messages}")
+        return False
+    print("✅ Parent and child records both written")
+    return True
+
+
+if __name__ == "__main__":
+    test_production_profile()
+    test_debug_profile_and_validation()
+    test_forked_worker()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for session documents saved as deltas (offline)
+"""
+
+import threading
+import time
+
+from transcript_documents import SessionLocks, rebuild_document, upsert_delta
+
+
+def apply(document, change):
+    offset, delta = change
+    return document[:offset] + delta
+
+
+def test_upserts_store_only_new_text():
+    """A growing auto-saved transcript is stored as its new text only and rebuilt exactly"""
+    print("🧪 Testing upserts...")
+    saves = ['hello there', 'hello there general', 'hello there general kenobi', 'hello there, general kenobi']
+    document, records = '', []
+    for text in saves:
+        change = upsert_delta(document, text)
+        records.append({'text_offset': change[0], 'transcription': change[1]})
+        document = apply(document, change)
+    records.append({'transcription': 'a standalone note'})
+
+    stored = sum(len(record['transcription']) for record in records[:-1])
+    rebuilt, updates = rebuild_document(records)
+    if rebuilt != saves[-1] or updates != len(saves):
+        print(f"❌ Rebuilt {rebuilt!r} from {updates} updates")
+        return False
+    if stored != 42 or upsert_delta(rebuilt, saves[-1]) is not None:
+        print(f"❌ Stored {stored} characters: {records}")
+        return False
+    print(f"✅ {len(saves)} saves, {sum(len(text) for text in saves)} characters in total, stored as {stored}")
+    return True
+
+
+def test_deltas_truncate():
+    """A delta replaces everything after its offset, across earlier deltas"""
+    print("🧪 Testing deltas...")
+    records = [
+        {'text_offset': 0, 'transcription': 'one '},
+        {'text_offset': 4, 'transcription': 'two '},
+        {'text_offset': 8, 'transcription': 'three'},
+        {'text_offset': 2, 'transcription': 'ly'},
+        {'text_offset': 4, 'transcription': ' four'},
+    ]
+    rebuilt, _ = rebuild_document(records)
+    if rebuilt != 'only four' or rebuild_document([{'transcription': 'x'}]) != (None, 0):
+        print(f"❌ Rebuilt {rebuilt!r}")
+        return False
+    print(f"✅ Rebuilt {rebuilt!r}")
+    return True
+
+
+def test_session_locks():
+    """Saves to one session take turns; saves to different sessions don't wait for each other"""
+    print("🧪 Testing session locks...")
+    locks = SessionLocks()
+    held, overlaps = [], []
+
+    def save(session_id):
+        with locks.hold(session_id):
+            held.append(session_id)
+            if len(held) > 1:
+                overlaps.append(tuple(sorted(held)))
+            time.sleep(0.1)
+            held.remove(session_id)
+
+    threads = [threading.Thread(target=save, args=(session_id,)) for session_id in ('a', 'a', 'b')]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    if ('a', 'a') in overlaps or ('a', 'b') not in overlaps or elapsed > 0.3:
+        print(f"❌ Overlapping saves {overlaps} in {elapsed:.2f}s")
+        return False
+    if len(locks):
+        print(f"❌ {len(locks)} locks left behind")
+        return False
+    print(f"✅ 3 saves over 2 sessions in {elapsed:.2f}s")
+    return True
+
+
+if __name__ == "__main__":
+    test_upserts_store_only_new_text()
+    test_deltas_truncate()
+    test_session_locks()
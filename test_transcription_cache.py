@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the two-tier transcription cache (offline)
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from transcription_cache import TranscriptionCache
+
+
+def test_coalescing_and_errors():
+    """Concurrent misses run compute() once; followers get the leader's result or exception"""
+    print("🧪 Testing request coalescing...")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TranscriptionCache(directory, max_memory_entries=10, max_disk_bytes=1 << 20, ttl=60)
+        calls, statuses = [], []
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            release.wait()
+            return {'transcription': 'hello'}
+
+        def lookup():
+            statuses.append(cache.get_or_compute('key', compute, timeout=5)[1])
+
+        threads = [threading.Thread(target=lookup) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+        if len(calls) != 1 or sorted(statuses) != ['coalesced'] * 3 + ['miss']:
+            print(f"❌ compute ran {len(calls)} times, statuses {statuses}")
+            return False
+        if cache.get_or_compute('key', compute)[1] != 'hit':
+            print("❌ Stored result not served from the cache")
+            return False
+
+        failing = threading.Event()
+        errors = []
+
+        def broken():
+            failing.wait()
+            raise RuntimeError('engine down')
+
+        def failing_lookup():
+            try:
+                cache.get_or_compute('broken', broken, timeout=5)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=failing_lookup) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        failing.set()
+        for thread in threads:
+            thread.join()
+        if errors != ['engine down'] * 3 or cache.get('broken') is not None or cache.stats()['in_flight']:
+            print(f"❌ Errors {errors}, stats {cache.stats()}")
+            return False
+    print("✅ 4 requests, 1 compute; failure passed to all 3 waiters")
+    return True
+
+
+def test_ttl_and_disk_eviction():
+    """Expired entries are dropped; the disk tier is trimmed oldest-first and reloaded on restart"""
+    print("🧪 Testing expiry and eviction...")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TranscriptionCache(directory, max_memory_entries=2, max_disk_bytes=250, ttl=0.3)
+        for index in range(4):
+            cache.put(f'key{index}', {'transcription': f'text {index} ' * 3})
+        stats = cache.stats()
+        files = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+        if stats['disk_bytes'] > 250 or 'key0.json' in files or stats['memory_entries'] != 2:
+            print(f"❌ Not trimmed: {stats}, {files}")
+            return False
+
+        reopened = TranscriptionCache(directory, max_memory_entries=2, max_disk_bytes=250, ttl=0.3)
+        if reopened.get('key3') != {'transcription': 'text 3 ' * 3} or reopened.stats()['disk_entries'] != len(files):
+            print(f"❌ Disk tier not reloaded: {reopened.stats()}")
+            return False
+
+        time.sleep(0.35)
+        if cache.get('key3') is not None or reopened.get('key2') is not None:
+            print("❌ Expired entries served")
+            return False
+        if 'key2.json' in os.listdir(directory):
+            print("❌ Expired disk entry not removed")
+            return False
+    print(f"✅ Trimmed to {stats['disk_entries']} disk entries ({stats['disk_bytes']} bytes); expired entries dropped")
+    return True
+
+
+if __name__ == "__main__":
+    test_coalescing_and_errors()
+    test_ttl_and_disk_eviction()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the segmented transcription log (offline)
+"""
+
+import fcntl
+import os
+import tempfile
+
+from transcription_log import TranscriptionLog
+
+
+def record(index):
+    return {'service': 'speechbrain', 'transcription': f'note number {index}', 'word_count': 3}
+
+
+def test_rotation_and_lookup():
+    """Records are found by id across rotated segments, and again after reopening from .idx files"""
+    print("🧪 Testing rotation and lookup...")
+    with tempfile.TemporaryDirectory() as directory:
+        log = TranscriptionLog(directory, segment_bytes=300)
+        ids = [log.append(record(index)) for index in range(20)]
+        if ids != list(range(1, 21)):
+            print(f"❌ Ids not dense: {ids}")
+            return False
+        segments = [name for name in os.listdir(directory) if name.endswith('.jsonl')]
+        if len(segments) < 3:
+            print(f"❌ Log did not rotate: {segments}")
+            return False
+
+        reopened = TranscriptionLog(directory, segment_bytes=300)
+        if reopened.get(7)['transcription'] != 'note number 6' or reopened.get(21) is not None:
+            print("❌ Lookup by id failed after reopening")
+            return False
+        if [entry['id'] for entry in reopened.entries(18)] != [18, 19, 20]:
+            print("❌ entries() did not start at the requested id")
+            return False
+        print(f"✅ 20 records in {len(segments)} segments")
+        return True
+
+
+def test_torn_write_and_second_writer():
+    """A half-written line is cut off on startup; another writer's records are picked up"""
+    print("🧪 Testing recovery...")
+    with tempfile.TemporaryDirectory() as directory:
+        log = TranscriptionLog(directory, segment_bytes=1024 * 1024)
+        log.append(record(0))
+        with open(os.path.join(directory, 'segment-00000001.jsonl'), 'ab') as f:
+            f.write(b'{"id": 2, "service": "spee')
+
+        recovered = TranscriptionLog(directory, segment_bytes=1024 * 1024)
+        if recovered.append(record(1)) != 2 or recovered.get(2)['transcription'] != 'note number 1':
+            print("❌ Torn line not cut off")
+            return False
+        if log.get(2) is None or log.append(record(2)) != 3:
+            print("❌ First writer did not follow the second")
+            return False
+        print("✅ Torn write repaired and writers kept in sequence")
+        return True
+
+
+def test_clear():
+    """Clearing leaves a marker; ids carry on"""
+    print("🧪 Testing clear...")
+    with tempfile.TemporaryDirectory() as directory:
+        log = TranscriptionLog(directory, segment_bytes=300)
+        for index in range(10):
+            log.append(record(index))
+        log.clear()
+        reopened = TranscriptionLog(directory, segment_bytes=300)
+        if reopened.cleared_before() != 11 or reopened.get(5) is not None or reopened.append(record(0)) != 12:
+            print(f"❌ Unexpected state after clear: {reopened.stats()}")
+            return False
+        print(f"✅ Cleared: {reopened.stats()}")
+        return True
+
+
+def test_out_of_order_ids():
+    """Ids reserved together but written in another order are all found, also from sealed .idx files"""
+    print("🧪 Testing out-of-order appends...")
+    with tempfile.TemporaryDirectory() as directory:
+        log = TranscriptionLog(directory, segment_bytes=300)
+        first = log.reserve(12)
+        late = [{**record(index), 'id': first + index} for index in range(6)]
+        early = [{**record(index), 'id': first + index} for index in range(6, 11)]
+        log.append_many(early, 'batch')
+        log.append_many(late, 'record')  # id first + 11 is never written
+        if log.append(record(99)) != first + 12:
+            print("❌ Reserved ids handed out again")
+            return False
+
+        reopened = TranscriptionLog(directory, segment_bytes=300)
+        ids = [entry['id'] for entry in reopened.entries()]
+        if ids != list(range(first, first + 11)) + [first + 12] or reopened.get(first + 11) is not None:
+            print(f"❌ Unexpected entries after reopening: {ids}")
+            return False
+        if reopened.get(first + 3)['transcription'] != 'note number 3':
+            print("❌ Lookup of a late entry failed")
+            return False
+        print(f"✅ {len(ids)} entries written out of order, one gap: {reopened.stats()}")
+        return True
+
+
+def test_forked_writers():
+    """A child forked after the log was opened (gunicorn --preload) is excluded by the parent's lock"""
+    print("🧪 Testing forked writers...")
+    with tempfile.TemporaryDirectory() as directory:
+        log = TranscriptionLog(directory, segment_bytes=1024 * 1024)
+        read_end, write_end = os.pipe()
+        with log.lock, log._file_lock():
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_end)
+                try:
+                    fcntl.flock(log.lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    os.write(write_end, b'0')
+                except BlockingIOError:
+                    os.write(write_end, b'1')
+                ids = ','.join(str(log.append(record(index))) for index in range(50))
+                os.write(write_end, ids.encode())
+                os._exit(0)
+            os.close(write_end)
+            excluded = os.read(read_end, 1)  # the parent holds the lock until the child has tried it
+        parent_ids = [log.append(record(index)) for index in range(50)]
+        os.waitpid(pid, 0)
+        with os.fdopen(read_end, 'rb') as reply:
+            child_ids = [int(value) for value in reply.read().decode().split(',')]
+        if excluded != b'1':
+            print("❌ Child took the file lock while the parent held it")
+            return False
+        if set(parent_ids) & set(child_ids) or len(list(log.entries())) != 100:
+            print(f"❌ Parent and child reserved the same ids: {sorted(set(parent_ids) & set(child_ids))}")
+            return False
+        print("✅ Parent and child wrote 50 records each with distinct ids")
+        return True
+
+
+if __name__ == "__main__":
+    test_rotation_and_lookup()
+    test_torn_write_and_second_writer()
+    test_clear()
+    test_out_of_order_ids()
+    test_forked_writers()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the usage rollups kept by the transcription store (offline)
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from test_transcription_store import make_record
+from transcription_rollups import rebuild_rollups
+from transcription_store import TranscriptionStore
+
+
+def engine_record(record_id, engine_time, fallback, session_id='a'):
+    record = make_record('engine text here', session_id)
+    record.update({'id': record_id, 'service': 'speechbrain', 'audio_size': 1000,
+                   'engine_time': engine_time, 'fallback': fallback})
+    return record
+
+
+def test_incremental_rollups():
+    """Rollups follow every insert, ignore replayed records and match a full recount"""
+    print("🧪 Testing incremental rollups...")
+    with tempfile.TemporaryDirectory() as directory:
+        store = TranscriptionStore(os.path.join(directory, 'store.db'))
+        store.add(make_record('browser note', 'b'))
+        batch = [engine_record(10, 0.3, False), engine_record(11, 4.0, True), engine_record(12, 75.0, False, 'b')]
+        store.add_many(batch)
+        store.add_many(batch[:2])  # replayed from the log: already stored
+
+        stats = store.rollups(24, 30, 'b')
+        speechbrain = stats['services']['speechbrain']
+        histogram = [bucket['count'] for bucket in speechbrain['latency_histogram']]
+        if (stats['totals']['transcriptions'], speechbrain['transcriptions'], speechbrain['audio_bytes']) != (4, 3, 3000):
+            print(f"❌ Wrong totals: {stats['totals']}, {speechbrain}")
+            return False
+        if speechbrain['fallback_rate'] != 0.3333 or histogram != [1, 0, 0, 1, 0, 0, 0, 1]:
+            print(f"❌ Wrong engine figures: {speechbrain}")
+            return False
+        if (stats['session']['transcriptions'] != 2 or len(stats['hours']) != 24 or len(stats['days']) != 30
+                or stats['hours'][-1]['transcriptions'] != 4 or stats['hours'][0]['transcriptions'] != 0):
+            print(f"❌ Wrong session or period rollups: {stats}")
+            return False
+
+        with store._connection() as connection:
+            rebuild_rollups(connection)
+        if store.rollups(24, 30, 'b') != stats:
+            print("❌ Incremental rollups differ from a recount")
+            return False
+        print(f"✅ {stats['totals']}")
+        return True
+
+
+def test_delta_documents():
+    """A session edited through delta saves counts once, with its current document's counts"""
+    print("🧪 Testing delta document rollups...")
+    with tempfile.TemporaryDirectory() as directory:
+        store = TranscriptionStore(os.path.join(directory, 'store.db'))
+        saves = [('hel', 0), ('lo', 3), (' world', 5), (' again', 11)]
+        for record_id, (delta, offset) in enumerate(saves, start=1):
+            record = make_record(delta, 'd')
+            record.update({'id': record_id, 'text_offset': offset})
+            store.add_many([record])
+        replaced = make_record('hello there', 'd')
+        replaced.update({'id': 5, 'text_offset': 0})
+        store.add_many([replaced, engine_record(6, 1.0, False, 'd')])
+
+        stats = store.rollups(1, 1, 'd')
+        figures = (stats['totals']['transcriptions'], stats['totals']['words'], stats['totals']['characters'])
+        if figures != (2, 5, 27) or stats['session']['words'] != 5:
+            print(f"❌ Wrong document counts: {stats['totals']}, {stats['session']}")
+            return False
+        browser = stats['services']['browser_speech_recognition']
+        if (browser['transcriptions'], browser['words'], browser['characters']) != (1, 2, 11):
+            print(f"❌ Wrong service counts: {browser}")
+            return False
+
+        with store._connection() as connection:
+            rebuild_rollups(connection)
+        if store.rollups(1, 1, 'd') != stats:
+            print("❌ Incremental rollups differ from a recount")
+            return False
+        print(f"✅ {stats['totals']}")
+        return True
+
+
+def test_existing_and_cleared_stores():
+    """A database from before rollups gets them on open; clearing resets them"""
+    print("🧪 Testing rollup migration...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'store.db')
+        store = TranscriptionStore(path)
+        store.add_many([engine_record(index, 1.5, False) for index in range(1, 6)])
+        with sqlite3.connect(path) as connection:
+            connection.execute('DROP TABLE rollups')
+            connection.execute('DROP TABLE latency_histogram')
+
+        reopened = TranscriptionStore(path)
+        if reopened.rollups(24, 30)['totals']['transcriptions'] != 5:
+            print(f"❌ Rollups not rebuilt: {reopened.rollups(24, 30)}")
+            return False
+        reopened.clear()
+        stats = reopened.rollups(24, 30)
+        if (stats['totals']['transcriptions'] != 0 or stats['services']
+                or any(hour['transcriptions'] for hour in stats['hours'])):
+            print(f"❌ Rollups survived a clear: {stats}")
+            return False
+        print("✅ Rebuilt on open and reset by clear")
+        return True
+
+
+if __name__ == "__main__":
+    test_incremental_rollups()
+    test_delta_documents()
+    test_existing_and_cleared_stores()
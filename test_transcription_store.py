@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the SQLite transcription store (offline)
+"""
+
+import os
+import tempfile
+
+from transcription_store import TranscriptionStore
+
+
+def make_record(text, session_id=None, service='browser_speech_recognition'):
+    return {
+        'timestamp': '2024-01-01T00:00:00',
+        'session_id': session_id,
+        'service': service,
+        'transcription': text,
+        'word_count': len(text.split()),
+        'character_count': len(text),
+    }
+
+
+def test_session_lookup():
+    """Records come back per session, oldest first, without unset columns"""
+    print("🧪 Testing session lookup...")
+    with tempfile.TemporaryDirectory() as directory:
+        store = TranscriptionStore(os.path.join(directory, 'store.db'))
+        store.add(make_record('first', 'a'))
+        store.add(make_record('other', 'b'))
+        store.add(make_record('second', 'a'))
+        store.add(make_record('from audio', service='speechbrain'))
+
+        texts = [record['transcription'] for record in store.by_session('a')]
+        if texts != ['first', 'second']:
+            print(f"❌ Unexpected session records: {texts}")
+            return False
+        if 'session_id' in store.all()[-1]:
+            print("❌ Unset column returned")
+            return False
+        print(f"✅ Session a: {texts}")
+        return True
+
+
+def test_persists_and_clears():
+    """Records survive reopening the database and are removed by clear()"""
+    print("🧪 Testing persistence...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'store.db')
+        TranscriptionStore(path).add(make_record('kept', 'a'))
+
+        store = TranscriptionStore(path)
+        if store.count() != 1:
+            print("❌ Record lost on reopen")
+            return False
+        if store.clear() != 1 or store.count() != 0:
+            print("❌ Store not cleared")
+            return False
+        print("✅ Persisted and cleared")
+        return True
+
+
+def test_pagination():
+    """Pages follow the cursor to the end; projections and streams return only the asked-for columns"""
+    print("🧪 Testing pagination...")
+    with tempfile.TemporaryDirectory() as directory:
+        store = TranscriptionStore(os.path.join(directory, 'store.db'))
+        for index in range(7):
+            store.add(make_record(f'note {index}', 'a'))
+
+        pages, after = [], None
+        while True:
+            records, after = store.page(3, after, fields=['word_count'])
+            pages.append([record['id'] for record in records])
+            if after is None:
+                break
+        if pages != [[1, 2, 3], [4, 5, 6], [7]] or set(records[0]) != {'id', 'word_count'}:
+            print(f"❌ Unexpected pages: {pages}")
+            return False
+
+        streamed = [record['id'] for record in store.iter_records(after=2, fields=['service'], limit=4)]
+        if streamed != [3, 4, 5, 6]:
+            print(f"❌ Unexpected stream: {streamed}")
+            return False
+        try:
+            store.page(3, fields=['password'])
+            print("❌ Unknown field accepted")
+            return False
+        except ValueError:
+            pass
+        print(f"✅ Pages: {pages}")
+        return True
+
+
+def test_forked_worker():
+    """A child forked after the store was opened uses its own SQLite connection"""
+    print("🧪 Testing forked workers...")
+    with tempfile.TemporaryDirectory() as directory:
+        store = TranscriptionStore(os.path.join(directory, 'store.db'))
+        store.add(make_record('from the parent', 'a'))
+        parent_connection = store._connection()
+        pid = os.fork()
+        if pid == 0:
+            ok = store._connection() is not parent_connection and store.add(make_record('from the child', 'a'))
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        texts = [record['transcription'] for record in store.by_session('a')]
+        if os.waitstatus_to_exitcode(status) != 0 or texts != ['from the parent', 'from the child']:
+            print(f"❌ Child reused the parent's connection or lost its write: {texts}")
+            return False
+        print(f"✅ Parent and child both wrote: {texts}")
+        return True
+
+
+if __name__ == "__main__":
+    test_session_lookup()
+    test_persists_and_clears()
+    test_pagination()
+    test_forked_worker()
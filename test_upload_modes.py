@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify /transcribe-audio accepts JSON, multipart and raw uploads
+"""
+
+import base64
+import math
+import struct
+import wave
+import io
+import requests
+
+SERVER_URL = 'http://localhost:5000'
+
+
+def create_test_wav_bytes():
+    """Create a 2 second 440 Hz test tone as WAV bytes"""
+    sample_rate = 16000
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        for i in range(sample_rate * 2):
+            sample = math.sin(2 * math.pi * 440 * i / sample_rate)
+            wav_file.writeframes(struct.pack('<h', int(sample * 32767)))
+    return buffer.getvalue()
+
+
+def check_response(mode, response, expected_size):
+    """Print the result of one upload mode"""
+    try:
+        data = response.json()
+    except ValueError:
+        print(f"❌ {mode}: non-JSON response ({response.status_code})")
+        return False
+
+    # A tone has no speech, so a transcription error is fine as long as the
+    # upload itself was accepted (anything but 400/413)
+    if response.status_code in (400, 413):
+        print(f"❌ {mode}: upload rejected - {data.get('message')}")
+        return False
+
+    if data.get('status') == 'success' and data.get('audio_size') != expected_size:
+        print(f"❌ {mode}: audio_size {data.get('audio_size')} != {expected_size}")
+        return False
+
+    print(f"✅ {mode}: upload accepted ({response.status_code}, {data.get('status')})")
+    return True
+
+
+def test_upload_modes():
+    """Send the same clip in all three upload modes"""
+    print("🧪 Testing /transcribe-audio upload modes...")
+
+    audio_bytes = create_test_wav_bytes()
+
+    try:
+        results = {}
+
+        response = requests.post(f'{SERVER_URL}/transcribe-audio', json={
+            'audio_data': base64.b64encode(audio_bytes).decode('utf-8'),
+            'audio_format': 'wav',
+            'service': 'speechbrain'
+        }, timeout=120)
+        results['json'] = check_response('JSON base64', response, len(audio_bytes))
+
+        response = requests.post(
+            f'{SERVER_URL}/transcribe-audio',
+            files={'audio': ('test_audio.wav', audio_bytes, 'audio/wav')},
+            data={'service': 'speechbrain'},
+            timeout=120
+        )
+        results['multipart'] = check_response('multipart', response, len(audio_bytes))
+
+        response = requests.post(
+            f'{SERVER_URL}/transcribe-audio?audio_format=wav&service=speechbrain',
+            data=audio_bytes,
+            headers={'Content-Type': 'application/octet-stream'},
+            timeout=120
+        )
+        results['raw'] = check_response('raw octet-stream', response, len(audio_bytes))
+
+        return all(results.values())
+
+    except requests.exceptions.ConnectionError:
+        print("❌ Could not connect to server. Is it running?")
+        return False
+    except Exception as e:
+        print(f"❌ Upload mode test failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    test_upload_modes()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for chunked upload sessions (offline)
+"""
+
+import os
+import threading
+import time
+
+from upload_sessions import UploadSessionRegistry
+
+
+def test_expiry_waits_for_writers():
+    """An idle session with a chunk being written is not torn down underneath it"""
+    print("🧪 Testing upload session expiry...")
+    registry = UploadSessionRegistry(session_timeout=0.1)
+    registry.ffmpeg_path = None  # spool only, no converter
+    busy = registry.create({'audio_format': 'wav'})
+    idle = registry.create({'audio_format': 'wav'})
+    busy.append_chunk(0, b'RIFF')
+    time.sleep(0.15)
+
+    def slow_append():
+        time.sleep(0.1)
+        busy.lock.release()
+
+    busy.lock.acquire()  # a slow append in progress
+    writer = threading.Thread(target=slow_append)
+    writer.start()
+    registry.expire_idle()
+    if registry.get(busy.upload_id) is not busy or not os.path.exists(busy.spool_path):
+        print("❌ Session expired while a chunk was being written")
+        return False
+    if registry.get(idle.upload_id) is not None or not idle.discarded:
+        print("❌ Idle session not expired")
+        return False
+    writer.join()
+
+    time.sleep(0.15)
+    registry.expire_idle()
+    try:
+        busy.append_chunk(1, b'late')
+        print("❌ Chunk written to a discarded session")
+        return False
+    except LookupError:
+        pass
+    if os.path.exists(busy.spool_path):
+        print("❌ Spool file left behind")
+        return False
+    print("✅ Busy session kept until its write finished, then expired")
+    return True
+
+
+if __name__ == "__main__":
+    test_expiry_waits_for_writers()
@@ -0,0 +1,103 @@
+"""
+Session transcripts saved as deltas
+
+The browser client saves the whole transcript so far every
+AUTO_SAVE_INTERVAL seconds, so storing each save as a new record made
+storage grow quadratically with the length of a session. A save can instead
+update the session's document: a delta puts text at a character offset,
+replacing whatever followed it, and an upsert sends the full text and is
+turned into the delta that produces it. Only the delta is stored (its
+record's text_offset says where it goes); the document is rebuilt from the
+session's records, oldest first, when it is read.
+
+A save reads the document before writing to it, so saves to one session
+are serialised by SessionLocks; saves to different sessions run in parallel.
+"""
+
+import threading
+from contextlib import contextmanager
+
+SAVE_MODES = ('append', 'upsert', 'delta')
+
+
+def rebuild_document(records):
+    """
+    The document built by the delta records of a session (oldest first)
+
+    Records without a text_offset are standalone transcriptions and are not
+    part of it. Returns (text, updates); text is None when there are no
+    deltas.
+    """
+    parts, length, updates = [], 0, 0
+    for record in records:
+        offset = record.get('text_offset')
+        if offset is None:
+            continue
+        # Cut back to the offset without copying the text in front of it
+        while parts and length - len(parts[-1]) >= offset:
+            length -= len(parts.pop())
+        if length > offset:
+            parts[-1] = parts[-1][:len(parts[-1]) - (length - offset)]
+            length = offset
+        delta = record.get('transcription', '')
+        parts.append(delta)
+        length += len(delta)
+        updates += 1
+    return (''.join(parts) if updates else None), updates
+
+
+def common_prefix_length(first, second):
+    """Length of the common prefix of two strings"""
+    if second.startswith(first):
+        return len(first)
+    low, high = 0, min(len(first), len(second))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if first[:middle] == second[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def upsert_delta(document, text):
+    """(offset, delta) that turns document into text, or None if they are already equal"""
+    if text == document:
+        return None
+    offset = common_prefix_length(document, text)
+    return offset, text[offset:]
+
+
+def document_summary(text, updates):
+    return {
+        'text': text,
+        'word_count': len(text.split()),
+        'character_count': len(text),
+        'updates': updates,
+    }
+
+
+class SessionLocks:
+    """A lock per session id, kept only while someone holds or waits for it"""
+
+    def __init__(self):
+        self.guard = threading.Lock()
+        self.locks = {}  # session_id -> [lock, holders and waiters]
+
+    @contextmanager
+    def hold(self, session_id):
+        with self.guard:
+            entry = self.locks.setdefault(session_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self.guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.locks[session_id]
+
+    def __len__(self):
+        with self.guard:
+            return len(self.locks)
@@ -0,0 +1,214 @@
+"""
+Content-addressed cache of transcription results
+
+Results are keyed by a hash of the normalised audio plus the requested
+service, so re-sending the same recording (e.g. the app's retry buttons)
+doesn't pay for Whisper or SpeechBrain again. There are two tiers: an
+in-memory LRU in front of JSON files on disk. Entries expire after a TTL,
+and the disk tier is trimmed oldest-first to a byte budget. Concurrent
+requests for the same key wait on the first one's inference instead of
+running their own.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(audio_hash, service, sample_rate):
+    """Key for a transcription of the given audio with the given options"""
+    return hashlib.sha256(f'{audio_hash}|{service}|{sample_rate}'.encode('utf-8')).hexdigest()
+
+
+class TranscriptionCache:
+    """Two-tier (memory LRU + disk) transcription cache with request coalescing"""
+
+    def __init__(self, cache_dir, max_memory_entries, max_disk_bytes, ttl):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()  # key -> (created, value)
+        self.disk_index = OrderedDict()  # key -> (created, size), oldest first
+        self.disk_bytes = 0
+        self.in_flight = {}  # key -> Future
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_disk_index()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def _load_disk_index(self):
+        """Index existing cache files (oldest first) so eviction needs no scans"""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-5], stat.st_size))
+
+        for created, key, size in sorted(entries):
+            self.disk_index[key] = (created, size)
+            self.disk_bytes += size
+
+        if entries:
+            logger.info(f"💾 Transcription cache: {len(entries)} entries on disk ({self.disk_bytes} bytes)")
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl:
+                    self.memory.move_to_end(key)
+                    return value
+                del self.memory[key]
+
+            disk_entry = self.disk_index.get(key)
+            if disk_entry is None:
+                return None
+            if now - disk_entry[0] > self.ttl:
+                self._remove_disk_entry(key)
+                return None
+
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Unreadable cache entry {key}: {e}")
+            with self.lock:
+                self._remove_disk_entry(key)
+            return None
+
+        # Promote to the memory tier
+        with self.lock:
+            self._remember(key, stored['created'], stored['value'])
+        return stored['value']
+
+    def put(self, key, value):
+        """Store a value in both tiers"""
+        created = time.time()
+        data = json.dumps({'created': created, 'value': value}, ensure_ascii=False).encode('utf-8')
+        path = self._path(key)
+        temp_path = f'{path}.tmp'
+
+        with self.lock:
+            self._remember(key, created, value)
+
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write cache entry {key}: {e}")
+            return
+
+        with self.lock:
+            if key in self.disk_index:
+                self.disk_bytes -= self.disk_index.pop(key)[1]
+            self.disk_index[key] = (created, len(data))
+            self.disk_bytes += len(data)
+            self._evict_disk()
+
+    def get_or_compute(self, key, compute, timeout=None):
+        """
+        Return (value, status) where status is 'hit', 'coalesced' or 'miss'
+
+        On a miss `compute()` runs once; concurrent callers with the same key
+        wait for that result, for at most timeout seconds
+        (concurrent.futures.TimeoutError). Exceptions are passed to every
+        waiter and nothing is cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            with self.lock:
+                self.hits += 1
+            logger.debug("⚡ Transcription cache hit: %s", key[:12])
+            return value, 'hit'
+
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = Future()
+                self.in_flight[key] = future
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            logger.debug("🔗 Waiting for in-flight transcription of %s", key[:12])
+            return future.result(timeout=timeout), 'coalesced'
+
+        try:
+            value = compute()
+            self.put(key, value)
+            future.set_result(value)
+            return value, 'miss'
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+
+    def _remember(self, key, created, value):
+        self.memory[key] = (created, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def _evict_disk(self):
+        now = time.time()
+        while self.disk_index:
+            key, (created, _) = next(iter(self.disk_index.items()))
+            if self.disk_bytes <= self.max_disk_bytes and now - created <= self.ttl:
+                break
+            self._remove_disk_entry(key)
+
+    def _remove_disk_entry(self, key):
+        created_size = self.disk_index.pop(key, None)
+        if created_size is not None:
+            self.disk_bytes -= created_size[1]
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"⚠️ Could not remove cache entry {key}: {e}")
+
+    def clear(self):
+        """Drop every cached transcription"""
+        with self.lock:
+            self.memory.clear()
+            for key in list(self.disk_index):
+                self._remove_disk_entry(key)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+                'memory_entries': len(self.memory),
+                'disk_entries': len(self.disk_index),
+                'disk_bytes': self.disk_bytes,
+                'in_flight': len(self.in_flight),
+            }
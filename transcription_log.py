@@ -0,0 +1,460 @@
+"""
+Append-only, segmented log of transcription records
+
+Every stored transcription used to get its own `YYYYMMDD_HHMMSS_*.txt` file:
+names collided within a second and the flat directory kept growing. Records
+are now appended as JSON lines to segment files (`segment-00000001.jsonl`,
+...), and a new segment is started once the current one reaches
+segment_bytes.
+
+Each line starts with `{"id": N`. Ids are reserved from a counter kept in the
+lock file, under a file lock, so worker processes sharing the directory share
+one sequence; a record can be written some time after its id was reserved,
+so lines may arrive slightly out of order and an id whose writer died leaves
+a gap. The offset index is three flat arrays addressed by `id - first_id`
+(gaps have length 0), so a lookup by id is O(1) and costs ~20 bytes per
+record. When a segment is sealed its index is written next to it (`.idx`),
+so startup only has to scan the active segment; a line left half-written by
+a crash is cut off. Lines other workers appended are picked up by following
+the tail of the active segment.
+"""
+
+import array
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from fork_hooks import after_fork_in_child
+
+# Cross-process locking (not available on Windows, where only threads are coordinated)
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PATTERN = re.compile(r'^segment-(\d{8})\.jsonl$')
+ID_PREFIX = re.compile(rb'\{"id": (\d+)')
+CLEAR_SUFFIX = b', "op": "clear"}'
+
+# When appended lines are forced to disk
+FSYNC_POLICIES = ('none', 'batch', 'record')
+
+
+def encode_entry(entry):
+    """One log line, with the id first so the index can find it without parsing"""
+    entry = {'id': entry['id'], **{key: value for key, value in entry.items() if key != 'id'}}
+    return (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+class TranscriptionLog:
+    """Segmented JSONL log with shared id reservation and an O(1) offset index"""
+
+    def __init__(self, directory, segment_bytes):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self.lock_fd = os.open(os.path.join(directory, 'log.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        self.write_fd = None
+        self.write_segment = None
+        after_fork_in_child(self._after_fork)
+
+        start = time.time()
+        with self.lock, self._file_lock():
+            self._rebuild_index(repair=True)
+        logger.info(f"📜 Transcription log: {self.entry_count} entries in {len(self._segment_numbers())} "
+                    f"segments, indexed in {time.time() - start:.3f}s")
+
+    def _after_fork(self):
+        """
+        Give a forked child its own lock file description
+
+        flock() locks belong to the open file description, which a child
+        shares with its parent, so without this preforked workers would not
+        exclude each other and could reserve the same ids.
+        """
+        self.lock = threading.RLock()
+        os.close(self.lock_fd)
+        self.lock_fd = os.open(os.path.join(self.directory, 'log.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        if self.write_fd is not None:
+            os.close(self.write_fd)
+        self.write_fd = None
+        self.write_segment = None
+
+    def _path(self, segment, suffix='.jsonl'):
+        return os.path.join(self.directory, f'segment-{segment:08d}{suffix}')
+
+    def _segment_numbers(self):
+        return sorted(int(match.group(1)) for match in map(SEGMENT_PATTERN.match, os.listdir(self.directory)) if match)
+
+    @contextmanager
+    def _file_lock(self):
+        if FCNTL_AVAILABLE:
+            fcntl.flock(self.lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+
+    def _read_counter(self):
+        """Next id to reserve, shared through the lock file (0 if never written)"""
+        return int.from_bytes(os.pread(self.lock_fd, 8, 0).ljust(8, b'\0'), 'little')
+
+    def _write_counter(self, next_id):
+        os.pwrite(self.lock_fd, next_id.to_bytes(8, 'little'), 0)
+
+    # Index
+
+    def _reset_index(self):
+        self.first_id = None
+        self.next_id = 1  # one past the highest id indexed
+        self.entry_count = 0
+        self.cleared_id = None
+        self.segments = array.array('I')
+        self.offsets = array.array('Q')
+        self.lengths = array.array('I')
+        self.segment_first_ids = {}  # segment -> lowest id written to it
+        self._start_segment(1)
+
+    def _start_segment(self, segment):
+        self.active_segment = segment
+        self.active_end = 0  # bytes of the active segment already indexed
+        self.active_ids = array.array('Q')
+
+    def _rebuild_index(self, repair=False):
+        """Index every segment: sealed ones from their .idx files, the rest by scanning"""
+        self._reset_index()
+        numbers = self._segment_numbers()
+        for position, segment in enumerate(numbers):
+            self._start_segment(segment)
+            sealed = position < len(numbers) - 1
+            if not (sealed and self._load_segment_index(segment)):
+                self._scan(segment, repair)
+
+    def _pad(self, count, front=False):
+        """Add count empty slots (ids reserved but not written) to the index"""
+        for column, typecode in ((self.segments, 'I'), (self.offsets, 'Q'), (self.lengths, 'I')):
+            padding = array.array(typecode, [0]) * count
+            if front:
+                column[0:0] = padding
+            else:
+                column.extend(padding)
+
+    def _add_entry(self, entry_id, segment, offset, length):
+        if self.cleared_id is not None and entry_id < self.cleared_id:
+            # Reserved before a clear, written after it
+            return
+        if self.first_id is None:
+            self.first_id = entry_id
+        elif entry_id < self.first_id:
+            self._pad(self.first_id - entry_id, front=True)
+            self.first_id = entry_id
+
+        index = entry_id - self.first_id
+        if index >= len(self.offsets):
+            self._pad(index - len(self.offsets))
+            self.segments.append(segment)
+            self.offsets.append(offset)
+            self.lengths.append(length)
+        elif self.lengths[index]:
+            logger.error(f"❌ Transcription log entry {entry_id} written twice (segment {segment}), skipped")
+            return
+        else:
+            self.segments[index] = segment
+            self.offsets[index] = offset
+            self.lengths[index] = length
+
+        self.entry_count += 1
+        self.next_id = max(self.next_id, entry_id + 1)
+        if entry_id < self.segment_first_ids.get(segment, entry_id + 1):
+            self.segment_first_ids[segment] = entry_id
+        if segment == self.active_segment:
+            self.active_ids.append(entry_id)
+
+    def _scan(self, segment, repair=False):
+        """Index complete lines of a segment from active_end on; with repair, cut off a torn last line"""
+        try:
+            with open(self._path(segment), 'rb') as f:
+                f.seek(self.active_end)
+                data = f.read()
+        except FileNotFoundError:
+            return
+
+        position = 0
+        while position < len(data):
+            end = data.find(b'\n', position)
+            if end < 0:
+                break
+            match = ID_PREFIX.match(data, position)
+            if match:
+                entry_id = int(match.group(1))
+                if data.startswith(CLEAR_SUFFIX, match.end()):
+                    self.cleared_id = entry_id
+                self._add_entry(entry_id, segment, self.active_end + position, end + 1 - position)
+            else:
+                logger.error(f"❌ Unreadable line at {self.active_end + position} in log segment {segment}, skipped")
+            position = end + 1
+        self.active_end += position
+
+        if position < len(data) and repair:
+            logger.warning(f"⚠️ Cutting {len(data) - position} bytes of a torn write off log segment {segment}")
+            os.truncate(self._path(segment), self.active_end)
+
+    def _load_segment_index(self, segment):
+        """Index a sealed segment from its .idx file; False if there isn't a usable one"""
+        try:
+            with open(self._path(segment, '.idx'), 'rb') as f:
+                header = array.array('Q')
+                header.fromfile(f, 2)
+                count, cleared_id = header
+                if os.fstat(f.fileno()).st_size != 16 + count * 20:
+                    return False
+                ids = array.array('Q')
+                ids.fromfile(f, count)
+                offsets = array.array('Q')
+                offsets.fromfile(f, count)
+                lengths = array.array('I')
+                lengths.fromfile(f, count)
+        except (OSError, EOFError):
+            return False
+
+        if cleared_id:
+            self.cleared_id = cleared_id
+        in_order = (count and ids == array.array('Q', range(ids[0], ids[0] + count))
+                    and (self.first_id is None or ids[0] == self.first_id + len(self.offsets))
+                    and (self.cleared_id is None or ids[0] >= self.cleared_id))
+        if in_order:
+            # The usual case: append the whole segment at once
+            if self.first_id is None:
+                self.first_id = ids[0]
+            self.segments.extend(array.array('I', [segment]) * count)
+            self.offsets.extend(offsets)
+            self.lengths.extend(lengths)
+            self.entry_count += count
+            self.next_id = ids[-1] + 1
+            self.segment_first_ids[segment] = ids[0]
+        else:
+            for entry_id, offset, length in zip(ids, offsets, lengths):
+                self._add_entry(entry_id, segment, offset, length)
+        self.active_end = os.path.getsize(self._path(segment))
+        return True
+
+    def _write_segment_index(self, segment):
+        """Save the offsets of the active segment, which is being sealed"""
+        ids = self.active_ids
+        positions = [entry_id - self.first_id for entry_id in ids]
+        cleared_id = self.cleared_id if self.cleared_id is not None and self.cleared_id in ids else 0
+        temp_path = self._path(segment, '.idx.tmp')
+        with open(temp_path, 'wb') as f:
+            array.array('Q', [len(ids), cleared_id]).tofile(f)
+            ids.tofile(f)
+            array.array('Q', (self.offsets[position] for position in positions)).tofile(f)
+            array.array('I', (self.lengths[position] for position in positions)).tofile(f)
+        os.replace(temp_path, self._path(segment, '.idx'))
+
+    def _catch_up(self, repair=False):
+        """Index lines (and segments) other processes appended since we last looked"""
+        while True:
+            try:
+                size = os.path.getsize(self._path(self.active_segment))
+            except FileNotFoundError:
+                size = 0
+                if self._segment_numbers() and self._segment_numbers()[0] > self.active_segment:
+                    # Another process cleared the log
+                    self._rebuild_index(repair)
+                    return
+            if size > self.active_end:
+                self._scan(self.active_segment, repair)
+            if not os.path.exists(self._path(self.active_segment + 1)):
+                return
+            if self.segments and not os.path.exists(self._path(self.segments[0])):
+                # Another process cleared the log after we last looked
+                self._rebuild_index(repair)
+                return
+            self._start_segment(self.active_segment + 1)
+
+    def _locate(self, entry_id):
+        if self.first_id is None:
+            return None
+        index = entry_id - self.first_id
+        if 0 <= index < len(self.offsets) and self.lengths[index]:
+            return self.segments[index], self.offsets[index], self.lengths[index]
+        return None
+
+    # Writing
+
+    def _write(self, data):
+        if self.write_segment != self.active_segment:
+            if self.write_fd is not None:
+                os.close(self.write_fd)
+            self.write_fd = os.open(self._path(self.active_segment), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self.write_segment = self.active_segment
+        os.write(self.write_fd, data)
+
+    def _write_lines(self, lines, fsync):
+        """Write (entry_id, line) pairs to the active segment with one write, then index them"""
+        self._write(b''.join(line for _, line in lines))
+        if fsync:
+            os.fsync(self.write_fd)
+        for entry_id, line in lines:
+            self._add_entry(entry_id, self.active_segment, self.active_end, len(line))
+            self.active_end += len(line)
+
+    def _rotate(self):
+        self._write_segment_index(self.active_segment)
+        self._start_segment(self.active_segment + 1)
+        logger.info(f"📜 Transcription log rotated to segment {self.active_segment}")
+
+    def reserve(self, count=1):
+        """Reserve count consecutive ids for records about to be appended; returns the first"""
+        with self.lock, self._file_lock():
+            next_id = self._read_counter()
+            if not next_id:
+                self._catch_up(repair=True)
+                next_id = self.next_id
+            self._write_counter(max(next_id, self.next_id) + count)
+            return max(next_id, self.next_id)
+
+    def append_many(self, entries, fsync='none'):
+        """
+        Append entries carrying reserved ids
+
+        fsync is one of FSYNC_POLICIES: 'batch' syncs once after the entries
+        are written, 'record' after each of them.
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {', '.join(FSYNC_POLICIES)}")
+        with self.lock, self._file_lock():
+            self._catch_up(repair=True)
+            lines, size = [], self.active_end
+            for entry in entries:
+                line = encode_entry(entry)
+                if size and size + len(line) > self.segment_bytes:
+                    if lines:
+                        self._write_lines(lines, fsync != 'none')
+                        lines = []
+                    self._rotate()
+                    size = 0
+                lines.append((entry['id'], line))
+                size += len(line)
+                if fsync == 'record':
+                    self._write_lines(lines, True)
+                    lines = []
+            if lines:
+                self._write_lines(lines, fsync == 'batch')
+
+    def append(self, record, fsync='none'):
+        """Append a record (its 'id' is ignored) and return the id it was given"""
+        entry_id = self.reserve()
+        self.append_many([{**record, 'id': entry_id}], fsync)
+        return entry_id
+
+    def start_after(self, entry_id):
+        """Make an empty log hand out ids after entry_id (records stored before the log existed)"""
+        with self.lock, self._file_lock():
+            self._catch_up(repair=True)
+            if self.first_id is None and entry_id and self._read_counter() <= entry_id:
+                self._write_counter(entry_id + 1)
+
+    def clear(self):
+        """
+        Drop every entry
+
+        A clear marker is written to a fresh segment and the older segments
+        are deleted. Ids carry on from where they were, so the marker tells
+        recovery which stored records predate the clear; records reserved
+        before it and written after it are ignored.
+        """
+        with self.lock, self._file_lock():
+            self._catch_up(repair=True)
+            marker_id = max(self._read_counter(), self.next_id)
+            self._write_counter(marker_id + 1)
+            old_segments = self._segment_numbers()
+            if self.active_end:
+                self._rotate()
+            self._write(encode_entry({'id': marker_id, 'op': 'clear'}))
+            for segment in old_segments:
+                if segment == self.active_segment:
+                    continue
+                for suffix in ('.jsonl', '.idx'):
+                    try:
+                        os.unlink(self._path(segment, suffix))
+                    except FileNotFoundError:
+                        pass
+            self._rebuild_index()
+
+    # Reading
+
+    def get(self, entry_id):
+        """The entry with this id, or None"""
+        with self.lock:
+            location = self._locate(entry_id)
+            if location is None:
+                self._catch_up()
+                location = self._locate(entry_id)
+        if location is None:
+            return None
+
+        segment, offset, length = location
+        try:
+            with open(self._path(segment), 'rb') as f:
+                f.seek(offset)
+                return json.loads(f.read(length))
+        except FileNotFoundError:
+            return None
+
+    def entries(self, start_id=None):
+        """Yield entries with id >= start_id in id order, reading each segment once"""
+        with self.lock:
+            self._catch_up()
+            if self.first_id is None:
+                return
+            start = max((start_id or self.first_id) - self.first_id, 0)
+            locations = [location for location in zip(self.segments[start:], self.offsets[start:],
+                                                       self.lengths[start:]) if location[2]]
+
+        loaded = {}
+        for segment, offset, length in locations:
+            if segment not in loaded:
+                # Lines are only out of order around a rotation, so two segments are enough
+                for old in [number for number in loaded if number < segment - 1]:
+                    del loaded[old]
+                try:
+                    with open(self._path(segment), 'rb') as f:
+                        loaded[segment] = f.read()
+                except FileNotFoundError:
+                    return
+            yield json.loads(loaded[segment][offset:offset + length])
+
+    def cleared_before(self):
+        """Id of the clear marker at the start of the log (everything older was cleared), or None"""
+        with self.lock:
+            return self.cleared_id
+
+    def recovery_start_id(self):
+        """Lowest id in the active segment and the one before it: older entries are long committed elsewhere"""
+        with self.lock:
+            if self.first_id is None:
+                return None
+            recent = [self.segment_first_ids[segment] for segment in (self.active_segment - 1, self.active_segment)
+                      if segment in self.segment_first_ids]
+            return min(recent) if recent else self.first_id
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': self.entry_count,
+                'first_id': self.first_id,
+                'next_id': self.next_id,
+                'active_segment': self.active_segment,
+                'active_segment_bytes': self.active_end,
+                'segment_bytes': self.segment_bytes,
+            }
@@ -0,0 +1,242 @@
+"""
+Usage rollups kept next to the stored transcriptions
+
+Operators used to work out usage by downloading every transcription and
+summing word counts, sizes and services on the client. The store now keeps
+running totals per service, per session, per hour and per day (UTC, by the
+time a record was stored) in a `rollups` table, plus per-service histograms
+of engine latency. They are updated in the transaction that inserts the
+records, so every worker process sees the same figures, and reading them
+touches a bounded number of rows however many transcriptions are stored.
+
+A session edited through delta saves (see transcript_documents) counts as
+one transcription: each save adds the change in the document's word and
+character counts, and only the first one adds to the transcription count.
+"""
+
+import bisect
+import time
+from collections import defaultdict
+
+from transcript_documents import rebuild_document
+
+# Upper bounds (seconds) of the engine latency histogram buckets; the last bucket takes the rest
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 30, 60)
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    transcriptions INTEGER NOT NULL,
+    words INTEGER NOT NULL,
+    characters INTEGER NOT NULL,
+    audio_bytes INTEGER NOT NULL,
+    engine_runs INTEGER NOT NULL,
+    fallbacks INTEGER NOT NULL,
+    engine_seconds REAL NOT NULL,
+    first_at REAL,
+    last_at REAL,
+    PRIMARY KEY (dimension, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS latency_histogram (
+    service TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (service, bucket)
+) WITHOUT ROWID;
+"""
+
+# Counters of a rollup row, in table order
+COUNTERS = ('transcriptions', 'words', 'characters', 'audio_bytes', 'engine_runs', 'fallbacks', 'engine_seconds')
+
+UPSERT_ROLLUP = f"""
+INSERT INTO rollups (dimension, key, {', '.join(COUNTERS)}, first_at, last_at)
+VALUES (?, ?, {', '.join('?' for _ in COUNTERS)}, ?, ?)
+ON CONFLICT (dimension, key) DO UPDATE SET
+    {', '.join(f'{counter} = {counter} + excluded.{counter}' for counter in COUNTERS)},
+    first_at = MIN(first_at, excluded.first_at),
+    last_at = MAX(last_at, excluded.last_at)
+"""
+
+UPSERT_HISTOGRAM = """
+INSERT INTO latency_histogram (service, bucket, count) VALUES (?, ?, ?)
+ON CONFLICT (service, bucket) DO UPDATE SET count = count + excluded.count
+"""
+
+HOUR_FORMAT = '%Y-%m-%dT%H'
+DAY_FORMAT = '%Y-%m-%d'
+
+
+def rollup_keys(record):
+    """The (dimension, key) rows a record counts towards"""
+    created = time.gmtime(record['created_at'])
+    keys = [('all', ''), ('service', record['service']),
+            ('hour', time.strftime(HOUR_FORMAT, created)), ('day', time.strftime(DAY_FORMAT, created))]
+    if record.get('session_id') is not None:
+        keys.append(('session', record['session_id']))
+    return keys
+
+
+def record_values(record):
+    """Counter values (in COUNTERS order) a standalone record adds"""
+    engine_time = record.get('engine_time')
+    fallback = record.get('fallback')
+    return [1, record.get('word_count') or 0, record.get('character_count') or 0, record.get('audio_size') or 0,
+            int(fallback is not None), int(bool(fallback)), engine_time or 0.0]
+
+
+def document_values(deltas, document, counted):
+    """
+    (record, values) for a session's delta records (oldest first)
+
+    `document` is the session's text before them and `counted` whether the
+    session already counts as a transcription.
+    """
+    entries = []
+    for record in deltas:
+        before = document
+        document = document[:record['text_offset']] + (record.get('transcription') or '')
+        values = record_values(record)
+        values[0] = int(not counted)
+        values[1] = len(document.split()) - len(before.split())
+        values[2] = len(document) - len(before)
+        counted = True
+        entries.append((record, values))
+    return entries
+
+
+def upsert_rollups(connection, entries):
+    """Add (record, values) entries to the rollups and engine latencies to the histograms"""
+    rows = {}
+    histogram = defaultdict(int)
+    for record, values in entries:
+        for key in rollup_keys(record):
+            row = rows.get(key)
+            if row is None:
+                rows[key] = [*values, record['created_at'], record['created_at']]
+            else:
+                for index, value in enumerate(values):
+                    row[index] += value
+                row[-2] = min(row[-2], record['created_at'])
+                row[-1] = max(row[-1], record['created_at'])
+        if record.get('engine_time') is not None:
+            histogram[record['service'], bisect.bisect_left(LATENCY_BUCKETS, record['engine_time'])] += 1
+
+    connection.executemany(UPSERT_ROLLUP, ([*key, *row] for key, row in rows.items()))
+    connection.executemany(UPSERT_HISTOGRAM, ([*key, count] for key, count in histogram.items()))
+
+
+def apply_rollups(connection, records):
+    """Add newly inserted records (with their ids) to the rollups, inside the caller's transaction"""
+    entries = []
+    sessions = defaultdict(list)
+    for record in records:
+        if record.get('text_offset') is not None and record.get('session_id') is not None:
+            sessions[record['session_id']].append(record)
+        else:
+            entries.append((record, record_values(record)))
+    for session_id, deltas in sessions.items():
+        deltas.sort(key=lambda record: record['id'])
+        earlier = [dict(row) for row in connection.execute(
+            'SELECT transcription, text_offset FROM transcriptions '
+            'WHERE session_id = ? AND text_offset IS NOT NULL AND id < ? ORDER BY id',
+            (session_id, deltas[0]['id'])
+        )]
+        document, _ = rebuild_document(earlier)
+        entries.extend(document_values(deltas, document or '', bool(earlier)))
+    upsert_rollups(connection, entries)
+
+
+def rebuild_rollups(connection):
+    """Recompute every rollup from the transcriptions table, inside the caller's transaction"""
+    # Standalone records are summed in SQL; delta records are replayed per session below
+    connection.execute('DELETE FROM rollups')
+    connection.execute('DELETE FROM latency_histogram')
+    sums = (
+        "COUNT(*), SUM(word_count), SUM(character_count), COALESCE(SUM(audio_size), 0), COUNT(fallback), "
+        "COALESCE(SUM(fallback), 0), COALESCE(SUM(engine_time), 0), MIN(created_at), MAX(created_at)"
+    )
+    for dimension, key in (
+        ('service', 'service'),
+        ('session', 'session_id'),
+        ('hour', f"strftime('{HOUR_FORMAT}', created_at, 'unixepoch')"),
+        ('day', f"strftime('{DAY_FORMAT}', created_at, 'unixepoch')"),
+    ):
+        connection.execute(
+            f"INSERT INTO rollups SELECT '{dimension}', {key}, {sums} FROM transcriptions "
+            f"WHERE {key} IS NOT NULL AND text_offset IS NULL GROUP BY {key}"
+        )
+    connection.execute(
+        f"INSERT INTO rollups SELECT 'all', '', {sums} FROM transcriptions "
+        f"WHERE text_offset IS NULL HAVING COUNT(*) > 0"
+    )
+
+    bucket = ' '.join(f'WHEN engine_time <= {bound} THEN {index}' for index, bound in enumerate(LATENCY_BUCKETS))
+    connection.execute(
+        f"INSERT INTO latency_histogram SELECT service, CASE {bucket} ELSE {len(LATENCY_BUCKETS)} END AS bucket, "
+        f"COUNT(*) FROM transcriptions WHERE engine_time IS NOT NULL AND text_offset IS NULL GROUP BY service, bucket"
+    )
+
+    sessions = defaultdict(list)
+    for row in connection.execute(
+        'SELECT * FROM transcriptions WHERE text_offset IS NOT NULL AND session_id IS NOT NULL ORDER BY id'
+    ):
+        sessions[row['session_id']].append(dict(row))
+    upsert_rollups(connection, [entry for deltas in sessions.values() for entry in document_values(deltas, '', False)])
+
+
+def summarise(row):
+    """API view of a rollup row; zeros for None (a period or store with nothing in it)"""
+    if row is None:
+        return {**{counter: 0 for counter in COUNTERS if counter != 'engine_seconds'},
+                'fallback_rate': None, 'engine_time_avg': None, 'first_at': None, 'last_at': None}
+    summary = {counter: row[counter] for counter in COUNTERS if counter != 'engine_seconds'}
+    summary['fallback_rate'] = round(row['fallbacks'] / row['engine_runs'], 4) if row['engine_runs'] else None
+    summary['engine_time_avg'] = round(row['engine_seconds'] / row['engine_runs'], 3) if row['engine_runs'] else None
+    summary['first_at'] = row['first_at']
+    summary['last_at'] = row['last_at']
+    return summary
+
+
+def read_rollups(connection, hours, days, session_id=None):
+    """
+    Totals, per-service figures with latency histograms, and optionally one session
+
+    'hours' and 'days' are the last `hours` calendar hours and `days`
+    calendar days (UTC, oldest first, the current one included), with zero
+    figures for the ones that had no transcriptions.
+    """
+    def rows(dimension):
+        return connection.execute('SELECT * FROM rollups WHERE dimension = ?', (dimension,)).fetchall()
+
+    def periods(dimension, count, seconds, key_format):
+        now = time.time()
+        keys = [time.strftime(key_format, time.gmtime(now - age * seconds)) for age in range(count - 1, -1, -1)]
+        found = {}
+        if keys:
+            found = {row['key']: row for row in connection.execute(
+                'SELECT * FROM rollups WHERE dimension = ? AND key >= ?', (dimension, keys[0])
+            )}
+        return [{dimension: key, **summarise(found.get(key))} for key in keys]
+
+    totals = rows('all')
+    services = {row['key']: summarise(row) for row in rows('service')}
+    for service in services.values():
+        if service['engine_runs']:
+            service['latency_histogram'] = [{'le': bound, 'count': 0} for bound in LATENCY_BUCKETS + (None,)]
+    for service, bucket, count in connection.execute('SELECT service, bucket, count FROM latency_histogram'):
+        if 'latency_histogram' in services.get(service, {}):
+            services[service]['latency_histogram'][bucket]['count'] = count
+
+    stats = {
+        'totals': summarise(totals[0] if totals else None),
+        'services': services,
+        'hours': periods('hour', hours, 3600, HOUR_FORMAT),
+        'days': periods('day', days, 86400, DAY_FORMAT),
+    }
+    if session_id is not None:
+        row = connection.execute(
+            "SELECT * FROM rollups WHERE dimension = 'session' AND key = ?", (session_id,)
+        ).fetchone()
+        stats['session'] = summarise(row) if row else None
+    return stats
@@ -0,0 +1,257 @@
+"""
+Persistent, indexed store of transcription records
+
+Transcriptions used to live in a module-level list: lost on restart, not
+shared between WSGI workers, and searched by scanning every record. They now
+go into a SQLite database in WAL mode, so readers don't block the writer and
+several worker processes can share one file. session_id, timestamp and
+service are indexed; a session lookup is an index range scan whose cost
+depends on the session's size, not the table's.
+
+Each thread gets its own connection. Inserts also update the usage rollups
+(transcription_rollups.py) in the same transaction.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from fork_hooks import after_fork_in_child
+from transcription_rollups import ROLLUP_SCHEMA, apply_rollups, read_rollups, rebuild_rollups
+
+logger = logging.getLogger(__name__)
+
+# Columns callers may set, in table order
+RECORD_FIELDS = (
+    'timestamp', 'session_id', 'service', 'transcription', 'word_count', 'character_count',
+    'audio_size', 'audio_format', 'confidence', 'transcription_file', 'text_offset', 'engine_time', 'fallback',
+)
+
+# Every column, as accepted by a fields projection
+RECORD_COLUMNS = ('id',) + RECORD_FIELDS + ('created_at',)
+
+# Rows fetched per query while streaming records
+STREAM_CHUNK_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcriptions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    session_id TEXT,
+    service TEXT NOT NULL,
+    transcription TEXT NOT NULL,
+    word_count INTEGER NOT NULL,
+    character_count INTEGER NOT NULL,
+    audio_size INTEGER,
+    audio_format TEXT,
+    confidence REAL,
+    transcription_file TEXT,
+    text_offset INTEGER,
+    engine_time REAL,
+    fallback INTEGER,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transcriptions_session ON transcriptions (session_id, id);
+CREATE INDEX IF NOT EXISTS idx_transcriptions_timestamp ON transcriptions (timestamp);
+CREATE INDEX IF NOT EXISTS idx_transcriptions_service ON transcriptions (service, id);
+"""
+
+# Columns added since the table was first created, added to older databases on open
+ADDED_COLUMNS = (
+    ('text_offset', 'INTEGER'),
+    ('engine_time', 'REAL'),
+    ('fallback', 'INTEGER'),
+)
+
+
+def row_to_record(row):
+    """Dict for a stored row, without the columns that were never set"""
+    return {key: row[key] for key in row.keys() if row[key] is not None}
+
+
+class TranscriptionStore:
+    """SQLite (WAL) table of transcriptions, indexed by session, time and service"""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        after_fork_in_child(self._after_fork)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as connection:
+            connection.executescript(SCHEMA)
+            existing = {row['name'] for row in connection.execute('PRAGMA table_info(transcriptions)')}
+            for column, column_type in ADDED_COLUMNS:
+                if column not in existing:
+                    connection.execute(f'ALTER TABLE transcriptions ADD COLUMN {column} {column_type}')
+            connection.executescript(ROLLUP_SCHEMA)
+            if (connection.execute('SELECT 1 FROM transcriptions LIMIT 1').fetchone()
+                    and not connection.execute("SELECT 1 FROM rollups WHERE dimension = 'all'").fetchone()):
+                # Records stored before rollups existed
+                rebuild_rollups(connection)
+        logger.info(f"🗄️ Transcription store: {self.count()} records in {path}")
+
+    def _after_fork(self):
+        """A forked child opens its own connections; SQLite ones must not be used or closed across a fork"""
+        self.inherited = self.local  # kept referenced so they are never closed here
+        self.local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            # Safe in WAL mode: a crash can lose the last commits but not corrupt the file
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+
+    def add(self, record):
+        """
+        Store one record (a dict with RECORD_FIELDS keys) and return its id
+
+        The record's 'id' is used when it has one (ids handed out by the
+        transcription log); sets record['created_at'] if missing.
+        """
+        record.setdefault('created_at', time.time())
+        with self._connection() as connection:
+            cursor = connection.execute(
+                f"INSERT INTO transcriptions (id, {', '.join(RECORD_FIELDS)}, created_at) "
+                f"VALUES (?, {', '.join('?' for _ in RECORD_FIELDS)}, ?)",
+                [record.get('id')] + [record.get(field) for field in RECORD_FIELDS] + [record['created_at']]
+            )
+            apply_rollups(connection, [{**record, 'id': cursor.lastrowid}])
+        return cursor.lastrowid
+
+    def add_many(self, records):
+        """Store records that already have ids in one transaction, skipping ids that are already stored"""
+        insert = (f"INSERT OR IGNORE INTO transcriptions (id, {', '.join(RECORD_FIELDS)}, created_at) "
+                  f"VALUES (?, {', '.join('?' for _ in RECORD_FIELDS)}, ?)")
+        with self._connection() as connection:
+            inserted = []
+            for record in records:
+                record.setdefault('created_at', time.time())
+                values = [record['id']] + [record.get(field) for field in RECORD_FIELDS] + [record['created_at']]
+                if connection.execute(insert, values).rowcount:
+                    inserted.append(record)
+            # Only records that weren't stored already count towards the rollups
+            apply_rollups(connection, inserted)
+
+    def _select(self, fields):
+        """Column list for a projection (id is always included); raises ValueError for unknown fields"""
+        if fields is None:
+            return '*'
+        unknown = sorted(set(fields) - set(RECORD_COLUMNS))
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return ', '.join(['id'] + [field for field in RECORD_COLUMNS if field in fields and field != 'id'])
+
+    def all(self):
+        """Every record, oldest first"""
+        rows = self._connection().execute('SELECT * FROM transcriptions ORDER BY id')
+        return [row_to_record(row) for row in rows]
+
+    def page(self, limit, after=None, fields=None):
+        """
+        Up to limit records with id > after, oldest first
+
+        Returns (records, next_cursor); next_cursor is the id to pass as
+        `after` for the following page, or None after the last one.
+        """
+        rows = self._connection().execute(
+            f'SELECT {self._select(fields)} FROM transcriptions WHERE id > ? ORDER BY id LIMIT ?',
+            (after or 0, limit + 1)
+        ).fetchall()
+        records = [row_to_record(row) for row in rows[:limit]]
+        return records, (records[-1]['id'] if len(rows) > limit else None)
+
+    def iter_records(self, after=None, fields=None, limit=None):
+        """
+        Yield records with id > after in id order, at most limit of them
+
+        Rows are read STREAM_CHUNK_SIZE at a time by id, so memory stays
+        constant and no read transaction is held open between chunks.
+        """
+        select = self._select(fields)
+        # Validated before the first record so a bad projection fails up front
+        return self._iter_records(select, after or 0, limit)
+
+    def _iter_records(self, select, after, limit):
+        remaining = limit
+        while remaining is None or remaining > 0:
+            chunk = STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining)
+            rows = self._connection().execute(
+                f'SELECT {select} FROM transcriptions WHERE id > ? ORDER BY id LIMIT ?', (after, chunk)
+            ).fetchall()
+            for row in rows:
+                yield row_to_record(row)
+            if len(rows) < chunk:
+                return
+            after = rows[-1]['id']
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def by_session(self, session_id):
+        """Records of one session, oldest first"""
+        rows = self._connection().execute(
+            'SELECT * FROM transcriptions WHERE session_id = ? ORDER BY id', (session_id,)
+        )
+        return [row_to_record(row) for row in rows]
+
+    def by_ids(self, ids, fields=None):
+        """Records with these ids, oldest first (ids that are not stored are left out)"""
+        select = self._select(fields)
+        ids = list(ids)
+        records = []
+        for start in range(0, len(ids), STREAM_CHUNK_SIZE):
+            chunk = ids[start:start + STREAM_CHUNK_SIZE]
+            rows = self._connection().execute(
+                f"SELECT {select} FROM transcriptions WHERE id IN ({', '.join('?' for _ in chunk)})", chunk
+            )
+            records.extend(row_to_record(row) for row in rows)
+        return sorted(records, key=lambda record: record['id'])
+
+    def session_version(self, session_id):
+        """(record count, last id) of a session, read from the session index alone"""
+        count, last_id = self._connection().execute(
+            'SELECT COUNT(*), MAX(id) FROM transcriptions WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        return count, last_id
+
+    def max_id(self):
+        return self._connection().execute('SELECT MAX(id) FROM transcriptions').fetchone()[0]
+
+    def ids_from(self, start_id):
+        """Set of stored ids >= start_id"""
+        rows = self._connection().execute('SELECT id FROM transcriptions WHERE id >= ?', (start_id,))
+        return {row[0] for row in rows}
+
+    def delete_before(self, entry_id):
+        """Delete records with id < entry_id; returns how many there were"""
+        with self._connection() as connection:
+            deleted = connection.execute('DELETE FROM transcriptions WHERE id < ?', (entry_id,)).rowcount
+            if deleted:
+                rebuild_rollups(connection)
+        return deleted
+
+    def count(self):
+        return self._connection().execute('SELECT COUNT(*) FROM transcriptions').fetchone()[0]
+
+    def clear(self):
+        """Delete every record; returns how many there were"""
+        with self._connection() as connection:
+            deleted = connection.execute('DELETE FROM transcriptions').rowcount
+            connection.execute('DELETE FROM rollups')
+            connection.execute('DELETE FROM latency_histogram')
+        logger.info(f"🗄️ Cleared {deleted} stored transcriptions")
+        return deleted
+
+    def rollups(self, hours, days, session_id=None):
+        """Precomputed usage figures (see transcription_rollups.read_rollups)"""
+        return read_rollups(self._connection(), hours, days, session_id)
+
+    def stats(self):
+        return {'path': self.path, 'records': self.count()}
@@ -0,0 +1,285 @@
+"""
+Resumable chunked upload sessions for long recordings
+
+A client creates a session, appends numbered chunks and then finalizes it.
+Chunks are written straight to a spool file. The audio format is sniffed from
+the first chunk, and for formats that need conversion an ffmpeg process is
+started right away and fed every chunk as it arrives. By the time the upload
+is finalized the WAV is usually ready, so only inference is left to do.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+import wave
+
+from audio_pipeline import CANONICAL_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+# Magic bytes used to recognise the container of the first chunk
+AUDIO_SIGNATURES = [
+    (0, b'RIFF', 'wav'),
+    (4, b'ftyp', 'm4a'),
+    (0, b'OggS', 'ogg'),
+    (0, b'fLaC', 'flac'),
+    (0, b'ID3', 'mp3'),
+    (0, b'\x1a\x45\xdf\xa3', 'webm'),
+    (0, b'#!AMR', 'amr'),
+]
+
+
+def sniff_audio_format(header):
+    """Guess the audio container from the first bytes of a file, or None"""
+    for offset, signature, audio_format in AUDIO_SIGNATURES:
+        if header[offset:offset + len(signature)] == signature:
+            if audio_format == 'wav' and header[8:12] != b'WAVE':
+                continue
+            return audio_format
+
+    # Raw MPEG audio frames start with an 11-bit sync word
+    if len(header) >= 2 and header[0] == 0xFF and (header[1] & 0xE0) == 0xE0:
+        return 'mp3'
+    return None
+
+
+class StreamingWavConverter:
+    """
+    Convert audio to 16 kHz mono WAV with ffmpeg while the input is still arriving
+
+    Chunks are piped into ffmpeg's stdin as they are received. Containers
+    that can't be decoded from a pipe (e.g. an m4a with its index at the end)
+    make ffmpeg exit early; the converter then reports failure and the caller
+    converts the complete spool file instead.
+    """
+
+    def __init__(self, ffmpeg_path):
+        self.output_path = tempfile.mktemp(suffix='.wav')
+        self.failed = False
+        self.process = subprocess.Popen(
+            [ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-y',
+             '-i', 'pipe:0', '-ac', '1', '-ar', str(CANONICAL_SAMPLE_RATE),
+             '-f', 'wav', self.output_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+
+    def feed(self, chunk):
+        """Pass one chunk of input to ffmpeg"""
+        if self.failed:
+            return
+        try:
+            self.process.stdin.write(chunk)
+        except (BrokenPipeError, OSError) as e:
+            logger.warning(f"⚠️ Streaming conversion stopped early: {e}")
+            self.failed = True
+
+    def finish(self, timeout):
+        """Close the input and return the WAV path, or None if conversion failed"""
+        try:
+            if not self.process.stdin.closed:
+                self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            self.failed = True
+
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            logger.warning("⚠️ Streaming conversion timed out")
+            self.discard()
+            return None
+
+        stderr = self.process.stderr.read()
+        self.process.stderr.close()
+        if self.process.returncode != 0 or self.failed:
+            message = stderr.decode('utf-8', errors='replace').strip()
+            logger.warning(f"⚠️ Streaming conversion failed: {message or self.process.returncode}")
+            self.discard()
+            return None
+
+        # ffmpeg can exit cleanly with only a header when the pipe had no
+        # decodable audio, so make sure frames were actually written
+        try:
+            with wave.open(self.output_path, 'rb') as wav_file:
+                frame_count = wav_file.getnframes()
+        except (OSError, EOFError, wave.Error):
+            frame_count = 0
+        if frame_count == 0:
+            logger.warning("⚠️ Streaming conversion produced no audio")
+            self.discard()
+            return None
+
+        return self.output_path
+
+    def discard(self):
+        """Stop ffmpeg and remove any partial output"""
+        self.failed = True
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        for stream in (self.process.stdin, self.process.stderr):
+            try:
+                stream.close()
+            except (BrokenPipeError, OSError):
+                pass
+        if os.path.exists(self.output_path):
+            os.unlink(self.output_path)
+
+
+class UploadSession:
+    """State of one chunked upload: spool file, next chunk and converter"""
+
+    def __init__(self, options, ffmpeg_path=None):
+        self.upload_id = uuid.uuid4().hex
+        self.options = options
+        self.ffmpeg_path = ffmpeg_path
+        self.next_chunk = 0
+        self.received_bytes = 0
+        self.sniffed_format = None
+        self.converter = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.discarded = False
+        self.lock = threading.Lock()  # held while a chunk is written and while the session is torn down
+
+        audio_format = options.get('audio_format', 'm4a')
+        with tempfile.NamedTemporaryFile(suffix=f'.{audio_format}', delete=False) as spool:
+            self.spool_path = spool.name
+
+    def append_chunk(self, index, chunk):
+        """
+        Append chunk `index` to the spool file
+
+        Re-sending an already stored chunk is acknowledged without writing it
+        again, so a client can safely retry after a lost response. Returns
+        True if the chunk was written, False if it was a duplicate. Raises
+        ValueError if the chunk is ahead of what the server has, and
+        LookupError if the session was discarded while the chunk waited.
+        """
+        with self.lock:
+            if self.discarded:
+                raise LookupError(f'Upload session not found: {self.upload_id}')
+            if index < self.next_chunk:
+                return False
+            if index > self.next_chunk:
+                raise ValueError(f'Expected chunk {self.next_chunk}, got {index}')
+
+            if index == 0 and self.converter is None:
+                self._start_conversion(chunk)
+
+            with open(self.spool_path, 'r+b' if self.received_bytes else 'wb') as spool:
+                spool.seek(self.received_bytes)
+                try:
+                    spool.write(chunk)
+                except Exception:
+                    spool.truncate(self.received_bytes)
+                    raise
+
+            if self.converter is not None:
+                self.converter.feed(chunk)
+
+            self.received_bytes += len(chunk)
+            self.next_chunk += 1
+            self.updated_at = time.time()
+            return True
+
+    def _start_conversion(self, first_chunk):
+        """Sniff the format of the first chunk and start converting if needed"""
+        self.sniffed_format = sniff_audio_format(first_chunk[:64])
+        if self.sniffed_format:
+            declared_format = self.options.get('audio_format')
+            if declared_format and declared_format.lower() != self.sniffed_format:
+                logger.debug("📦 Declared format %s, sniffed %s", declared_format, self.sniffed_format)
+            self.options['audio_format'] = self.sniffed_format
+
+            # Nothing is written yet, so give the spool file the right extension
+            spool_root, spool_ext = os.path.splitext(self.spool_path)
+            if spool_ext.lower() != f'.{self.sniffed_format}':
+                new_spool_path = f'{spool_root}.{self.sniffed_format}'
+                os.replace(self.spool_path, new_spool_path)
+                self.spool_path = new_spool_path
+
+        audio_format = self.options.get('audio_format', 'm4a').lower()
+        if audio_format != 'wav' and self.ffmpeg_path:
+            logger.debug("🔄 Starting streaming %s → WAV conversion", audio_format)
+            try:
+                self.converter = StreamingWavConverter(self.ffmpeg_path)
+            except OSError as e:
+                logger.warning(f"⚠️ Could not start streaming conversion: {e}")
+
+    def finish_conversion(self, timeout):
+        """Return the WAV produced while uploading, or None"""
+        if self.converter is None:
+            return None
+        return self.converter.finish(timeout)
+
+    def discard(self):
+        """Remove the spool file and stop any running conversion"""
+        self.discarded = True
+        if self.converter is not None:
+            self.converter.discard()
+        if os.path.exists(self.spool_path):
+            os.unlink(self.spool_path)
+
+    def to_dict(self):
+        return {
+            'upload_id': self.upload_id,
+            'next_chunk': self.next_chunk,
+            'received_bytes': self.received_bytes,
+            'audio_format': self.options.get('audio_format'),
+            'sniffed_format': self.sniffed_format,
+            'streaming_conversion': self.converter is not None and not self.converter.failed,
+        }
+
+
+class UploadSessionRegistry:
+    """Thread-safe registry of open upload sessions with idle expiry"""
+
+    def __init__(self, session_timeout):
+        self.session_timeout = session_timeout
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.ffmpeg_path = shutil.which('ffmpeg')
+
+    def create(self, options):
+        self.expire_idle()
+        session = UploadSession(options, self.ffmpeg_path)
+        with self.lock:
+            self.sessions[session.upload_id] = session
+        return session
+
+    def get(self, upload_id):
+        with self.lock:
+            return self.sessions.get(upload_id)
+
+    def pop(self, upload_id):
+        with self.lock:
+            return self.sessions.pop(upload_id, None)
+
+    def expire_idle(self):
+        """
+        Discard sessions that haven't received data within the timeout
+
+        A session whose lock is held has a chunk being written right now, so
+        it is left for the next pass rather than closed underneath the writer.
+        """
+        cutoff = time.time() - self.session_timeout
+        expired = []
+        with self.lock:
+            for session in list(self.sessions.values()):
+                if session.updated_at < cutoff and session.lock.acquire(blocking=False):
+                    del self.sessions[session.upload_id]
+                    expired.append(session)
+
+        for session in expired:
+            logger.info(f"🧹 Expiring idle upload session {session.upload_id}")
+            try:
+                session.discard()
+            finally:
+                session.lock.release()